@@ -0,0 +1,314 @@
+"""
+Archivo de pedidos cerrados y lecturas que lo incluyen de forma transparente.
+
+`archivar()` mueve los pedidos Pagados o Cancelados con más de ARCHIVO_DIAS
+días a pedido_archivo: una fila por pedido con sus líneas y sus productos
+personalizados (con las materias primas) en JSONB (ver
+app/models/pedido_archivo.py).
+Se borran de pedido, detalle_pedido, producto_personalizado y
+detalle_productopersonalizado, así las tablas e índices que usan las ventas del
+día quedan chicos. Los pedidos Pendientes no se archivan aunque sean viejos.
+
+Lecturas:
+- `pedido_archivado()` arma un pedido archivado con la forma de PedidoResponse
+  (GET /pedidos/{id} lo usa cuando el pedido ya no está en pedido);
+- `FuentesPedidos` da las tablas que debe leer un reporte desde una fecha: las
+  de siempre si el rango no llega al archivo, o uniones de cada tabla con las
+  filas archivadas desde esa fecha, con las mismas columnas.
+
+El archivado se programa desde cron (o equivalente):
+
+    30 3 * * *  python -m app.archivo
+"""
+import json
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Dict, Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session, aliased
+
+from app.models import Pedido, DetallePedido, ProductoPersonalizado, DetalleProductoPersonalizado
+
+# Antigüedad a partir de la cual se archiva un pedido cerrado
+DIAS_ARCHIVO = int(os.getenv("ARCHIVO_DIAS", "90"))
+# Pedidos por transacción del archivado
+TAMANO_LOTE = int(os.getenv("ARCHIVO_TAMANO_LOTE", "5000"))
+
+ESTADOS_ARCHIVABLES = ("Pagado", "Cancelado")
+
+_TABLAS_PEDIDO = ("detalle_pedido", "detalle_productopersonalizado", "producto_personalizado", "pedido")
+
+_SQL_ARCHIVAR = text("""
+    WITH lote AS (
+        SELECT id_pedido FROM pedido
+        WHERE fecha_pedido < :corte AND estado = ANY(:estados)
+        ORDER BY fecha_pedido
+        LIMIT :lote
+        FOR UPDATE SKIP LOCKED
+    )
+    INSERT INTO pedido_archivo (id_pedido, fecha_pedido, id_personal, id_sucursal, id_cliente,
+                                estado, metodo_pago, total, lineas, personalizados)
+    SELECT p.id_pedido, p.fecha_pedido, p.id_personal, p.id_sucursal, p.id_cliente,
+           p.estado, p.metodo_pago, p.total,
+           coalesce((
+               SELECT jsonb_agg(jsonb_build_object(
+                   'id_detalle_pedido', dp.id_detalle_pedido,
+                   'tipo_producto', dp.tipo_producto,
+                   'id_producto_establecido', dp.id_producto_establecido,
+                   'id_producto_personalizado', dp.id_producto_personalizado,
+                   'cantidad', dp.cantidad,
+                   'precio_unitario', dp.precio_unitario,
+                   'subtotal', dp.subtotal
+               ) ORDER BY dp.id_detalle_pedido)
+               FROM detalle_pedido dp
+               WHERE dp.id_pedido = p.id_pedido
+           ), '[]'::jsonb),
+           coalesce((
+               SELECT jsonb_agg(jsonb_build_object(
+                   'id_producto_personalizado', pp.id_producto_personalizado,
+                   'nombre_personalizado', pp.nombre_personalizado,
+                   'id_receta', pp.id_receta,
+                   'fecha_creacion', pp.fecha_creacion,
+                   'materias', coalesce((
+                       SELECT jsonb_agg(jsonb_build_object(
+                           'id_materia_prima', dpp.id_materia_prima,
+                           'cantidad', dpp.cantidad,
+                           'precio_unitario', dpp.precio_unitario,
+                           'subtotal', dpp.subtotal
+                       ) ORDER BY dpp.id_materia_prima)
+                       FROM detalle_productopersonalizado dpp
+                       WHERE dpp.id_producto_personalizado = pp.id_producto_personalizado
+                   ), '[]'::jsonb)
+               ) ORDER BY pp.id_producto_personalizado)
+               FROM producto_personalizado pp
+               WHERE pp.id_pedido = p.id_pedido
+           ), '[]'::jsonb)
+    FROM pedido p
+    JOIN lote USING (id_pedido)
+    RETURNING id_pedido
+""")
+
+_SQL_BORRAR = (
+    "DELETE FROM detalle_pedido WHERE id_pedido = ANY(:ids)",
+    """DELETE FROM detalle_productopersonalizado WHERE id_producto_personalizado IN (
+           SELECT id_producto_personalizado FROM producto_personalizado WHERE id_pedido = ANY(:ids))""",
+    "DELETE FROM producto_personalizado WHERE id_pedido = ANY(:ids)",
+    "DELETE FROM pedido WHERE id_pedido = ANY(:ids)",
+)
+
+
+def archivar_lote(db: Session, corte: datetime, lote: int = TAMANO_LOTE) -> int:
+    """Archiva hasta `lote` pedidos anteriores a `corte` (no hace commit)."""
+    ids = db.execute(_SQL_ARCHIVAR, {
+        "corte": corte, "estados": list(ESTADOS_ARCHIVABLES), "lote": lote
+    }).scalars().all()
+    if ids:
+        for sentencia in _SQL_BORRAR:
+            db.execute(text(sentencia), {"ids": ids})
+    return len(ids)
+
+
+def archivar(db: Session, dias: int = DIAS_ARCHIVO, lote: int = TAMANO_LOTE) -> int:
+    """
+    Archiva todos los pedidos cerrados con más de `dias` días, con un commit
+    por lote para no retener locks largos. Devuelve la cantidad archivada.
+    """
+    corte = datetime.now(timezone.utc) - timedelta(days=dias)
+    total = 0
+    while True:
+        archivados = archivar_lote(db, corte, lote)
+        db.commit()
+        total += archivados
+        if archivados < lote:
+            return total
+
+
+# --------------------------
+# Lecturas
+# --------------------------
+
+def ultimo_archivado(db: Session) -> Optional[datetime]:
+    """Fecha del pedido archivado más reciente (None si el archivo está vacío)."""
+    return db.execute(text("SELECT max(fecha_pedido) FROM pedido_archivo")).scalar()
+
+
+def _numero(valor):
+    return valor if valor is not None else 0
+
+
+def pedido_archivado(db: Session, id_pedido: int) -> Optional[dict]:
+    """Pedido archivado con la forma de PedidoResponse, o None si no existe."""
+    fila = db.execute(text("""
+        SELECT a.id_pedido, a.fecha_pedido, a.id_personal, pe.nombre, a.id_sucursal, s.nombre,
+               a.id_cliente, c.apellido, a.estado, a.metodo_pago, a.total,
+               a.lineas::text, a.personalizados::text
+        FROM pedido_archivo a
+        LEFT JOIN personal pe ON pe.id_personal = a.id_personal
+        LEFT JOIN sucursal s ON s.id_sucursal = a.id_sucursal
+        LEFT JOIN cliente c ON c.id_cliente = a.id_cliente
+        WHERE a.id_pedido = :id
+    """), {"id": id_pedido}).first()
+    if fila is None:
+        return None
+
+    # Como texto y con Decimal: json de psycopg2 convertiría los montos a float
+    lineas = json.loads(fila[11], parse_float=Decimal)
+    personalizados = {p["id_producto_personalizado"]: p
+                      for p in json.loads(fila[12], parse_float=Decimal)}
+    ids_productos = [l["id_producto_establecido"] for l in lineas if l["id_producto_establecido"]]
+    ids_materias = [m["id_materia_prima"] for p in personalizados.values() for m in p["materias"]]
+    productos = dict(db.execute(text(
+        "SELECT id_producto_establecido, nombre FROM producto_establecido "
+        "WHERE id_producto_establecido = ANY(:ids)"), {"ids": ids_productos}).all()) if ids_productos else {}
+    materias = {
+        id_materia: (nombre, unidad) for id_materia, nombre, unidad in db.execute(text(
+            "SELECT id_materia_prima, nombre, unidad FROM materia_prima "
+            "WHERE id_materia_prima = ANY(:ids)"), {"ids": ids_materias})
+    } if ids_materias else {}
+
+    detalles = []
+    for linea in lineas:
+        detalle = {
+            "id_detalle_pedido": linea["id_detalle_pedido"],
+            "tipo_producto": linea["tipo_producto"],
+            "cantidad": linea["cantidad"],
+            "precio_unitario": _numero(linea["precio_unitario"]),
+            "subtotal": _numero(linea["subtotal"]),
+        }
+        if linea["tipo_producto"] == "Establecido":
+            detalle["id_producto_establecido"] = linea["id_producto_establecido"]
+            detalle["nombre_producto"] = productos.get(linea["id_producto_establecido"], "Desconocido")
+        else:
+            personalizado = personalizados.get(linea["id_producto_personalizado"],
+                                               {"nombre_personalizado": "Desconocido", "materias": []})
+            detalle["id_producto_personalizado"] = linea["id_producto_personalizado"]
+            detalle["producto_personalizado"] = {
+                "id_producto_personalizado": linea["id_producto_personalizado"],
+                "nombre_personalizado": personalizado["nombre_personalizado"],
+                "id_receta": personalizado.get("id_receta"),
+                "detalles": [{
+                    "id_materia_prima": m["id_materia_prima"],
+                    "nombre_materia": materias.get(m["id_materia_prima"], ("Desconocido",))[0],
+                    "cantidad": m["cantidad"],
+                    "precio_unitario": m["precio_unitario"],
+                    "subtotal": _numero(m["subtotal"]),
+                    "unidad": (materias.get(m["id_materia_prima"], (None, None))[1] or "unidad"),
+                } for m in personalizado["materias"]],
+            }
+        detalles.append(detalle)
+
+    return {
+        "id_pedido": fila.id_pedido,
+        "fecha_pedido": fila.fecha_pedido,
+        "id_personal": fila.id_personal,
+        "nombre_personal": fila[3] or "Desconocido",
+        "id_sucursal": fila.id_sucursal,
+        "nombre_sucursal": fila[5] or "Desconocido",
+        "id_cliente": fila.id_cliente,
+        "nombre_cliente": fila.apellido,
+        "estado": fila.estado,
+        "metodo_pago": fila.metodo_pago,
+        "total": fila.total,
+        "detalles": detalles,
+    }
+
+
+# Filas archivadas de cada tabla, con sus columnas en el orden del modelo.
+# :archivo_desde acota el archivo al rango del reporte antes de expandir el JSONB.
+_SQL_ARCHIVADOS: Dict[str, str] = {
+    "pedido": """
+        SELECT id_pedido, fecha_pedido, id_personal, id_sucursal, id_cliente,
+               estado, metodo_pago, total
+        FROM pedido_archivo WHERE fecha_pedido >= :archivo_desde""",
+    "detalle_pedido": """
+        SELECT d.id_detalle_pedido, a.id_pedido, d.tipo_producto, d.id_producto_establecido,
+               d.id_producto_personalizado, d.cantidad, d.precio_unitario, d.subtotal
+        FROM pedido_archivo a
+        CROSS JOIN LATERAL jsonb_to_recordset(a.lineas) AS d(
+            id_detalle_pedido integer, tipo_producto varchar, id_producto_establecido integer,
+            id_producto_personalizado integer, cantidad integer, precio_unitario numeric,
+            subtotal numeric)
+        WHERE a.fecha_pedido >= :archivo_desde""",
+    "producto_personalizado": """
+        SELECT d.id_producto_personalizado, a.id_pedido, d.nombre_personalizado, d.id_receta,
+               d.fecha_creacion
+        FROM pedido_archivo a
+        CROSS JOIN LATERAL jsonb_to_recordset(a.personalizados) AS d(
+            id_producto_personalizado integer, nombre_personalizado varchar,
+            id_receta integer, fecha_creacion timestamptz)
+        WHERE a.fecha_pedido >= :archivo_desde""",
+    "detalle_productopersonalizado": """
+        SELECT (d ->> 'id_producto_personalizado')::integer, m.id_materia_prima,
+               m.cantidad, m.precio_unitario, m.subtotal
+        FROM pedido_archivo a
+        CROSS JOIN LATERAL jsonb_array_elements(a.personalizados) AS d
+        CROSS JOIN LATERAL jsonb_to_recordset(d -> 'materias') AS m(
+            id_materia_prima integer, cantidad numeric, precio_unitario numeric, subtotal numeric)
+        WHERE a.fecha_pedido >= :archivo_desde""",
+}
+
+_MODELOS = {
+    "pedido": Pedido,
+    "detalle_pedido": DetallePedido,
+    "producto_personalizado": ProductoPersonalizado,
+    "detalle_productopersonalizado": DetalleProductoPersonalizado,
+}
+
+
+class FuentesPedidos:
+    """
+    Tablas de pedidos que debe leer un reporte que empieza en `desde`.
+
+    Si ningún pedido archivado cae en el rango (el caso habitual: reportes de
+    días o semanas) se usan las tablas tal cual y los planes no cambian. Si no,
+    cada tabla se reemplaza por `tabla UNION ALL filas archivadas desde desde`.
+
+    - en SQL de texto: `sql("pedido")` devuelve el nombre o la subconsulta y
+      `parametros` los valores que hay que sumar a los de la consulta;
+    - en consultas ORM: `entidad(Pedido)` devuelve el modelo o un alias sobre la
+      unión. Con alias hay que escribir las condiciones de los JOIN.
+    """
+
+    def __init__(self, db: Session, desde: datetime):
+        corte = ultimo_archivado(db)
+        self.desde = desde
+        self.con_archivo = corte is not None and desde <= corte
+        self.parametros = {"archivo_desde": desde} if self.con_archivo else {}
+
+    def _union(self, tabla: str) -> str:
+        columnas = ", ".join(c.name for c in _MODELOS[tabla].__table__.c)
+        return f"SELECT {columnas} FROM {tabla} UNION ALL {_SQL_ARCHIVADOS[tabla]}"
+
+    def sql(self, tabla: str) -> str:
+        if not self.con_archivo:
+            return tabla
+        return f"({self._union(tabla)})"
+
+    def entidad(self, modelo):
+        if not self.con_archivo:
+            return modelo
+        tabla = modelo.__tablename__
+        subconsulta = text(self._union(tabla)).bindparams(archivo_desde=self.desde)\
+            .columns(*modelo.__table__.c).subquery(tabla)
+        return aliased(modelo, subconsulta, adapt_on_names=True)
+
+
+if __name__ == "__main__":
+    from app.database import SessionLocal, engine
+
+    db = SessionLocal()
+    try:
+        inicio = datetime.now()
+        archivados = archivar(db)
+    finally:
+        db.close()
+    print(f"{archivados} pedidos archivados en {(datetime.now() - inicio).total_seconds():.1f} s")
+
+    # VACUUM no puede correr dentro de una transacción
+    if archivados and "--sin-vacuum" not in sys.argv:
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conexion:
+            for tabla in _TABLAS_PEDIDO + ("pedido_archivo",):
+                conexion.execute(text(f"VACUUM ANALYZE {tabla}"))
@@ -0,0 +1,106 @@
+"""
+Caché HTTP (ETag / If-None-Match) para las lecturas de catálogo e inventario.
+
+Cada recurso tiene un contador en la tabla version_recurso que los routers
+incrementan con `invalidar()` dentro de la misma transacción de la escritura.
+El ETag débil de una respuesta se deriva de las versiones de los recursos que
+la componen, así que una petición condicional solo cuesta leer esos contadores
+(una consulta por clave primaria) y puede responder 304 sin ejecutar la
+consulta principal ni serializar nada.
+"""
+import hashlib
+from typing import Iterable
+
+from fastapi import Request, Response
+from sqlalchemy import select, text
+from sqlalchemy.orm import Session
+
+from app.models import VersionRecurso
+
+RECURSO_SUCURSALES = "sucursales"
+RECURSO_PRODUCTOS = "productos_establecidos"
+RECURSO_MATERIAS = "materias_primas"
+RECURSO_RECETAS = "recetas"
+
+# Los clientes pueden guardar la respuesta pero deben revalidarla siempre
+CACHE_CONTROL = "private, no-cache"
+
+
+def recurso_inventario_materias(id_sucursal: int) -> str:
+    return f"inventario_materias:{id_sucursal}"
+
+
+def recurso_inventario_productos(id_sucursal: int) -> str:
+    return f"inventario_productos:{id_sucursal}"
+
+
+def recursos_inventario(id_sucursal: int) -> tuple:
+    """Ambos inventarios de una sucursal."""
+    return (recurso_inventario_materias(id_sucursal),
+            recurso_inventario_productos(id_sucursal))
+
+
+def etag_recursos(db: Session, *recursos: str, variante: str = "") -> str:
+    """
+    Calcula el ETag débil a partir de las versiones actuales de los recursos.
+    `variante` distingue representaciones del mismo recurso (filtros, formato).
+    """
+    versiones = dict(db.execute(
+        select(VersionRecurso.recurso, VersionRecurso.version)
+        .where(VersionRecurso.recurso.in_(recursos))
+    ).all())
+    firma = "|".join(f"{r}={versiones.get(r, 0)}" for r in recursos) + "|" + variante
+    return 'W/"' + hashlib.blake2s(firma.encode(), digest_size=8).hexdigest() + '"'
+
+
+def _etags_peticion(valor: str) -> Iterable[str]:
+    for etag in valor.split(","):
+        etag = etag.strip()
+        if etag.startswith("W/"):
+            etag = etag[2:]
+        yield etag
+
+
+def no_modificado(request: Request, etag: str) -> bool:
+    """Comparación débil de If-None-Match contra el ETag actual."""
+    valor = request.headers.get("if-none-match")
+    if not valor:
+        return False
+    if valor.strip() == "*":
+        return True
+    return etag[2:] in set(_etags_peticion(valor))
+
+
+def respuesta_no_modificada(etag: str) -> Response:
+    return Response(
+        status_code=304,
+        headers={"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    )
+
+
+def marcar_etag(response: Response, etag: str):
+    """Agrega el ETag a la respuesta normal (200) del endpoint."""
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
+
+
+def invalidar(db: Session, *recursos: str):
+    """
+    Incrementa la versión de los recursos en la transacción actual (no hace commit).
+    Se ordenan para que escrituras concurrentes tomen los bloqueos en el mismo orden.
+    """
+    for recurso in sorted(set(recursos)):
+        db.execute(
+            text("""
+                INSERT INTO version_recurso (recurso, version)
+                VALUES (:recurso, 1)
+                ON CONFLICT (recurso)
+                DO UPDATE SET version = version_recurso.version + 1
+            """),
+            {"recurso": recurso}
+        )
+
+
+def invalidar_todo(db: Session):
+    """Invalida todos los recursos conocidos (p. ej. tras restaurar un backup)."""
+    db.execute(text("UPDATE version_recurso SET version = version + 1"))
@@ -0,0 +1,143 @@
+"""
+Registro de los cambios de stock hechos en una sesión y avisos de stock mínimo.
+
+Los caminos que modifican inventario (confirmación de pedidos, asignaciones,
+ajustes y transferencias) llaman a `registrar_cambio()` con el stock anterior y
+el nuevo de cada fila. Al hacer commit:
+
+- se escribe un movimiento_inventario por fila con el delta neto de la
+  transacción (ver app/historial_inventario.py), en un solo INSERT;
+- se buscan los mínimos de los items tocados (una consulta por tipo) y, para
+  las filas que cruzaron el mínimo, se publica un evento en el canal de la
+  sucursal. Los eventos se publican solo después del commit; si la
+  transacción se revierte se descartan.
+"""
+from decimal import Decimal
+from typing import Dict, Tuple
+
+from sqlalchemy import event, insert, select
+from sqlalchemy.orm import Session
+
+from app.eventos import canal_sucursal, obtener_backend
+from app.models import MateriaPrima, ProductoEstablecido, MovimientoInventario
+
+TIPO_MATERIA = "materia_prima"
+TIPO_PRODUCTO = "producto"
+
+EVENTO_STOCK_BAJO = "stock_bajo"
+EVENTO_STOCK_REPUESTO = "stock_repuesto"
+
+_CATALOGOS = {
+    TIPO_MATERIA: (MateriaPrima, MateriaPrima.id_materia_prima),
+    TIPO_PRODUCTO: (ProductoEstablecido, ProductoEstablecido.id_producto_establecido),
+}
+
+# (tipo, id_sucursal, id_item) -> [stock_anterior, stock_actual, origen]
+_Cambios = Dict[Tuple[str, int, int], list]
+
+
+def registrar_cambio(db: Session, tipo: str, id_sucursal: int, id_item: int,
+                     anterior, actual, origen: str):
+    """
+    Anota un cambio de stock en la sesión. Si la misma fila cambia varias veces
+    en la transacción se conserva el primer valor anterior y el último actual.
+    """
+    cambios: _Cambios = db.info.setdefault("_cambios_stock", {})
+    clave = (tipo, id_sucursal, id_item)
+    if clave in cambios:
+        cambios[clave][1] = actual
+        cambios[clave][2] = origen
+    else:
+        cambios[clave] = [anterior, actual, origen]
+
+
+def _movimientos(cambios: _Cambios) -> list:
+    filas = []
+    for (tipo, id_sucursal, id_item), (anterior, actual, origen) in cambios.items():
+        anterior = Decimal(anterior if anterior is not None else 0)
+        actual = Decimal(actual)
+        if anterior == actual:
+            continue
+        filas.append({
+            "id_sucursal": id_sucursal,
+            "tipo_item": tipo,
+            "id_item": id_item,
+            "cantidad_anterior": anterior,
+            "cantidad_nueva": actual,
+            "delta": actual - anterior,
+            "origen": origen,
+        })
+    return filas
+
+
+def _eventos_por_cruce(db: Session, cambios: _Cambios) -> list:
+    eventos = []
+    for tipo, (catalogo, columna_id) in _CATALOGOS.items():
+        ids = {i for t, _, i in cambios if t == tipo}
+        if not ids:
+            continue
+        items = {
+            fila[0]: fila[1:] for fila in db.execute(
+                select(columna_id, catalogo.nombre, catalogo.stock_minimo)
+                .where(columna_id.in_(ids))
+            )
+        }
+        for (t, id_sucursal, id_item), (anterior, actual, origen) in cambios.items():
+            if t != tipo or id_item not in items:
+                continue
+            nombre, minimo = items[id_item]
+            if not minimo:
+                continue
+            anterior = Decimal(anterior if anterior is not None else 0)
+            actual = Decimal(actual)
+            if anterior >= minimo > actual:
+                evento = EVENTO_STOCK_BAJO
+            elif anterior < minimo <= actual:
+                evento = EVENTO_STOCK_REPUESTO
+            else:
+                continue
+            eventos.append((canal_sucursal(id_sucursal), evento, {
+                "tipo": tipo,
+                "id_sucursal": id_sucursal,
+                "id_item": id_item,
+                "nombre": nombre,
+                "stock_anterior": anterior,
+                "stock_actual": actual,
+                "stock_minimo": minimo,
+                "origen": origen,
+            }))
+    return eventos
+
+
+# Los SAVEPOINT (begin_nested) también disparan estos eventos; solo interesa la
+# transacción principal.
+
+@event.listens_for(Session, "before_commit")
+def _antes_de_commit(session: Session):
+    if session.in_nested_transaction():
+        return
+    cambios = session.info.pop("_cambios_stock", None)
+    if cambios:
+        movimientos = _movimientos(cambios)
+        if movimientos:
+            session.execute(insert(MovimientoInventario), movimientos)
+        session.info["_eventos_stock"] = _eventos_por_cruce(session, cambios)
+
+
+@event.listens_for(Session, "after_commit")
+def _despues_de_commit(session: Session):
+    if session.in_nested_transaction():
+        return
+    eventos = session.info.pop("_eventos_stock", None)
+    if eventos:
+        backend = obtener_backend()
+        for canal, evento, datos in eventos:
+            backend.publicar(canal, evento, datos)
+
+
+@event.listens_for(Session, "after_rollback")
+def _despues_de_rollback(session: Session):
+    if session.in_nested_transaction():
+        return
+    session.info.pop("_cambios_stock", None)
+    session.info.pop("_eventos_stock", None)
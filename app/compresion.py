@@ -0,0 +1,212 @@
+"""
+Middleware de compresión de respuestas (gzip y, si está instalado, brotli).
+
+Solo se comprimen los tipos de contenido de la lista permitida y las respuestas
+que superan el tamaño mínimo. Las respuestas en streaming se comprimen por
+partes, vaciando el compresor en cada trozo para que el cliente reciba los datos
+a medida que se generan.
+
+Configuración por variables de entorno:
+- COMPRESION_TAMANO_MINIMO: bytes a partir de los cuales se comprime (1024)
+- COMPRESION_TIPOS: tipos de contenido permitidos, separados por comas
+- COMPRESION_NIVEL_GZIP: nivel de gzip, 1-9 (6)
+- COMPRESION_NIVEL_BROTLI: calidad de brotli, 0-11 (4)
+- COMPRESION_BROTLI: "0" para no usar brotli aunque esté instalado
+"""
+import os
+import zlib
+from typing import Iterable, Optional
+
+try:
+    import brotli
+except ImportError:  # brotli es opcional
+    brotli = None
+
+TAMANO_MINIMO = int(os.getenv("COMPRESION_TAMANO_MINIMO", "1024"))
+TIPOS_PERMITIDOS = tuple(
+    t.strip() for t in os.getenv(
+        "COMPRESION_TIPOS",
+        "application/json,text/plain,text/csv,text/html,application/sql"
+    ).split(",") if t.strip()
+)
+NIVEL_GZIP = int(os.getenv("COMPRESION_NIVEL_GZIP", "6"))
+NIVEL_BROTLI = int(os.getenv("COMPRESION_NIVEL_BROTLI", "4"))
+USAR_BROTLI = brotli is not None and os.getenv("COMPRESION_BROTLI", "1") != "0"
+
+
+class _CompresorGzip:
+    codificacion = "gzip"
+
+    def __init__(self, nivel: int):
+        # wbits=31: formato gzip (cabecera + CRC)
+        self._z = zlib.compressobj(nivel, zlib.DEFLATED, 31)
+
+    def comprimir(self, datos: bytes) -> bytes:
+        return self._z.compress(datos) + self._z.flush(zlib.Z_SYNC_FLUSH)
+
+    def finalizar(self, datos: bytes = b"") -> bytes:
+        return self._z.compress(datos) + self._z.flush(zlib.Z_FINISH)
+
+
+class _CompresorBrotli:
+    codificacion = "br"
+
+    def __init__(self, nivel: int):
+        self._c = brotli.Compressor(quality=nivel)
+
+    def comprimir(self, datos: bytes) -> bytes:
+        return self._c.process(datos) + self._c.flush()
+
+    def finalizar(self, datos: bytes = b"") -> bytes:
+        return self._c.process(datos) + self._c.finish()
+
+
+def _codificaciones_aceptadas(valor: str) -> dict:
+    """Interpreta Accept-Encoding como {codificación: q}."""
+    aceptadas = {}
+    for parte in valor.split(","):
+        nombre, _, params = parte.strip().partition(";")
+        nombre = nombre.strip().lower()
+        if not nombre:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        aceptadas[nombre] = q
+    return aceptadas
+
+
+class CompresionMiddleware:
+    """Middleware ASGI de compresión con umbral de tamaño y lista de tipos."""
+
+    def __init__(
+        self,
+        app,
+        tamano_minimo: int = TAMANO_MINIMO,
+        tipos_permitidos: Iterable[str] = TIPOS_PERMITIDOS,
+        nivel_gzip: int = NIVEL_GZIP,
+        nivel_brotli: int = NIVEL_BROTLI,
+        usar_brotli: bool = USAR_BROTLI,
+    ):
+        self.app = app
+        self.tamano_minimo = tamano_minimo
+        self.tipos_permitidos = tuple(tipos_permitidos)
+        self.nivel_gzip = nivel_gzip
+        self.nivel_brotli = nivel_brotli
+        self.usar_brotli = usar_brotli and brotli is not None
+
+    def _negociar(self, scope) -> Optional[str]:
+        for nombre, valor in scope["headers"]:
+            if nombre == b"accept-encoding":
+                aceptadas = _codificaciones_aceptadas(valor.decode("latin-1"))
+                if self.usar_brotli and aceptadas.get("br", 0) > 0:
+                    return "br"
+                if aceptadas.get("gzip", 0) > 0:
+                    return "gzip"
+                return None
+        return None
+
+    def nuevo_compresor(self, codificacion: str):
+        if codificacion == "br":
+            return _CompresorBrotli(self.nivel_brotli)
+        return _CompresorGzip(self.nivel_gzip)
+
+    def tipo_permitido(self, content_type: str) -> bool:
+        tipo = content_type.split(";")[0].strip().lower()
+        return tipo in self.tipos_permitidos
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        codificacion = self._negociar(scope)
+        if codificacion is None:
+            await self.app(scope, receive, send)
+            return
+        respuesta = _RespuestaComprimida(self, codificacion, send)
+        await self.app(scope, receive, respuesta.send)
+
+
+class _RespuestaComprimida:
+    """Intercepta los mensajes de una respuesta y decide si comprimirla."""
+
+    def __init__(self, middleware: CompresionMiddleware, codificacion: str, send):
+        self.middleware = middleware
+        self.codificacion = codificacion
+        self._send = send
+        self._inicio = None
+        self._compresor = None
+        self._pasar_sin_cambios = False
+
+    def _cabeceras(self) -> dict:
+        return {k.lower(): v for k, v in self._inicio["headers"]}
+
+    def _preparar_inicio(self, longitud: Optional[int]):
+        """Ajusta las cabeceras de la respuesta para el cuerpo comprimido."""
+        cabeceras = [
+            (k, v) for k, v in self._inicio["headers"]
+            if k.lower() not in (b"content-length", b"vary")
+        ]
+        vary = self._cabeceras().get(b"vary")
+        vary = vary + b", Accept-Encoding" if vary else b"Accept-Encoding"
+        cabeceras.append((b"vary", vary))
+        cabeceras.append((b"content-encoding", self.codificacion.encode()))
+        if longitud is not None:
+            cabeceras.append((b"content-length", str(longitud).encode()))
+        self._inicio["headers"] = cabeceras
+
+    async def send(self, message):
+        tipo = message["type"]
+        if tipo == "http.response.start":
+            self._inicio = message
+            cabeceras = self._cabeceras()
+            longitud = cabeceras.get(b"content-length")
+            self._pasar_sin_cambios = (
+                message["status"] < 200
+                or message["status"] in (204, 304)
+                or b"content-encoding" in cabeceras
+                or not self.middleware.tipo_permitido(
+                    cabeceras.get(b"content-type", b"").decode("latin-1"))
+                or (longitud is not None and int(longitud) < self.middleware.tamano_minimo)
+            )
+            if self._pasar_sin_cambios:
+                await self._send(message)
+                self._inicio = None
+            return
+
+        if tipo != "http.response.body" or self._pasar_sin_cambios:
+            await self._send(message)
+            return
+
+        cuerpo = message.get("body", b"")
+        hay_mas = message.get("more_body", False)
+
+        if self._inicio is not None:
+            # Primer trozo del cuerpo: todavía no se enviaron las cabeceras
+            if not hay_mas:
+                if len(cuerpo) < self.middleware.tamano_minimo:
+                    self._pasar_sin_cambios = True
+                    await self._send(self._inicio)
+                    await self._send(message)
+                    return
+                comprimido = self.middleware.nuevo_compresor(self.codificacion).finalizar(cuerpo)
+                self._preparar_inicio(len(comprimido))
+                await self._send(self._inicio)
+                await self._send({"type": "http.response.body", "body": comprimido})
+                return
+
+            # Streaming: se comprime por partes y se omite Content-Length
+            self._compresor = self.middleware.nuevo_compresor(self.codificacion)
+            self._preparar_inicio(None)
+            await self._send(self._inicio)
+            self._inicio = None
+
+        if hay_mas:
+            datos = self._compresor.comprimir(cuerpo)
+        else:
+            datos = self._compresor.finalizar(cuerpo)
+        await self._send({"type": "http.response.body", "body": datos, "more_body": hay_mas})
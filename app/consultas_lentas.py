@@ -0,0 +1,141 @@
+"""
+Agregados por huella de consulta SQL y registro de consultas lentas.
+
+Cada sentencia que pasa por el listener after_cursor_execute de app/metricas.py
+se normaliza a una huella: literales y parámetros pasan a `?`, las listas de
+IN (...) y las filas repetidas de VALUES se colapsan y se unifican los
+espacios. Así `WHERE id_pedido = 10` y `WHERE id_pedido = 11`, o un IN con 3 y
+con 40 ids, cuentan como la misma consulta. Por huella se acumulan cantidad,
+tiempo total y máximo, y el p95 de las últimas VENTANA ejecuciones.
+
+Las sentencias que tardan más que UMBRAL_MS se registran con logging (logger
+"app.consultas_lentas") junto con la forma de sus parámetros: nombres, tipos y
+largos, nunca los valores.
+
+/diagnostico/consultas muestra las huellas más costosas.
+
+Configuración por variables de entorno:
+- CONSULTAS_LENTAS_MS: umbral del registro de consultas lentas, en ms (200)
+- CONSULTAS_VENTANA: ejecuciones recientes por huella para el p95 (256)
+- CONSULTAS_MAX_HUELLAS: huellas distintas que se conservan (500); al
+  superarlo se descarta la de menor tiempo total
+"""
+import logging
+import os
+import re
+import threading
+from collections import deque
+from functools import lru_cache
+from typing import Dict, List
+
+UMBRAL_MS = float(os.getenv("CONSULTAS_LENTAS_MS", "200"))
+VENTANA = int(os.getenv("CONSULTAS_VENTANA", "256"))
+MAX_HUELLAS = int(os.getenv("CONSULTAS_MAX_HUELLAS", "500"))
+
+logger = logging.getLogger(__name__)
+
+_COMENTARIOS = re.compile(r"--[^\n]*|/\*.*?\*/", re.S)
+_CADENAS = re.compile(r"'(?:[^']|'')*'")
+# %(nombre)s de psycopg2, :nombre de text(), ? de sqlite, $1 de asyncpg
+_PARAMETROS = re.compile(r"%\([^)]+\)s|%s|(?<!:):\w+|\?|\$\d+")
+_NUMEROS = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_LISTAS = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_FILAS = re.compile(r"(\(\?\))(?:\s*,\s*\(\?\))+")
+_ESPACIOS = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=4096)
+def huella(sentencia: str) -> str:
+    """Forma normalizada de una sentencia (con caché: SQLAlchemy repite los textos)."""
+    texto = _COMENTARIOS.sub(" ", sentencia)
+    texto = _CADENAS.sub("?", texto)
+    texto = _PARAMETROS.sub("?", texto)
+    texto = _NUMEROS.sub("?", texto)
+    texto = _LISTAS.sub("(?)", texto)
+    texto = _FILAS.sub(r"\1, ...", texto)
+    return _ESPACIOS.sub(" ", texto).strip()
+
+
+def _forma_valor(valor) -> str:
+    if isinstance(valor, (str, bytes, list, tuple)):
+        return f"{type(valor).__name__}[{len(valor)}]"
+    return type(valor).__name__
+
+
+def forma_parametros(parametros, executemany: bool = False) -> str:
+    """Nombres y tipos (con largo para textos y listas) de los parámetros, sin valores."""
+    if executemany and isinstance(parametros, (list, tuple)):
+        primero = forma_parametros(parametros[0]) if parametros else "-"
+        return f"{len(parametros)} x {primero}"
+    if isinstance(parametros, dict):
+        return "{" + ", ".join(f"{k}: {_forma_valor(v)}" for k, v in parametros.items()) + "}"
+    if isinstance(parametros, (list, tuple)):
+        return "(" + ", ".join(_forma_valor(v) for v in parametros) + ")"
+    return "-" if parametros is None else _forma_valor(parametros)
+
+
+class _Agregado:
+    __slots__ = ("cantidad", "total", "maximo", "recientes", "lentas")
+
+    def __init__(self):
+        self.cantidad = 0
+        self.total = 0.0
+        self.maximo = 0.0
+        self.recientes = deque(maxlen=VENTANA)
+        self.lentas = 0
+
+    def p95(self) -> float:
+        ordenados = sorted(self.recientes)
+        return ordenados[max(0, -(-len(ordenados) * 95 // 100) - 1)] if ordenados else 0.0
+
+
+class RegistroConsultas:
+    """Agregados por huella en memoria del proceso."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._huellas: Dict[str, _Agregado] = {}
+
+    def registrar(self, sentencia: str, parametros, segundos: float, executemany: bool = False):
+        clave = huella(sentencia)
+        ms = segundos * 1000
+        lenta = ms >= UMBRAL_MS
+        with self._lock:
+            agregado = self._huellas.get(clave)
+            if agregado is None:
+                if len(self._huellas) >= MAX_HUELLAS:
+                    menor = min(self._huellas, key=lambda h: self._huellas[h].total)
+                    del self._huellas[menor]
+                agregado = self._huellas[clave] = _Agregado()
+            agregado.cantidad += 1
+            agregado.total += ms
+            agregado.maximo = max(agregado.maximo, ms)
+            agregado.recientes.append(ms)
+            agregado.lentas += lenta
+        if lenta:
+            logger.warning("Consulta lenta (%.1f ms): %s | parámetros: %s",
+                           ms, clave, forma_parametros(parametros, executemany))
+
+    def top(self, orden: str = "total", limite: int = 20) -> List[dict]:
+        """Huellas ordenadas de mayor a menor por total, p95, max o cantidad."""
+        with self._lock:
+            filas = [{
+                "huella": clave,
+                "cantidad": a.cantidad,
+                "total_ms": round(a.total, 2),
+                "promedio_ms": round(a.total / a.cantidad, 3),
+                "p95_ms": round(a.p95(), 3),
+                "max_ms": round(a.maximo, 3),
+                "lentas": a.lentas,
+            } for clave, a in self._huellas.items()]
+        campo = {"total": "total_ms", "p95": "p95_ms", "max": "max_ms",
+                 "cantidad": "cantidad"}[orden]
+        filas.sort(key=lambda f: f[campo], reverse=True)
+        return filas[:limite]
+
+    def reiniciar(self):
+        with self._lock:
+            self._huellas.clear()
+
+
+registro_consultas = RegistroConsultas()
@@ -0,0 +1,202 @@
+"""
+Transiciones de estado de los pedidos.
+
+    Pendiente -> Pagado      descuenta el stock del pedido
+    Pendiente -> Cancelado
+    Pagado    -> Cancelado   repone el stock (si PEDIDOS_CANCELAR_PAGADOS lo permite)
+
+Cancelado es final y no se vuelve a Pendiente.
+
+Cada transición es un solo UPDATE condicional, sin leer el pedido antes:
+
+    UPDATE pedido SET estado = :nuevo
+    WHERE id_pedido = :id AND estado = :esperado
+    RETURNING ...
+
+Si dos peticiones cambian el mismo pedido a la vez, la segunda espera el
+bloqueo de la fila y, al reevaluar la condición, ya no encuentra el estado
+esperado: no se puede confirmar un pedido que otra petición acaba de cancelar
+ni descontar dos veces el mismo pedido. Cuando el destino admite varios orígenes
+(Cancelado) se prueban en orden; así, cancelar un pedido que otra petición
+acaba de confirmar cancela el pedido pagado y repone lo descontado. Quien
+quiera que el cambio solo se aplique desde un estado concreto lo indica con
+`esperado`.
+
+El stock se mueve con una sentencia por tabla de inventario: suma lo que usa
+el pedido por item y actualiza todas las filas de la sucursal a la vez. El
+descuento solo toca las filas con stock suficiente; si falta alguna, la
+transición entera (estado incluido) se revierte con el SAVEPOINT. Los cambios
+se anotan con registrar_cambio() y se invalidan los ETag del inventario de la
+sucursal. Las sentencias de stock son SQL de PostgreSQL (UPDATE/INSERT dentro
+de un WITH).
+
+Configuración por variables de entorno:
+- PEDIDOS_CANCELAR_PAGADOS: "0" para no permitir cancelar pedidos pagados (1)
+"""
+import os
+from typing import Optional
+
+from fastapi import HTTPException, status
+from sqlalchemy import select, text, update
+from sqlalchemy.orm import Session
+
+from app.cache_http import invalidar, recursos_inventario
+from app.cambios_stock import registrar_cambio, TIPO_MATERIA, TIPO_PRODUCTO
+from app.models import Pedido
+from app.models.pedido import EstadoPedido
+
+PENDIENTE = EstadoPedido.PENDIENTE.value
+PAGADO = EstadoPedido.PAGADO.value
+CANCELADO = EstadoPedido.CANCELADO.value
+
+CANCELAR_PAGADOS = os.getenv("PEDIDOS_CANCELAR_PAGADOS", "1").lower() in ("1", "true", "si", "sí")
+
+# Estado de destino -> estados desde los que se puede llegar, en orden de prueba
+ORIGENES = {
+    PAGADO: (PENDIENTE,),
+    CANCELADO: (PENDIENTE, PAGADO) if CANCELAR_PAGADOS else (PENDIENTE,),
+}
+
+_MENSAJES = {
+    (PAGADO, PAGADO): "El pedido ya está pagado",
+    (CANCELADO, PAGADO): "Pedido cancelado no puede confirmarse",
+    (CANCELADO, CANCELADO): "El pedido ya está cancelado",
+}
+
+# Columnas que devuelve una transición (las de la respuesta corta)
+COLUMNAS = (Pedido.id_pedido, Pedido.id_sucursal, Pedido.estado, Pedido.metodo_pago, Pedido.total)
+
+# --------------------------
+# Movimientos de stock
+# --------------------------
+
+# tipo -> (tabla, columna del item, columna de stock, cantidades del pedido por item,
+#          mensaje si falta stock)
+_INVENTARIOS = {
+    TIPO_PRODUCTO: (
+        "inventario_productoestablecido", "id_producto_establecido", "cantidad_disponible",
+        """
+        SELECT id_producto_establecido AS id_item, SUM(cantidad) AS cantidad
+        FROM detalle_pedido
+        WHERE id_pedido = :id_pedido AND tipo_producto = 'Establecido'
+        GROUP BY id_producto_establecido
+        """,
+        "Stock insuficiente para el producto {}"
+    ),
+    TIPO_MATERIA: (
+        "inventario_materiaprima", "id_materia_prima", "cantidad_stock",
+        """
+        SELECT dpp.id_materia_prima AS id_item, SUM(dpp.cantidad) AS cantidad
+        FROM detalle_pedido dp
+        JOIN detalle_productopersonalizado dpp
+          ON dpp.id_producto_personalizado = dp.id_producto_personalizado
+        WHERE dp.id_pedido = :id_pedido
+        GROUP BY dpp.id_materia_prima
+        """,
+        "Stock insuficiente para la materia prima {}"
+    ),
+}
+
+# Sin stock suficiente la fila no se actualiza y `nuevo` queda NULL
+_DESCUENTO = """
+WITH necesario AS ({necesario}),
+descontado AS (
+    UPDATE {tabla} i
+    SET {stock} = i.{stock} - n.cantidad
+    FROM necesario n
+    WHERE i.id_sucursal = :id_sucursal
+      AND i.{item} = n.id_item
+      AND i.{stock} >= n.cantidad
+    RETURNING i.{item} AS id_item, i.{stock} AS nuevo
+)
+SELECT n.id_item, n.cantidad, d.nuevo
+FROM necesario n
+LEFT JOIN descontado d ON d.id_item = n.id_item
+ORDER BY n.id_item
+"""
+
+# Las filas de inventario que ya no existan se vuelven a crear
+_REPOSICION = """
+WITH necesario AS ({necesario}),
+repuesto AS (
+    INSERT INTO {tabla} (id_sucursal, {item}, {stock})
+    SELECT :id_sucursal, id_item, cantidad FROM necesario
+    ON CONFLICT (id_sucursal, {item})
+    DO UPDATE SET {stock} = {tabla}.{stock} + EXCLUDED.{stock}
+    RETURNING {item} AS id_item, {stock} AS nuevo
+)
+SELECT n.id_item, n.cantidad, r.nuevo
+FROM necesario n
+JOIN repuesto r ON r.id_item = n.id_item
+ORDER BY n.id_item
+"""
+
+_SENTENCIAS = {
+    (tipo, descontar): text((_DESCUENTO if descontar else _REPOSICION).format(
+        tabla=tabla, item=item, stock=stock, necesario=necesario))
+    for tipo, (tabla, item, stock, necesario, _) in _INVENTARIOS.items()
+    for descontar in (True, False)
+}
+
+
+def _mover_stock(db: Session, id_pedido: int, id_sucursal: int, descontar: bool) -> bool:
+    """
+    Descuenta (o repone) en la sucursal todo lo que usa el pedido. Devuelve
+    True si cambió alguna fila; lanza 400 si falta stock para descontar.
+    """
+    movido = False
+    for tipo, (_, _, _, _, mensaje) in _INVENTARIOS.items():
+        filas = db.execute(_SENTENCIAS[(tipo, descontar)],
+                           {"id_pedido": id_pedido, "id_sucursal": id_sucursal}).all()
+        for id_item, cantidad, nuevo in filas:
+            if nuevo is None:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                                    detail=mensaje.format(id_item))
+        for id_item, cantidad, nuevo in filas:
+            anterior = nuevo + cantidad if descontar else nuevo - cantidad
+            registrar_cambio(db, tipo, id_sucursal, id_item, anterior, nuevo,
+                             "pedido" if descontar else "cancelacion")
+            movido = True
+    return movido
+
+
+# --------------------------
+# Transiciones
+# --------------------------
+
+def transicionar(db: Session, pedido_id: int, nuevo: str,
+                 esperado: Optional[str] = None, **valores):
+    """
+    Pasa el pedido al estado `nuevo` con el efecto de stock que corresponda.
+    `valores` son otras columnas a cambiar en el mismo UPDATE (p. ej.
+    metodo_pago). Devuelve la fila del pedido (id_pedido, id_sucursal, estado,
+    metodo_pago, total); lanza 404 si no existe, 409 si no está en `esperado`
+    y 400 si su estado no admite la transición. No hace commit.
+    """
+    origenes = [origen for origen in ORIGENES.get(nuevo, ()) if esperado in (None, origen)]
+    with db.begin_nested():
+        for origen in origenes:
+            fila = db.execute(
+                update(Pedido)
+                .where(Pedido.id_pedido == pedido_id, Pedido.estado == origen)
+                .values(estado=nuevo, **valores)
+                .returning(*COLUMNAS)
+                .execution_options(synchronize_session=False)
+            ).first()
+            if fila is None:
+                continue
+            if nuevo == PAGADO or origen == PAGADO:
+                if _mover_stock(db, pedido_id, fila.id_sucursal, descontar=nuevo == PAGADO):
+                    invalidar(db, *recursos_inventario(fila.id_sucursal))
+            return fila
+
+    # Ningún UPDATE aplicó: se lee el estado solo para explicar por qué
+    actual = db.execute(select(Pedido.estado).where(Pedido.id_pedido == pedido_id)).scalar()
+    if actual is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Pedido no encontrado")
+    if esperado is not None and actual != esperado:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT,
+                            detail=f"El pedido está '{actual}', no '{esperado}'")
+    raise HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail=_MENSAJES.get((actual, nuevo), f"Un pedido '{actual}' no puede pasar a '{nuevo}'"))
@@ -0,0 +1,114 @@
+"""
+Publicación de eventos en el proceso (pub/sub) para los canales en tiempo real.
+
+`PubSubLocal` reparte cada evento a todos los suscriptores de un canal: el
+mensaje se serializa una sola vez (ya en formato SSE) y se entrega la misma
+instancia a cada cola, así que cien terminales de una sucursal cuestan lo
+mismo que una. `publicar()` puede llamarse desde los hilos del threadpool donde
+corren los endpoints síncronos; la entrega a cada cola se agenda en el event
+loop del suscriptor.
+
+El backend es local al proceso: con varios workers cada uno tiene sus propios
+suscriptores y solo ve los eventos que él mismo publica. `usar_backend()`
+permite reemplazarlo (p. ej. por uno nuevo en cada prueba).
+"""
+import asyncio
+import itertools
+import threading
+from typing import Dict, Optional, Set
+
+from app.serializacion import a_json
+
+# Eventos que puede acumular un suscriptor lento antes de perder los más viejos
+TAMANO_COLA = 100
+
+
+def canal_sucursal(id_sucursal: int) -> str:
+    return f"sucursal:{id_sucursal}"
+
+
+def formato_sse(evento: str, datos: dict, id_evento: Optional[int] = None) -> bytes:
+    """Codifica un mensaje de Server-Sent Events."""
+    partes = []
+    if id_evento is not None:
+        partes.append(f"id: {id_evento}\n".encode())
+    partes.append(f"event: {evento}\n".encode())
+    partes.append(b"data: " + a_json(datos) + b"\n\n")
+    return b"".join(partes)
+
+
+class Suscripcion:
+    """Cola de mensajes de un suscriptor, ligada al event loop que la creó."""
+
+    def __init__(self, canal: str, tamano: int = TAMANO_COLA):
+        self.canal = canal
+        self.loop = asyncio.get_running_loop()
+        self.cola: asyncio.Queue = asyncio.Queue(maxsize=tamano)
+        self.descartados = 0
+
+    def _entregar(self, mensaje: bytes):
+        # Corre en el loop del suscriptor
+        if self.cola.full():
+            self.cola.get_nowait()
+            self.descartados += 1
+        self.cola.put_nowait(mensaje)
+
+    async def siguiente(self) -> bytes:
+        return await self.cola.get()
+
+
+class PubSubLocal:
+    """Pub/sub en memoria del proceso."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._canales: Dict[str, Set[Suscripcion]] = {}
+        self._ids = itertools.count(1)
+
+    def suscribir(self, canal: str) -> Suscripcion:
+        """Debe llamarse desde una corrutina (toma el loop en curso)."""
+        suscripcion = Suscripcion(canal)
+        with self._lock:
+            self._canales.setdefault(canal, set()).add(suscripcion)
+        return suscripcion
+
+    def desuscribir(self, suscripcion: Suscripcion):
+        with self._lock:
+            suscriptores = self._canales.get(suscripcion.canal)
+            if suscriptores is not None:
+                suscriptores.discard(suscripcion)
+                if not suscriptores:
+                    del self._canales[suscripcion.canal]
+
+    def suscriptores(self, canal: str) -> int:
+        with self._lock:
+            return len(self._canales.get(canal, ()))
+
+    def publicar(self, canal: str, evento: str, datos: dict) -> int:
+        """Publica un evento; devuelve a cuántos suscriptores se entregó."""
+        with self._lock:
+            suscriptores = list(self._canales.get(canal, ()))
+        if not suscriptores:
+            return 0
+        mensaje = formato_sse(evento, datos, next(self._ids))
+        for suscripcion in suscriptores:
+            try:
+                suscripcion.loop.call_soon_threadsafe(suscripcion._entregar, mensaje)
+            except RuntimeError:
+                # El loop del suscriptor ya se cerró
+                self.desuscribir(suscripcion)
+        return len(suscriptores)
+
+
+pubsub = PubSubLocal()
+
+
+def usar_backend(backend: PubSubLocal) -> PubSubLocal:
+    """Reemplaza el backend global y devuelve el anterior."""
+    global pubsub
+    anterior, pubsub = pubsub, backend
+    return anterior
+
+
+def obtener_backend() -> PubSubLocal:
+    return pubsub
@@ -0,0 +1,185 @@
+"""
+Snapshots de inventario y consultas de stock en un instante pasado.
+
+Cada cambio de stock queda en movimiento_inventario (ver app/cambios_stock.py)
+y `tomar_snapshot()` guarda periódicamente el stock completo de cada sucursal
+en snapshot_inventario (una fila por sucursal y tipo, con arreglos de ids y
+cantidades). El stock de una sucursal en un instante T es el último snapshot
+anterior a T más los deltas entre ese snapshot y T; si no hay snapshot previo,
+se parte del stock actual y se restan los deltas posteriores a T.
+
+El snapshot diario se programa desde cron (o equivalente):
+
+    0 3 * * *  python -m app.historial_inventario snapshot
+"""
+import sys
+from datetime import datetime
+from decimal import Decimal
+from typing import Dict, Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.cambios_stock import TIPO_MATERIA, TIPO_PRODUCTO
+
+# tipo de item -> (tabla de inventario, columna del item, columna de stock, catálogo)
+TABLAS = {
+    TIPO_MATERIA: ("inventario_materiaprima", "id_materia_prima", "cantidad_stock", "materia_prima"),
+    TIPO_PRODUCTO: ("inventario_productoestablecido", "id_producto_establecido",
+                    "cantidad_disponible", "producto_establecido"),
+}
+
+ORIGENES = ("pedido", "cancelacion", "ajuste", "transferencia", "asignacion", "inicializacion")
+
+
+def tomar_snapshot(db: Session) -> dict:
+    """
+    Guarda el stock actual de todas las sucursales (no hace commit).
+
+    Bloquea las tablas de inventario en modo SHARE mientras copia: espera a que
+    terminen las escrituras en curso y frena las nuevas hasta el commit, así
+    ningún movimiento queda a la vez antes del corte y fuera del snapshot.
+    """
+    db.execute(text(
+        "LOCK TABLE inventario_materiaprima, inventario_productoestablecido IN SHARE MODE"))
+    corte = db.execute(text("SELECT clock_timestamp()")).scalar()
+    filas = {}
+    for tipo, (inventario, columna, stock, _) in TABLAS.items():
+        filas[tipo] = db.execute(text(f"""
+            INSERT INTO snapshot_inventario
+                (id_sucursal, tipo_item, fecha_corte, ids, cantidades, total_items)
+            SELECT id_sucursal, :tipo, :corte,
+                   array_agg({columna} ORDER BY {columna}),
+                   array_agg({stock} ORDER BY {columna}),
+                   count(*)
+            FROM {inventario}
+            GROUP BY id_sucursal
+        """), {"tipo": tipo, "corte": corte}).rowcount
+    return {"fecha_corte": corte, "snapshots": filas}
+
+
+def _ultimo_snapshot(db: Session, id_sucursal: int, tipo: str, fecha: datetime) -> Optional[datetime]:
+    return db.execute(text("""
+        SELECT max(fecha_corte) FROM snapshot_inventario
+        WHERE id_sucursal = :sucursal AND tipo_item = :tipo AND fecha_corte <= :fecha
+    """), {"sucursal": id_sucursal, "tipo": tipo, "fecha": fecha}).scalar()
+
+
+def stock_en(db: Session, id_sucursal: int, tipo: str, fecha: datetime):
+    """
+    Stock de cada item de la sucursal en `fecha`.
+    Devuelve ({id_item: cantidad}, método) con método 'snapshot' o 'actual'.
+    """
+    inventario, columna, stock, _ = TABLAS[tipo]
+    parametros = {"sucursal": id_sucursal, "tipo": tipo, "fecha": fecha}
+    corte = _ultimo_snapshot(db, id_sucursal, tipo, fecha)
+
+    if corte is not None:
+        parametros["corte"] = corte
+        filas = db.execute(text("""
+            WITH base AS (
+                SELECT u.id_item, u.cantidad
+                FROM snapshot_inventario s,
+                     unnest(s.ids, s.cantidades) AS u(id_item, cantidad)
+                WHERE s.id_sucursal = :sucursal AND s.tipo_item = :tipo
+                AND s.fecha_corte = :corte
+            ),
+            deltas AS (
+                SELECT id_item, sum(delta) AS delta
+                FROM movimiento_inventario
+                WHERE id_sucursal = :sucursal AND tipo_item = :tipo
+                AND fecha > :corte AND fecha <= :fecha
+                GROUP BY id_item
+            )
+            SELECT coalesce(b.id_item, d.id_item),
+                   coalesce(b.cantidad, 0) + coalesce(d.delta, 0)
+            FROM base b
+            FULL JOIN deltas d ON d.id_item = b.id_item
+        """), parametros).all()
+        return dict(filas), "snapshot"
+
+    # Sin snapshot previo: stock actual menos lo que cambió después de la fecha
+    filas = db.execute(text(f"""
+        SELECT i.{columna}, i.{stock} - coalesce(d.delta, 0)
+        FROM {inventario} i
+        LEFT JOIN (
+            SELECT id_item, sum(delta) AS delta
+            FROM movimiento_inventario
+            WHERE id_sucursal = :sucursal AND tipo_item = :tipo AND fecha > :fecha
+            GROUP BY id_item
+        ) d ON d.id_item = i.{columna}
+        WHERE i.id_sucursal = :sucursal
+    """), parametros).all()
+    return dict(filas), "actual"
+
+
+def reporte_variacion(db: Session, id_sucursal: int, tipo: str,
+                      desde: datetime, hasta: datetime) -> dict:
+    """
+    Variación de stock por item entre dos instantes, desglosada por origen del
+    movimiento. La merma es la suma de los ajustes negativos (faltantes
+    detectados en los conteos).
+    """
+    inicial, metodo_inicial = stock_en(db, id_sucursal, tipo, desde)
+    final, metodo_final = stock_en(db, id_sucursal, tipo, hasta)
+    _, columna, _, catalogo = TABLAS[tipo]
+
+    movimientos: Dict[int, dict] = {}
+    for id_item, origen, suma, merma in db.execute(text("""
+        SELECT id_item, origen, sum(delta),
+               sum(delta) FILTER (WHERE origen = 'ajuste' AND delta < 0)
+        FROM movimiento_inventario
+        WHERE id_sucursal = :sucursal AND tipo_item = :tipo
+        AND fecha > :desde AND fecha <= :hasta
+        GROUP BY id_item, origen
+    """), {"sucursal": id_sucursal, "tipo": tipo, "desde": desde, "hasta": hasta}):
+        item = movimientos.setdefault(id_item, {"merma": Decimal("0")})
+        item[origen] = suma
+        if merma:
+            item["merma"] += -merma
+
+    ids = set(inicial) | set(final) | set(movimientos)
+    nombres = dict(db.execute(
+        text(f"SELECT {columna}, nombre FROM {catalogo} WHERE {columna} = ANY(:ids)"),
+        {"ids": list(ids)}
+    ).all()) if ids else {}
+
+    items = []
+    for id_item in sorted(ids):
+        mov = movimientos.get(id_item, {})
+        stock_inicial = Decimal(inicial.get(id_item, 0))
+        stock_final = Decimal(final.get(id_item, 0))
+        items.append({
+            "id_item": id_item,
+            "nombre": nombres.get(id_item),
+            "stock_inicial": stock_inicial,
+            "stock_final": stock_final,
+            "variacion": stock_final - stock_inicial,
+            **{origen: mov.get(origen, Decimal("0")) for origen in ORIGENES},
+            "merma": mov.get("merma", Decimal("0")),
+        })
+    return {
+        "id_sucursal": id_sucursal,
+        "tipo_item": tipo,
+        "desde": desde,
+        "hasta": hasta,
+        "metodo": "snapshot" if "snapshot" in (metodo_inicial, metodo_final) else "actual",
+        "items": items,
+    }
+
+
+if __name__ == "__main__":
+    from app.database import SessionLocal
+
+    if len(sys.argv) < 2 or sys.argv[1] != "snapshot":
+        print("Uso: python -m app.historial_inventario snapshot")
+        sys.exit(1)
+
+    db = SessionLocal()
+    try:
+        resultado = tomar_snapshot(db)
+        db.commit()
+    finally:
+        db.close()
+    print(f"Snapshot {resultado['fecha_corte']}: "
+          + ", ".join(f"{tipo}={n} sucursales" for tipo, n in resultado["snapshots"].items()))
@@ -0,0 +1,114 @@
+"""
+Idempotency-Key para las escrituras de pedidos que los terminales reintentan.
+
+Un terminal con mala conexión reintenta POST /pedidos/ si no recibe respuesta;
+sin clave, cada reintento crea otro pedido (y otros productos personalizados).
+Con el encabezado `Idempotency-Key`, la primera petición inserta la clave
+(clave, usuario) en clave_idempotencia y guarda su respuesta antes del commit,
+en la misma transacción que el pedido. Un reintento posterior recibe esa
+respuesta sin volver a ejecutar nada (una lectura por clave primaria), con los
+mismos encabezados propios de la primera (p. ej. `Preference-Applied`) más
+`Idempotent-Replayed: true`.
+
+Dos peticiones simultáneas con la misma clave se resuelven con la clave
+primaria: el INSERT ... ON CONFLICT DO NOTHING de la segunda espera a que la
+primera termine. Si la primera confirma, la segunda devuelve su respuesta; si
+falla (p. ej. stock insuficiente), la clave desaparece con el rollback y la
+segunda se ejecuta normalmente. Las respuestas de error no se guardan.
+
+Usar la misma clave con otro cuerpo u otra operación devuelve 422.
+
+Las claves duran al menos IDEMPOTENCIA_TTL_HORAS (24); las más viejas se
+borran con `python -m app.idempotencia` (p. ej. desde cron cada hora).
+"""
+import hashlib
+import os
+from typing import Any, Optional
+
+from fastapi import HTTPException, Response, status
+from sqlalchemy import select, text, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.models import ClaveIdempotencia
+from app.serializacion import a_json
+
+TTL_HORAS = int(os.getenv("IDEMPOTENCIA_TTL_HORAS", "24"))
+ENCABEZADO_REPETIDA = "Idempotent-Replayed"
+
+
+def _huella(operacion: str, cuerpo: Any) -> str:
+    return hashlib.sha256(operacion.encode() + b"\n" + a_json(cuerpo)).hexdigest()
+
+
+def reservar_clave(db: Session, clave: str, id_personal: int, operacion: str,
+                   cuerpo: Any = None) -> Optional[Response]:
+    """
+    Registra la clave en la transacción actual. Devuelve None si es nueva (hay
+    que procesar la petición y llamar a `guardar_respuesta` antes del commit) o
+    la respuesta guardada si la clave ya se usó para la misma petición.
+    """
+    huella = _huella(operacion, cuerpo)
+    nueva = db.execute(
+        pg_insert(ClaveIdempotencia)
+        .values(clave=clave, id_personal=id_personal, huella=huella)
+        .on_conflict_do_nothing()
+        .returning(ClaveIdempotencia.clave)
+    ).first()
+    if nueva is not None:
+        return None
+
+    guardada = db.execute(
+        select(ClaveIdempotencia.huella, ClaveIdempotencia.estado_http, ClaveIdempotencia.respuesta,
+               ClaveIdempotencia.encabezados)
+        .where(ClaveIdempotencia.clave == clave, ClaveIdempotencia.id_personal == id_personal)
+    ).first()
+    if guardada is None or guardada.estado_http is None:
+        # Borrada por la limpieza entre el INSERT y el SELECT: el cliente reintenta
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT,
+                            detail="Idempotency-Key en uso, reintentar")
+    if guardada.huella != huella:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                            detail="Idempotency-Key ya usada con otra petición")
+    return Response(content=guardada.respuesta, status_code=guardada.estado_http,
+                    media_type="application/json",
+                    headers={**(guardada.encabezados or {}), ENCABEZADO_REPETIDA: "true"})
+
+
+def guardar_respuesta(db: Session, clave: str, id_personal: int, contenido,
+                      estado_http: int, encabezados: Optional[dict] = None) -> Response:
+    """
+    Guarda la respuesta de una clave reservada (sin commit) y la devuelve ya
+    serializada: la primera respuesta y las repetidas son los mismos bytes y
+    llevan los mismos `encabezados`.
+    """
+    if hasattr(contenido, "model_dump"):
+        contenido = contenido.model_dump(mode="json")
+    cuerpo = a_json(contenido)
+    db.execute(
+        update(ClaveIdempotencia)
+        .where(ClaveIdempotencia.clave == clave, ClaveIdempotencia.id_personal == id_personal)
+        .values(estado_http=estado_http, respuesta=cuerpo, encabezados=encabezados)
+    )
+    return Response(content=cuerpo, status_code=estado_http, media_type="application/json",
+                    headers=encabezados)
+
+
+def limpiar_claves(db: Session, horas: int = TTL_HORAS) -> int:
+    """Borra las claves con más de `horas` horas. Devuelve cuántas borró."""
+    borradas = db.execute(
+        text("DELETE FROM clave_idempotencia WHERE fecha_creacion < now() - make_interval(hours => :horas)"),
+        {"horas": horas}
+    ).rowcount
+    db.commit()
+    return borradas
+
+
+if __name__ == "__main__":
+    from app.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        print(f"{limpiar_claves(db)} claves de idempotencia borradas")
+    finally:
+        db.close()
@@ -7,17 +7,26 @@ from app.routers.personal import router as personal_router
 from app.routers.sucursal import router as sucursal_router
 from app.routers.cliente import router as cliente_router
 from app.routers.productos import router as productos_router
+from app.routers.recetas import router as recetas_router
 from app.routers.inventario import router as inventario_router
 from app.routers.pedidos import router as pedidos_router
 from app.routers.reportes import router as reportes_router
 from app.routers.predicciones import router as predicciones_router
 from app.routers.backups import router as backups_router
+from app.routers.metricas import router as metricas_router
+from app.routers.diagnostico import router as diagnostico_router
+from app.serializacion import RespuestaJSONRapida
+from app.compresion import CompresionMiddleware
+from app.metricas import MetricasMiddleware
+from app.perfilado import PerfiladoMiddleware, instrumentar
+
 app = FastAPI(
     title="API Heladería",
     description="Sistema de gestión para heladerías",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=RespuestaJSONRapida
 )
 app.add_middleware(
     CORSMiddleware,
@@ -26,6 +35,12 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Compresión gzip/brotli de respuestas grandes (configurable por entorno)
+app.add_middleware(CompresionMiddleware)
+# Perfilado a pedido (X-Perfilar / ?perfilar), solo administradores
+app.add_middleware(PerfiladoMiddleware)
+# Latencias por ruta, consultas SQL por petición y encabezado Server-Timing
+app.add_middleware(MetricasMiddleware)
 
 # Incluir todos los routers
 app.include_router(auth_router)
@@ -33,11 +48,17 @@ app.include_router(personal_router)
 app.include_router(sucursal_router)
 app.include_router(cliente_router)
 app.include_router(productos_router)
+app.include_router(recetas_router)
 app.include_router(inventario_router)
 app.include_router(pedidos_router)
 app.include_router(reportes_router)
 app.include_router(predicciones_router)
 app.include_router(backups_router)
+app.include_router(metricas_router)
+app.include_router(diagnostico_router)
+
+# Después de registrar los routers: envuelve los endpoints para el perfilado
+instrumentar(app)
 
 # Endpoint básico de healthcheck
 
@@ -0,0 +1,241 @@
+"""
+Métricas de peticiones HTTP y de base de datos en formato Prometheus.
+
+`MetricasMiddleware` registra por ruta (la plantilla, p. ej. /pedidos/{pedido_id})
+histogramas de latencia, tamaño de respuesta, cantidad de consultas SQL y tiempo
+en base de datos, además de contadores por código de estado y las peticiones en
+curso. Las consultas se cuentan con eventos de SQLAlchemy sobre el cursor y se
+asocian a la petición actual mediante un ContextVar, que también llega a los
+endpoints síncronos que FastAPI ejecuta en el threadpool.
+
+Cada respuesta lleva un encabezado Server-Timing con el tiempo total, el tiempo
+en base de datos y la cantidad de consultas, así un N+1 se ve desde el navegador.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.consultas_lentas import registro_consultas
+
+BUCKETS_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BUCKETS_BYTES = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+BUCKETS_CONSULTAS = (1, 2, 3, 5, 10, 20, 50, 100, 250)
+
+# Rutas que no se miden (el propio endpoint de métricas)
+RUTAS_EXCLUIDAS = {"/metrics"}
+
+
+class EstadisticasPeticion:
+    """
+    Acumuladores de una petición en curso. `sql` es None salvo cuando la
+    petición se está perfilando (app/perfilado.py): entonces recibe cada
+    sentencia con su duración.
+    """
+    __slots__ = ("consultas", "segundos_db", "sql")
+
+    def __init__(self):
+        self.consultas = 0
+        self.segundos_db = 0.0
+        self.sql = None
+
+
+_peticion_actual: ContextVar[Optional[EstadisticasPeticion]] = ContextVar(
+    "peticion_actual", default=None)
+
+
+def peticion_actual() -> Optional[EstadisticasPeticion]:
+    """Estadísticas de la petición en curso (None fuera de una petición)."""
+    return _peticion_actual.get()
+
+
+class _Histograma:
+    __slots__ = ("buckets", "conteos", "suma", "total")
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.conteos = [0] * (len(buckets) + 1)
+        self.suma = 0.0
+        self.total = 0
+
+    def observar(self, valor: float):
+        self.conteos[bisect_left(self.buckets, valor)] += 1
+        self.suma += valor
+        self.total += 1
+
+
+def _etiquetas(**etiquetas) -> str:
+    partes = []
+    for nombre, valor in etiquetas.items():
+        valor = str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        partes.append(f'{nombre}="{valor}"')
+    return ",".join(partes)
+
+
+class RegistroMetricas:
+    """Registro en memoria del proceso; se expone con `exponer()`."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.en_curso = 0
+        self.peticiones: Dict[Tuple[str, str, int], int] = {}
+        self.latencia: Dict[Tuple[str, str], _Histograma] = {}
+        self.bytes_respuesta: Dict[Tuple[str, str], _Histograma] = {}
+        self.consultas: Dict[Tuple[str, str], _Histograma] = {}
+        self.tiempo_db: Dict[Tuple[str, str], _Histograma] = {}
+        self.consulta_db = _Histograma(BUCKETS_LATENCIA)
+
+    def _hist(self, tabla: dict, clave, buckets) -> _Histograma:
+        hist = tabla.get(clave)
+        if hist is None:
+            hist = tabla[clave] = _Histograma(buckets)
+        return hist
+
+    def iniciar_peticion(self):
+        with self._lock:
+            self.en_curso += 1
+
+    def finalizar_peticion(self, metodo: str, ruta: str, estado: int, segundos: float,
+                           tamano: int, estad: EstadisticasPeticion):
+        clave = (metodo, ruta)
+        with self._lock:
+            self.en_curso -= 1
+            self.peticiones[(metodo, ruta, estado)] = self.peticiones.get(
+                (metodo, ruta, estado), 0) + 1
+            self._hist(self.latencia, clave, BUCKETS_LATENCIA).observar(segundos)
+            self._hist(self.bytes_respuesta, clave, BUCKETS_BYTES).observar(tamano)
+            self._hist(self.consultas, clave, BUCKETS_CONSULTAS).observar(estad.consultas)
+            self._hist(self.tiempo_db, clave, BUCKETS_LATENCIA).observar(estad.segundos_db)
+
+    def observar_consulta(self, segundos: float):
+        with self._lock:
+            self.consulta_db.observar(segundos)
+
+    @staticmethod
+    def _lineas_histograma(nombre: str, hist: _Histograma, **etiquetas) -> list:
+        lineas = []
+        acumulado = 0
+        base = _etiquetas(**etiquetas)
+        sep = "," if base else ""
+        for limite, conteo in zip(hist.buckets, hist.conteos):
+            acumulado += conteo
+            lineas.append(f'{nombre}_bucket{{{base}{sep}le="{limite}"}} {acumulado}')
+        lineas.append(f'{nombre}_bucket{{{base}{sep}le="+Inf"}} {hist.total}')
+        llaves = f"{{{base}}}" if base else ""
+        lineas.append(f"{nombre}_sum{llaves} {hist.suma}")
+        lineas.append(f"{nombre}_count{llaves} {hist.total}")
+        return lineas
+
+    def exponer(self) -> str:
+        """Texto en formato de exposición de Prometheus (versión 0.0.4)."""
+        with self._lock:
+            lineas = [
+                "# HELP http_peticiones_en_curso Peticiones HTTP en curso",
+                "# TYPE http_peticiones_en_curso gauge",
+                f"http_peticiones_en_curso {self.en_curso}",
+                "# HELP http_peticiones_total Peticiones HTTP por ruta y código de estado",
+                "# TYPE http_peticiones_total counter",
+            ]
+            for (metodo, ruta, estado), total in sorted(self.peticiones.items()):
+                lineas.append(
+                    f"http_peticiones_total{{{_etiquetas(metodo=metodo, ruta=ruta, estado=estado)}}} {total}")
+
+            histogramas = (
+                ("http_peticion_duracion_segundos", "Latencia de las peticiones HTTP", self.latencia),
+                ("http_respuesta_bytes", "Tamaño del cuerpo de las respuestas HTTP", self.bytes_respuesta),
+                ("db_consultas_por_peticion", "Consultas SQL ejecutadas por petición", self.consultas),
+                ("db_tiempo_por_peticion_segundos", "Tiempo en base de datos por petición", self.tiempo_db),
+            )
+            for nombre, ayuda, tabla in histogramas:
+                lineas.append(f"# HELP {nombre} {ayuda}")
+                lineas.append(f"# TYPE {nombre} histogram")
+                for (metodo, ruta), hist in sorted(tabla.items()):
+                    lineas.extend(self._lineas_histograma(nombre, hist, metodo=metodo, ruta=ruta))
+
+            lineas.append("# HELP db_consulta_duracion_segundos Duración de cada consulta SQL")
+            lineas.append("# TYPE db_consulta_duracion_segundos histogram")
+            lineas.extend(self._lineas_histograma("db_consulta_duracion_segundos", self.consulta_db))
+        return "\n".join(lineas) + "\n"
+
+
+registro = RegistroMetricas()
+
+
+# --------------------------
+# Eventos de SQLAlchemy
+# --------------------------
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _antes_de_consulta(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("_inicios_consulta", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _despues_de_consulta(conn, cursor, statement, parameters, context, executemany):
+    segundos = time.perf_counter() - conn.info["_inicios_consulta"].pop()
+    registro.observar_consulta(segundos)
+    registro_consultas.registrar(statement, parameters, segundos, executemany)
+    estad = _peticion_actual.get()
+    if estad is not None:
+        estad.consultas += 1
+        estad.segundos_db += segundos
+        if estad.sql is not None:
+            estad.sql.append((statement, segundos))
+
+
+@event.listens_for(Engine, "handle_error")
+def _error_de_consulta(contexto):
+    inicios = contexto.connection.info.get("_inicios_consulta") if contexto.connection else None
+    if inicios:
+        inicios.pop()
+
+
+# --------------------------
+# Middleware
+# --------------------------
+
+class MetricasMiddleware:
+    """Middleware ASGI que mide cada petición y agrega el encabezado Server-Timing."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in RUTAS_EXCLUIDAS:
+            await self.app(scope, receive, send)
+            return
+
+        estad = EstadisticasPeticion()
+        token = _peticion_actual.set(estad)
+        inicio = time.perf_counter()
+        estado = 500
+        tamano = 0
+
+        async def enviar(message):
+            nonlocal estado, tamano
+            if message["type"] == "http.response.start":
+                estado = message["status"]
+                total_ms = (time.perf_counter() - inicio) * 1000
+                timing = (f'app;dur={total_ms:.1f}, '
+                          f'db;dur={estad.segundos_db * 1000:.1f};desc="{estad.consultas} consultas"')
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"server-timing", timing.encode("latin-1"))]
+            elif message["type"] == "http.response.body":
+                tamano += len(message.get("body", b""))
+            await send(message)
+
+        registro.iniciar_peticion()
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            ruta = scope.get("route")
+            # Sin ruta (404) se agrupa todo para no crear una serie por URL
+            plantilla = getattr(ruta, "path", None) or "sin_ruta"
+            registro.finalizar_peticion(
+                scope["method"], plantilla, estado,
+                time.perf_counter() - inicio, tamano, estad)
+            _peticion_actual.reset(token)
@@ -12,10 +12,21 @@ from .producto_personalizado import ProductoPersonalizado
 from .detalle_producto_personalizado import DetalleProductoPersonalizado
 from .detalle_pedido import DetallePedido
 from .cliente import Cliente
+from .version_recurso import VersionRecurso
+from .transferencia import Transferencia
+from .detalle_transferencia import DetalleTransferencia
+from .movimiento_inventario import MovimientoInventario
+from .snapshot_inventario import SnapshotInventario
+from .pedido_archivo import PedidoArchivo
+from .clave_idempotencia import ClaveIdempotencia
+from .receta import Receta
+from .detalle_receta import DetalleReceta
 # ...otros modelos
 
 
 __all__ = ["Base", 'Personal', 'Pedido', 'Rol',
            'Sucursal', "InventarioMateriaPrima", "InventarioProductoEstablecido", "ProductoEstablecido",
-           "Materia_Prima", "ProductoPersonalizado", "DetalleProductoPersonalizado", "DetallePedido", "MateriaPrima", "Cliente"
+           "Materia_Prima", "ProductoPersonalizado", "DetalleProductoPersonalizado", "DetallePedido", "MateriaPrima", "Cliente", "VersionRecurso",
+           "Transferencia", "DetalleTransferencia", "MovimientoInventario", "SnapshotInventario", "PedidoArchivo",
+           "ClaveIdempotencia", "Receta", "DetalleReceta"
            ]
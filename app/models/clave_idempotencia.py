@@ -0,0 +1,59 @@
+from datetime import datetime
+from sqlalchemy import String, Integer, LargeBinary, JSON, TIMESTAMP, ForeignKey, Index, func
+from sqlalchemy.orm import Mapped, mapped_column
+from .base import Base
+
+
+class ClaveIdempotencia(Base):
+    """
+    Idempotency-Key recibida por un usuario (ver app/idempotencia.py): la
+    primera petición la inserta y guarda su respuesta en la misma transacción;
+    los reintentos con la misma clave devuelven esa respuesta.
+    """
+    __tablename__ = 'clave_idempotencia'
+    __table_args__ = (
+        # Limpieza por antigüedad
+        Index('ix_clave_idempotencia_fecha', 'fecha_creacion'),
+        {'comment': 'Respuestas guardadas por Idempotency-Key y usuario'},
+    )
+
+    clave: Mapped[str] = mapped_column(
+        String(100),
+        primary_key=True,
+        name="clave"
+    )
+    id_personal: Mapped[int] = mapped_column(
+        Integer,
+        ForeignKey("personal.id_personal", ondelete="CASCADE"),
+        primary_key=True,
+        name="id_personal"
+    )
+    # sha256 de la operación y el cuerpo: detecta una clave reutilizada con otra petición
+    huella: Mapped[str] = mapped_column(
+        String(64),
+        nullable=False,
+        name="huella"
+    )
+    estado_http: Mapped[int | None] = mapped_column(
+        Integer,
+        name="estado_http"
+    )
+    respuesta: Mapped[bytes | None] = mapped_column(
+        LargeBinary,
+        name="respuesta"
+    )
+    # Encabezados propios de la respuesta (p. ej. Preference-Applied) que se repiten
+    encabezados: Mapped[dict | None] = mapped_column(
+        JSON,
+        name="encabezados"
+    )
+    fecha_creacion: Mapped[datetime] = mapped_column(
+        TIMESTAMP(timezone=True),
+        nullable=False,
+        server_default=func.now(),  # pylint: disable=not-callable
+        name="fecha_creacion"
+    )
+
+    def __repr__(self) -> str:
+        return (f"<ClaveIdempotencia(clave='{self.clave}', personal={self.id_personal}, "
+                f"estado={self.estado_http})>")
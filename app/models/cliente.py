@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import String, TIMESTAMP
+from sqlalchemy import String, TIMESTAMP, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from .base import Base
 
@@ -25,7 +25,7 @@ class Cliente(Base):
     )
     fecha_registro: Mapped[datetime] = mapped_column(
         TIMESTAMP(timezone=True),
-        server_default="CURRENT_TIMESTAMP",
+        server_default=text("CURRENT_TIMESTAMP"),
         name="fecha_registro"
     )
 
@@ -1,5 +1,5 @@
 from decimal import Decimal
-from sqlalchemy import String, Integer, Numeric, ForeignKey, CheckConstraint, Computed
+from sqlalchemy import String, Integer, Numeric, ForeignKey, CheckConstraint, Computed, Index, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from .base import Base
 
@@ -16,6 +16,20 @@ class DetallePedido(Base):
             "(tipo_producto = 'Personalizado' AND id_producto_personalizado IS NOT NULL AND id_producto_establecido IS NULL)",
             name="chk_tipo_producto"
         ),
+        Index('ix_detalle_pedido_pedido', 'id_pedido'),
+        # Ventas por producto establecido (los personalizados tienen NULL)
+        Index(
+            'ix_detalle_pedido_producto_establecido',
+            'id_producto_establecido', 'id_pedido',
+            postgresql_where=text('id_producto_establecido IS NOT NULL'),
+            postgresql_include=['cantidad', 'subtotal']
+        ),
+        # FK desde detalle_pedido al borrar productos personalizados (archivo)
+        Index(
+            'ix_detalle_pedido_producto_personalizado',
+            'id_producto_personalizado',
+            postgresql_where=text('id_producto_personalizado IS NOT NULL')
+        ),
     )
 
     id_detalle_pedido: Mapped[int] = mapped_column(
@@ -0,0 +1,38 @@
+from decimal import Decimal
+from sqlalchemy import Numeric, ForeignKey
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+from .base import Base
+
+
+class DetalleReceta(Base):
+    __tablename__ = 'detalle_receta'
+    __table_args__ = (
+        {'comment': 'Materias primas y cantidades de cada receta'},
+    )
+
+    id_receta: Mapped[int] = mapped_column(
+        ForeignKey("receta.id_receta"),
+        primary_key=True,
+        name="id_receta"
+    )
+    id_materia_prima: Mapped[int] = mapped_column(
+        ForeignKey("materia_prima.id_materia_prima"),
+        primary_key=True,
+        name="id_materia_prima"
+    )
+    cantidad: Mapped[Decimal] = mapped_column(
+        Numeric(5, 2),
+        nullable=False,
+        name="cantidad"
+    )
+
+    # Relaciones
+    receta: Mapped["Receta"] = relationship(back_populates="detalles")
+    materia_prima: Mapped["MateriaPrima"] = relationship(
+        back_populates="detalles_recetas"
+    )
+
+    def __repr__(self) -> str:
+        return (f"<DetalleReceta(receta={self.id_receta}, "
+                f"materia={self.id_materia_prima}, "
+                f"cantidad={self.cantidad})>")
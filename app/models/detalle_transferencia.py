@@ -0,0 +1,76 @@
+from decimal import Decimal
+from sqlalchemy import String, Integer, Numeric, ForeignKey, CheckConstraint
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+from .base import Base
+
+
+class DetalleTransferencia(Base):
+    __tablename__ = 'detalle_transferencia'
+    __table_args__ = (
+        CheckConstraint(
+            "(tipo_item = 'materia_prima' AND id_materia_prima IS NOT NULL AND id_producto_establecido IS NULL) OR "
+            "(tipo_item = 'producto' AND id_producto_establecido IS NOT NULL AND id_materia_prima IS NULL)",
+            name="chk_tipo_item_transferencia"
+        ),
+        CheckConstraint(
+            "id_sucursal_origen <> id_sucursal_destino",
+            name="chk_sucursales_distintas"
+        ),
+        CheckConstraint("cantidad > 0", name="chk_cantidad_transferencia"),
+    )
+
+    id_detalle_transferencia: Mapped[int] = mapped_column(
+        primary_key=True,
+        autoincrement=True,
+        name="id_detalle_transferencia"
+    )
+    id_transferencia: Mapped[int] = mapped_column(
+        Integer,
+        ForeignKey("transferencia.id_transferencia"),
+        nullable=False,
+        index=True,
+        name="id_transferencia"
+    )
+    tipo_item: Mapped[str] = mapped_column(
+        String(20),
+        nullable=False,
+        name="tipo_item"
+    )
+    id_materia_prima: Mapped[int | None] = mapped_column(
+        Integer,
+        ForeignKey("materia_prima.id_materia_prima"),
+        name="id_materia_prima"
+    )
+    id_producto_establecido: Mapped[int | None] = mapped_column(
+        Integer,
+        ForeignKey("producto_establecido.id_producto_establecido"),
+        name="id_producto_establecido"
+    )
+    id_sucursal_origen: Mapped[int] = mapped_column(
+        Integer,
+        ForeignKey("sucursal.id_sucursal"),
+        nullable=False,
+        name="id_sucursal_origen"
+    )
+    id_sucursal_destino: Mapped[int] = mapped_column(
+        Integer,
+        ForeignKey("sucursal.id_sucursal"),
+        nullable=False,
+        name="id_sucursal_destino"
+    )
+    cantidad: Mapped[Decimal] = mapped_column(
+        Numeric(10, 2),
+        nullable=False,
+        name="cantidad"
+    )
+
+    transferencia: Mapped["Transferencia"] = relationship(back_populates="detalles")
+
+    @property
+    def id_item(self) -> int:
+        return self.id_materia_prima if self.tipo_item == 'materia_prima' else self.id_producto_establecido
+
+    def __repr__(self) -> str:
+        return (f"<DetalleTransferencia(id={self.id_detalle_transferencia}, "
+                f"tipo={self.tipo_item}, item={self.id_item}, "
+                f"{self.id_sucursal_origen}->{self.id_sucursal_destino}, cantidad={self.cantidad})>")
@@ -1,5 +1,5 @@
 from decimal import Decimal
-from sqlalchemy import Numeric, Integer, ForeignKey, PrimaryKeyConstraint
+from sqlalchemy import Numeric, Integer, ForeignKey, PrimaryKeyConstraint, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from .base import Base
 
@@ -12,6 +12,8 @@ class InventarioMateriaPrima(Base):
             'id_materia_prima',
             name='pk_sucursal_materia'
         ),
+        # Acceso desde el catálogo (alertas por materia en todas las sucursales)
+        Index('ix_inventario_materiaprima_materia', 'id_materia_prima', 'cantidad_stock'),
     )
 
     id_sucursal: Mapped[int] = mapped_column(
@@ -1,13 +1,17 @@
 from decimal import Decimal
-from sqlalchemy import Integer, Numeric, ForeignKey
+from sqlalchemy import Integer, Numeric, ForeignKey, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from .base import Base
 
 
 class InventarioProductoEstablecido(Base):
     __tablename__ = 'inventario_productoestablecido'
-    __table_args__ = {
-        'comment': 'Inventario de productos terminados por sucursal'}
+    __table_args__ = (
+        # Acceso desde el catálogo (alertas por producto en todas las sucursales)
+        Index('ix_inventario_productoestablecido_producto',
+              'id_producto_establecido', 'cantidad_disponible'),
+        {'comment': 'Inventario de productos terminados por sucursal'},
+    )
 
     # Clave primaria compuesta (se mantiene igual)
     id_sucursal: Mapped[int] = mapped_column(
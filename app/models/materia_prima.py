@@ -1,6 +1,6 @@
 from datetime import date
 from decimal import Decimal
-from sqlalchemy import Numeric, String, Date, CheckConstraint
+from sqlalchemy import Numeric, String, Date, CheckConstraint, Index, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from .base import Base
 
@@ -12,6 +12,11 @@ class MateriaPrima(Base):
             "unidad IN ('kg', 'litro', 'unidad', 'gramo')",
             name="check_unidad_valida"
         ),
+        Index(
+            'ix_materia_prima_fecha_caducidad',
+            'fecha_caducidad',
+            postgresql_where=text('fecha_caducidad IS NOT NULL')
+        ),
     )
 
     id_materia_prima: Mapped[int] = mapped_column(
@@ -49,6 +54,9 @@ class MateriaPrima(Base):
     detalles_productos: Mapped[list["DetalleProductoPersonalizado"]] = relationship(
         back_populates="materia_prima"
     )
+    detalles_recetas: Mapped[list["DetalleReceta"]] = relationship(
+        back_populates="materia_prima"
+    )
 
     def __repr__(self) -> str:
         return f"<MateriaPrima(id={self.id_materia_prima}, nombre='{self.nombre}', unidad='{self.unidad}')>"
@@ -0,0 +1,73 @@
+from datetime import datetime
+from decimal import Decimal
+from sqlalchemy import BigInteger, Integer, String, Numeric, TIMESTAMP, ForeignKey, CheckConstraint, Index, text
+from sqlalchemy.orm import Mapped, mapped_column
+from .base import Base
+
+
+class MovimientoInventario(Base):
+    __tablename__ = 'movimiento_inventario'
+    __table_args__ = (
+        CheckConstraint(
+            "tipo_item IN ('materia_prima', 'producto')",
+            name="check_tipo_item_movimiento"
+        ),
+        # Deltas de una sucursal entre dos instantes (historial y variaciones)
+        Index('ix_movimiento_inventario_sucursal_fecha',
+              'id_sucursal', 'tipo_item', 'fecha'),
+        {'comment': 'Cambios de stock (delta por fila y transacción) entre snapshots'},
+    )
+
+    id_movimiento: Mapped[int] = mapped_column(
+        BigInteger,
+        primary_key=True,
+        autoincrement=True,
+        name="id_movimiento"
+    )
+    # clock_timestamp(): hora real de la escritura, no la de inicio de la transacción
+    fecha: Mapped[datetime] = mapped_column(
+        TIMESTAMP(timezone=True),
+        nullable=False,
+        server_default=text("clock_timestamp()"),
+        name="fecha"
+    )
+    id_sucursal: Mapped[int] = mapped_column(
+        Integer,
+        ForeignKey("sucursal.id_sucursal"),
+        nullable=False,
+        name="id_sucursal"
+    )
+    tipo_item: Mapped[str] = mapped_column(
+        String(20),
+        nullable=False,
+        name="tipo_item"
+    )
+    id_item: Mapped[int] = mapped_column(
+        Integer,
+        nullable=False,
+        name="id_item"
+    )
+    cantidad_anterior: Mapped[Decimal] = mapped_column(
+        Numeric(12, 2),
+        nullable=False,
+        name="cantidad_anterior"
+    )
+    cantidad_nueva: Mapped[Decimal] = mapped_column(
+        Numeric(12, 2),
+        nullable=False,
+        name="cantidad_nueva"
+    )
+    delta: Mapped[Decimal] = mapped_column(
+        Numeric(12, 2),
+        nullable=False,
+        name="delta"
+    )
+    origen: Mapped[str] = mapped_column(
+        String(20),
+        nullable=False,
+        name="origen"
+    )
+
+    def __repr__(self) -> str:
+        return (f"<MovimientoInventario(sucursal={self.id_sucursal}, {self.tipo_item}={self.id_item}, "
+                f"delta={self.delta}, origen='{self.origen}', fecha={self.fecha})>")
@@ -1,7 +1,7 @@
 from datetime import datetime
 from enum import Enum
 from decimal import Decimal
-from sqlalchemy import String, Integer, TIMESTAMP, ForeignKey, CheckConstraint, Numeric, func
+from sqlalchemy import String, Integer, TIMESTAMP, ForeignKey, CheckConstraint, Numeric, Index, func, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from .base import Base
 
@@ -29,6 +29,17 @@ class Pedido(Base):
             "metodo_pago IS NULL OR metodo_pago IN ('Efectivo', 'Tarjeta', 'Transferencia')",
             name="check_metodo_pago_valido"
         ),
+        # Listados por sucursal, del más reciente al más antiguo (con o sin estado)
+        Index('ix_pedido_sucursal_fecha', 'id_sucursal', text('fecha_pedido DESC')),
+        Index('ix_pedido_sucursal_estado_fecha', 'id_sucursal', 'estado', text('fecha_pedido DESC')),
+        # Reportes: solo pedidos pagados en un rango de fechas. Las columnas
+        # incluidas permiten agregar sin leer la tabla (index-only scan)
+        Index(
+            'ix_pedido_pagado_fecha',
+            'fecha_pedido',
+            postgresql_where=text("estado = 'Pagado'"),
+            postgresql_include=['id_pedido', 'id_sucursal', 'id_cliente', 'total']
+        ),
     )
 
     id_pedido: Mapped[int] = mapped_column(
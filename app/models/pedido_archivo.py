@@ -0,0 +1,82 @@
+from datetime import datetime
+from decimal import Decimal
+from typing import Optional
+from sqlalchemy import Integer, String, Numeric, TIMESTAMP, Index
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Mapped, mapped_column
+from .base import Base
+
+
+class PedidoArchivo(Base):
+    """
+    Pedido cerrado (Pagado o Cancelado) movido fuera de las tablas de pedidos
+    por app/archivo.py. Una fila por pedido: las columnas que usan los reportes
+    van aparte; las líneas y los productos personalizados (con sus materias
+    primas) van como JSONB, que PostgreSQL comprime (TOAST).
+    Sin FK a los catálogos: es un registro histórico de solo escritura.
+    """
+    __tablename__ = 'pedido_archivo'
+    __table_args__ = (
+        Index('ix_pedido_archivo_fecha', 'fecha_pedido'),
+        {'comment': 'Pedidos archivados con sus detalles'},
+    )
+
+    id_pedido: Mapped[int] = mapped_column(
+        Integer,
+        primary_key=True,
+        autoincrement=False,
+        name="id_pedido"
+    )
+    fecha_pedido: Mapped[datetime] = mapped_column(
+        TIMESTAMP(timezone=True),
+        nullable=False,
+        name="fecha_pedido"
+    )
+    id_personal: Mapped[int] = mapped_column(
+        Integer,
+        nullable=False,
+        name="id_personal"
+    )
+    id_sucursal: Mapped[int] = mapped_column(
+        Integer,
+        nullable=False,
+        name="id_sucursal"
+    )
+    id_cliente: Mapped[Optional[int]] = mapped_column(
+        Integer,
+        nullable=True,
+        name="id_cliente"
+    )
+    estado: Mapped[str] = mapped_column(
+        String(20),
+        nullable=False,
+        name="estado"
+    )
+    metodo_pago: Mapped[Optional[str]] = mapped_column(
+        String(20),
+        nullable=True,
+        name="metodo_pago"
+    )
+    total: Mapped[Decimal] = mapped_column(
+        Numeric(12, 2),
+        nullable=False,
+        name="total"
+    )
+    # [{id_detalle_pedido, tipo_producto, id_producto_establecido,
+    #   id_producto_personalizado, cantidad, precio_unitario, subtotal}]
+    lineas: Mapped[list] = mapped_column(
+        JSONB,
+        nullable=False,
+        name="lineas"
+    )
+    # [{id_producto_personalizado, nombre_personalizado, fecha_creacion,
+    #   materias: [{id_materia_prima, cantidad, precio_unitario, subtotal}]}]
+    personalizados: Mapped[list] = mapped_column(
+        JSONB,
+        nullable=False,
+        name="personalizados"
+    )
+
+    def __repr__(self) -> str:
+        return (f"<PedidoArchivo(id={self.id_pedido}, fecha={self.fecha_pedido}, "
+                f"estado='{self.estado}', total={self.total})>")
@@ -1,11 +1,19 @@
 from decimal import Decimal
-from sqlalchemy import Numeric, String, Text, Boolean
+from sqlalchemy import Numeric, String, Text, Boolean, Integer, Index, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from .base import Base
 
 
 class ProductoEstablecido(Base):
     __tablename__ = 'producto_establecido'
+    __table_args__ = (
+        # Solo los productos con mínimo definido participan en las alertas
+        Index(
+            'ix_producto_establecido_con_minimo',
+            'id_producto_establecido', 'stock_minimo',
+            postgresql_where=text('stock_minimo > 0')
+        ),
+    )
 
     id_producto_establecido: Mapped[int] = mapped_column(
         primary_key=True,
@@ -31,6 +39,13 @@ class ProductoEstablecido(Base):
         default=True,
         name="es_helado"
     )
+    stock_minimo: Mapped[int] = mapped_column(
+        Integer,
+        nullable=False,
+        default=0,
+        server_default='0',
+        name="stock_minimo"
+    )
 
     # Relación con Receta (la añadiremos después)
     # ingredientes: Mapped[list["Receta"]] = relationship(back_populates="producto")
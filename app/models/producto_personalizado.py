@@ -1,12 +1,15 @@
 from datetime import datetime
-from sqlalchemy import String, Integer, TIMESTAMP, ForeignKey
+from sqlalchemy import String, Integer, TIMESTAMP, ForeignKey, Index, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from .base import Base
 
 
 class ProductoPersonalizado(Base):
     __tablename__ = 'producto_personalizado'
-    __table_args__ = {'comment': 'Helados personalizados con toppings'}
+    __table_args__ = (
+        Index('ix_producto_personalizado_pedido', 'id_pedido'),
+        {'comment': 'Helados personalizados con toppings'},
+    )
 
     id_producto_personalizado: Mapped[int] = mapped_column(
         primary_key=True,
@@ -23,9 +26,14 @@ class ProductoPersonalizado(Base):
         String(50),
         name="nombre_personalizado"
     )
+    id_receta: Mapped[int | None] = mapped_column(
+        Integer,
+        ForeignKey("receta.id_receta"),
+        name="id_receta"
+    )
     fecha_creacion: Mapped[datetime] = mapped_column(
         TIMESTAMP(timezone=True),
-        server_default="CURRENT_TIMESTAMP",
+        server_default=text("CURRENT_TIMESTAMP"),
         name="fecha_creacion"
     )
 
@@ -36,6 +44,7 @@ class ProductoPersonalizado(Base):
         back_populates="producto_personalizado",
         cascade="all, delete-orphan"
     )
+    receta: Mapped["Receta | None"] = relationship()
 
     def __repr__(self) -> str:
         return f"<ProductoPersonalizado(id={self.id_producto_personalizado}, nombre='{self.nombre_personalizado}')>"
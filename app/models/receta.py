@@ -0,0 +1,50 @@
+from datetime import datetime
+from decimal import Decimal
+from sqlalchemy import String, Numeric, Boolean, TIMESTAMP, text
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+from .base import Base
+
+
+class Receta(Base):
+    __tablename__ = 'receta'
+    __table_args__ = (
+        {'comment': 'Plantillas de productos personalizados (combinaciones frecuentes)'},
+    )
+
+    id_receta: Mapped[int] = mapped_column(
+        primary_key=True,
+        autoincrement=True,
+        name="id_receta"
+    )
+    nombre: Mapped[str] = mapped_column(
+        String(50),
+        nullable=False,
+        unique=True,
+        name="nombre"
+    )
+    margen: Mapped[Decimal | None] = mapped_column(
+        Numeric(4, 2),
+        name="margen"
+    )
+    activa: Mapped[bool] = mapped_column(
+        Boolean,
+        nullable=False,
+        default=True,
+        server_default=text("true"),
+        name="activa"
+    )
+    fecha_creacion: Mapped[datetime] = mapped_column(
+        TIMESTAMP(timezone=True),
+        server_default=text("CURRENT_TIMESTAMP"),
+        name="fecha_creacion"
+    )
+
+    # Relaciones
+    detalles: Mapped[list["DetalleReceta"]] = relationship(
+        back_populates="receta",
+        cascade="all, delete-orphan",
+        order_by="DetalleReceta.id_materia_prima"
+    )
+
+    def __repr__(self) -> str:
+        return f"<Receta(id={self.id_receta}, nombre='{self.nombre}')>"
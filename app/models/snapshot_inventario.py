@@ -0,0 +1,62 @@
+from datetime import datetime
+from decimal import Decimal
+from sqlalchemy import Integer, String, Numeric, TIMESTAMP, ForeignKey, UniqueConstraint
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.orm import Mapped, mapped_column
+from .base import Base
+
+
+class SnapshotInventario(Base):
+    """
+    Stock de todos los items de un tipo en una sucursal en un instante.
+    Se guarda como dos arreglos paralelos (ids y cantidades) en una sola fila,
+    que PostgreSQL comprime (TOAST): un snapshot diario de cientos de items
+    ocupa unos pocos KB.
+    """
+    __tablename__ = 'snapshot_inventario'
+    __table_args__ = (
+        UniqueConstraint('id_sucursal', 'tipo_item', 'fecha_corte',
+                         name='uq_snapshot_sucursal_tipo_fecha'),
+        {'comment': 'Snapshots periódicos del inventario por sucursal'},
+    )
+
+    id_snapshot: Mapped[int] = mapped_column(
+        primary_key=True,
+        autoincrement=True,
+        name="id_snapshot"
+    )
+    id_sucursal: Mapped[int] = mapped_column(
+        Integer,
+        ForeignKey("sucursal.id_sucursal"),
+        nullable=False,
+        name="id_sucursal"
+    )
+    tipo_item: Mapped[str] = mapped_column(
+        String(20),
+        nullable=False,
+        name="tipo_item"
+    )
+    fecha_corte: Mapped[datetime] = mapped_column(
+        TIMESTAMP(timezone=True),
+        nullable=False,
+        name="fecha_corte"
+    )
+    ids: Mapped[list[int]] = mapped_column(
+        ARRAY(Integer),
+        nullable=False,
+        name="ids"
+    )
+    cantidades: Mapped[list[Decimal]] = mapped_column(
+        ARRAY(Numeric(12, 2)),
+        nullable=False,
+        name="cantidades"
+    )
+    total_items: Mapped[int] = mapped_column(
+        Integer,
+        nullable=False,
+        name="total_items"
+    )
+
+    def __repr__(self) -> str:
+        return (f"<SnapshotInventario(sucursal={self.id_sucursal}, tipo={self.tipo_item}, "
+                f"corte={self.fecha_corte}, items={self.total_items})>")
@@ -0,0 +1,41 @@
+from datetime import datetime
+from sqlalchemy import Integer, Text, TIMESTAMP, ForeignKey, func
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+from .base import Base
+
+
+class Transferencia(Base):
+    __tablename__ = 'transferencia'
+    __table_args__ = {
+        'comment': 'Documento de transferencia de stock entre sucursales'}
+
+    id_transferencia: Mapped[int] = mapped_column(
+        primary_key=True,
+        autoincrement=True,
+        name="id_transferencia"
+    )
+    fecha: Mapped[datetime] = mapped_column(
+        TIMESTAMP(timezone=True),
+        server_default=func.now(),  # pylint: disable=not-callable
+        name="fecha"
+    )
+    id_personal: Mapped[int] = mapped_column(
+        Integer,
+        ForeignKey("personal.id_personal"),
+        nullable=False,
+        name="id_personal"
+    )
+    motivo: Mapped[str | None] = mapped_column(
+        Text,
+        name="motivo"
+    )
+
+    personal: Mapped["Personal"] = relationship()
+    detalles: Mapped[list["DetalleTransferencia"]] = relationship(
+        back_populates="transferencia",
+        cascade="all, delete-orphan",
+        order_by="DetalleTransferencia.id_detalle_transferencia"
+    )
+
+    def __repr__(self) -> str:
+        return f"<Transferencia(id={self.id_transferencia}, fecha={self.fecha}, items={len(self.detalles)})>"
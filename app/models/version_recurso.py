@@ -0,0 +1,25 @@
+from sqlalchemy import String, BigInteger
+from sqlalchemy.orm import Mapped, mapped_column
+from .base import Base
+
+
+class VersionRecurso(Base):
+    __tablename__ = 'version_recurso'
+    __table_args__ = {
+        'comment': 'Contadores de versión por recurso para los ETag de caché HTTP'}
+
+    recurso: Mapped[str] = mapped_column(
+        String(100),
+        primary_key=True,
+        name="recurso"
+    )
+    version: Mapped[int] = mapped_column(
+        BigInteger,
+        nullable=False,
+        default=0,
+        server_default='0',
+        name="version"
+    )
+
+    def __repr__(self) -> str:
+        return f"<VersionRecurso(recurso='{self.recurso}', version={self.version})>"
@@ -0,0 +1,287 @@
+"""
+Particionado mensual opcional de la tabla pedido por fecha_pedido.
+
+Con la tabla particionada, los reportes y listados que filtran por rango de
+fechas solo leen las particiones de los meses pedidos (partition pruning) y los
+meses viejos pueden separarse de la tabla sin un DELETE masivo. Cada partición
+cubre un mes calendario en UTC (pedido_p2025_06 = [2025-06-01, 2025-07-01)) y
+pedido_default recibe lo que caiga fuera de las particiones creadas.
+
+Compromisos del particionado en PostgreSQL:
+
+- la clave primaria pasa a ser (id_pedido, fecha_pedido), porque toda clave
+  única debe incluir la columna de partición. id_pedido sigue saliendo de la
+  misma secuencia, así que en la práctica no se repite;
+- por lo mismo, detalle_pedido y producto_personalizado ya no pueden tener una
+  FK a pedido(id_pedido): `migrar_tabla()` las elimina y la integridad queda a
+  cargo de la aplicación, que crea el pedido y sus detalles en una transacción;
+- buscar un pedido solo por id_pedido consulta el índice de cada partición.
+
+Uso desde consola (contra la base de DATABASE_URL). La migración reescribe la
+tabla bajo un lock exclusivo: conviene hacer un backup antes y correrla en una
+ventana sin ventas.
+
+    python -m app.particiones migrar
+    python -m app.particiones crear            # programar mensualmente en cron
+    python -m app.particiones separar 2024-12  # separa hasta ese mes inclusive
+    python -m app.particiones listar
+"""
+import os
+import re
+import sys
+from datetime import date, datetime, timezone
+from typing import List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from sqlalchemy.schema import CreateIndex
+
+from app.models import Pedido
+
+TABLA = "pedido"
+PARTICION_DEFAULT = "pedido_default"
+# Meses futuros que se dejan creados por adelantado
+MESES_ADELANTE = int(os.getenv("PARTICIONES_MESES_ADELANTE", "3"))
+# Esquema al que se mueven las particiones separadas (vacío: quedan en public)
+ESQUEMA_ARCHIVO = os.getenv("PARTICIONES_ESQUEMA_ARCHIVO", "archivo")
+
+_RE_PARTICION = re.compile(r"^pedido_p(\d{4})_(\d{2})$")
+
+
+class ErrorParticiones(Exception):
+    """La tabla no está en el estado que requiere la operación."""
+
+
+def inicio_mes(fecha) -> date:
+    return date(fecha.year, fecha.month, 1)
+
+
+def sumar_meses(mes: date, meses: int) -> date:
+    total = mes.year * 12 + mes.month - 1 + meses
+    return date(total // 12, total % 12 + 1, 1)
+
+
+def nombre_particion(mes: date) -> str:
+    return f"{TABLA}_p{mes.year:04d}_{mes.month:02d}"
+
+
+def _limite(mes: date) -> str:
+    return f"'{mes.isoformat()} 00:00:00+00'"
+
+
+def esta_particionada(db: Session) -> bool:
+    return db.execute(text("""
+        SELECT EXISTS (
+            SELECT 1 FROM pg_partitioned_table
+            WHERE partrelid = to_regclass(:tabla)
+        )
+    """), {"tabla": TABLA}).scalar()
+
+
+def _existe(db: Session, nombre: str) -> bool:
+    return db.execute(text("SELECT to_regclass(:nombre) IS NOT NULL"), {"nombre": nombre}).scalar()
+
+
+def listar_particiones(db: Session) -> List[dict]:
+    filas = db.execute(text("""
+        SELECT c.relname, pg_get_expr(c.relpartbound, c.oid),
+               greatest(c.reltuples, 0)::bigint, pg_total_relation_size(c.oid)
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = to_regclass(:tabla)
+        ORDER BY c.relname
+    """), {"tabla": TABLA}).all()
+    return [
+        {"nombre": nombre, "limites": limites, "filas_estimadas": filas, "bytes": tamano}
+        for nombre, limites, filas, tamano in filas
+    ]
+
+
+def _crear_particion(db: Session, padre: str, mes: date):
+    """
+    Crea la partición del mes. Si la partición default tiene filas de ese mes
+    (p. ej. pedidos con fecha futura cargados antes), las mueve a la nueva;
+    PostgreSQL no permite crearla mientras la default las contenga.
+    """
+    desde, hasta = _limite(mes), _limite(sumar_meses(mes, 1))
+    nombre = nombre_particion(mes)
+    rescatar = _existe(db, PARTICION_DEFAULT) and db.execute(text(
+        f"SELECT EXISTS (SELECT 1 FROM {PARTICION_DEFAULT} "
+        f"WHERE fecha_pedido >= {desde} AND fecha_pedido < {hasta})"
+    )).scalar()
+    if rescatar:
+        db.execute(text(
+            f"CREATE TEMP TABLE _rescate ON COMMIT DROP AS "
+            f"WITH movidas AS (DELETE FROM {PARTICION_DEFAULT} "
+            f"WHERE fecha_pedido >= {desde} AND fecha_pedido < {hasta} RETURNING *) "
+            f"SELECT * FROM movidas"
+        ))
+    db.execute(text(
+        f"CREATE TABLE {nombre} PARTITION OF {padre} FOR VALUES FROM ({desde}) TO ({hasta})"
+    ))
+    if rescatar:
+        db.execute(text(f"INSERT INTO {padre} SELECT * FROM _rescate"))
+        db.execute(text("DROP TABLE _rescate"))
+
+
+def crear_particiones(db: Session, desde: Optional[date] = None,
+                      meses_adelante: int = MESES_ADELANTE) -> List[str]:
+    """
+    Crea las particiones que falten desde `desde` (por defecto el mes actual)
+    hasta `meses_adelante` meses después del actual. Devuelve las creadas.
+    No hace commit.
+    """
+    if not esta_particionada(db):
+        raise ErrorParticiones("La tabla pedido no está particionada (ver `migrar`)")
+    actual = inicio_mes(datetime.now(timezone.utc))
+    mes = inicio_mes(desde) if desde else actual
+    ultimo = sumar_meses(actual, meses_adelante)
+    creadas = []
+    while mes <= ultimo:
+        if not _existe(db, nombre_particion(mes)):
+            _crear_particion(db, TABLA, mes)
+            creadas.append(nombre_particion(mes))
+        mes = sumar_meses(mes, 1)
+    return creadas
+
+
+def separar_particiones(db: Session, hasta_mes: date,
+                        esquema: Optional[str] = ESQUEMA_ARCHIVO) -> List[str]:
+    """
+    Separa (DETACH) las particiones mensuales hasta `hasta_mes` inclusive y, si
+    se indica un esquema, las mueve a él. Los pedidos separados dejan de verse
+    en la tabla pedido; sus detalles quedan en detalle_pedido. No hace commit.
+    """
+    if not esta_particionada(db):
+        raise ErrorParticiones("La tabla pedido no está particionada (ver `migrar`)")
+    limite = inicio_mes(hasta_mes)
+    separadas = []
+    for particion in listar_particiones(db):
+        coincide = _RE_PARTICION.match(particion["nombre"])
+        if not coincide or date(int(coincide[1]), int(coincide[2]), 1) > limite:
+            continue
+        nombre = particion["nombre"]
+        db.execute(text(f"ALTER TABLE {TABLA} DETACH PARTITION {nombre}"))
+        if esquema:
+            db.execute(text(f"CREATE SCHEMA IF NOT EXISTS {esquema}"))
+            db.execute(text(f"ALTER TABLE {nombre} SET SCHEMA {esquema}"))
+        separadas.append(nombre)
+    return separadas
+
+
+def migrar_tabla(db: Session, meses_adelante: int = MESES_ADELANTE) -> dict:
+    """
+    Convierte la tabla pedido existente en una tabla particionada por mes con
+    los mismos datos, restricciones, índices y secuencia. Todo ocurre en la
+    transacción de la sesión (no hace commit): si algo falla no queda nada a
+    medias.
+    """
+    if esta_particionada(db):
+        raise ErrorParticiones("La tabla pedido ya está particionada")
+
+    db.execute(text(f"LOCK TABLE {TABLA} IN ACCESS EXCLUSIVE MODE"))
+    filas = db.execute(text(f"SELECT count(*) FROM {TABLA}")).scalar()
+    minimo = db.execute(text(f"SELECT min(fecha_pedido) FROM {TABLA}")).scalar()
+
+    # FK que apuntan a pedido: no pueden referenciar una tabla particionada
+    # por una columna que no incluye la clave de partición
+    referencias = db.execute(text("""
+        SELECT conrelid::regclass::text, conname FROM pg_constraint
+        WHERE confrelid = to_regclass(:tabla) AND contype = 'f'
+    """), {"tabla": TABLA}).all()
+    for tabla, restriccion in referencias:
+        db.execute(text(f"ALTER TABLE {tabla} DROP CONSTRAINT {restriccion}"))
+
+    # FK propias (a cliente, personal, sucursal): se recrean tal cual
+    propias = db.execute(text("""
+        SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint
+        WHERE conrelid = to_regclass(:tabla) AND contype = 'f'
+    """), {"tabla": TABLA}).all()
+
+    nueva = f"{TABLA}_particionada"
+    db.execute(text(
+        f"CREATE TABLE {nueva} (LIKE {TABLA} INCLUDING DEFAULTS INCLUDING CONSTRAINTS "
+        f"INCLUDING COMMENTS) PARTITION BY RANGE (fecha_pedido)"
+    ))
+    actual = inicio_mes(datetime.now(timezone.utc))
+    mes = inicio_mes(minimo) if minimo else actual
+    particiones = 0
+    while mes <= sumar_meses(actual, meses_adelante):
+        _crear_particion(db, nueva, mes)
+        particiones += 1
+        mes = sumar_meses(mes, 1)
+    db.execute(text(f"CREATE TABLE {PARTICION_DEFAULT} PARTITION OF {nueva} DEFAULT"))
+
+    copiadas = db.execute(text(f"INSERT INTO {nueva} SELECT * FROM {TABLA}")).rowcount
+    if copiadas != filas:
+        raise ErrorParticiones(f"Se copiaron {copiadas} de {filas} pedidos")
+
+    # La secuencia pertenece a la columna vieja: se suelta antes del DROP
+    secuencia = db.execute(text("SELECT pg_get_serial_sequence(:tabla, 'id_pedido')"),
+                           {"tabla": TABLA}).scalar()
+    if secuencia:
+        db.execute(text(f"ALTER SEQUENCE {secuencia} OWNED BY NONE"))
+    db.execute(text(f"DROP TABLE {TABLA}"))
+    db.execute(text(f"ALTER TABLE {nueva} RENAME TO {TABLA}"))
+    if secuencia:
+        db.execute(text(f"ALTER SEQUENCE {secuencia} OWNED BY {TABLA}.id_pedido"))
+
+    db.execute(text(
+        f"ALTER TABLE {TABLA} ADD CONSTRAINT {TABLA}_pkey PRIMARY KEY (id_pedido, fecha_pedido)"))
+    for restriccion, definicion in propias:
+        db.execute(text(f"ALTER TABLE {TABLA} ADD CONSTRAINT {restriccion} {definicion}"))
+    # Los índices del modelo se crean en la tabla padre y se propagan a cada partición
+    conexion = db.connection()
+    for indice in Pedido.__table__.indexes:
+        conexion.execute(CreateIndex(indice))
+    db.execute(text(f"ANALYZE {TABLA}"))
+
+    return {
+        "pedidos": filas,
+        "particiones": particiones,
+        "fk_eliminadas": [f"{tabla}.{restriccion}" for tabla, restriccion in referencias],
+    }
+
+
+def _mes_de_texto(valor: str) -> date:
+    try:
+        return datetime.strptime(valor, "%Y-%m").date()
+    except ValueError:
+        raise ErrorParticiones(f"Mes inválido: {valor} (se espera AAAA-MM)")
+
+
+if __name__ == "__main__":
+    from app.database import SessionLocal
+
+    comandos = ("migrar", "crear", "separar", "listar")
+    if len(sys.argv) < 2 or sys.argv[1] not in comandos or (sys.argv[1] == "separar" and len(sys.argv) < 3):
+        print("Uso: python -m app.particiones migrar | crear | separar AAAA-MM | listar")
+        sys.exit(1)
+
+    db = SessionLocal()
+    try:
+        comando = sys.argv[1]
+        if comando == "migrar":
+            resultado = migrar_tabla(db)
+            db.commit()
+            print(f"{resultado['pedidos']} pedidos en {resultado['particiones']} particiones mensuales")
+            for fk in resultado["fk_eliminadas"]:
+                print(f"FK eliminada: {fk}")
+        elif comando == "crear":
+            creadas = crear_particiones(db)
+            db.commit()
+            print("Creadas: " + (", ".join(creadas) or "ninguna"))
+        elif comando == "separar":
+            separadas = separar_particiones(db, _mes_de_texto(sys.argv[2]))
+            db.commit()
+            print("Separadas: " + (", ".join(separadas) or "ninguna"))
+        else:
+            for particion in listar_particiones(db):
+                print(f"{particion['nombre']:<20} {particion['filas_estimadas']:>10} filas "
+                      f"{particion['bytes'] / 1048576:>8.1f} MB  {particion['limites']}")
+    except ErrorParticiones as e:
+        db.rollback()
+        print(f"Error: {e}")
+        sys.exit(1)
+    finally:
+        db.close()
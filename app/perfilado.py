@@ -0,0 +1,248 @@
+"""
+Perfilado de una petición a pedido, solo para administradores.
+
+Una petición con el encabezado `X-Perfilar: 1` o el parámetro `?perfilar=1`
+se ejecuta con cProfile activo en el endpoint y con registro de cada sentencia
+SQL y su duración (vía app/metricas.py). Al terminar se guardan en PERFILADO_DIR
+dos archivos con el mismo id:
+
+- `{id}.prof`: estadísticas de cProfile (pstats, snakeviz, etc.);
+- `{id}.json`: ruta, estado, tiempos, resumen de las funciones más costosas y
+  las sentencias SQL en orden.
+
+La respuesta lleva el id en el encabezado X-Perfil; los perfiles se listan y
+descargan desde /diagnostico/perfiles. Quien pide el perfil tiene que pasar
+require_admin con su token; si no, la petición se rechaza (401/403) en lugar de
+ejecutarse sin perfilar.
+
+Sin la marca el costo es revisar los encabezados y la query string en el
+middleware y leer un ContextVar al llamar al endpoint. cProfile solo mide el
+hilo del endpoint (el threadpool para los endpoints síncronos): las
+dependencias y el middleware quedan fuera.
+
+Configuración por variables de entorno:
+- PERFILADO_DIR: directorio de los perfiles ("perfiles")
+- PERFILADO_MAXIMO: perfiles que se conservan; los más viejos se borran (50)
+- PERFILADO_FUNCIONES: funciones en el resumen del JSON (40)
+"""
+import asyncio
+import cProfile
+import functools
+import io
+import json
+import os
+import pstats
+import time
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Optional
+from urllib.parse import parse_qs
+
+from fastapi import HTTPException
+from fastapi.routing import APIRoute
+from fastapi.security import HTTPAuthorizationCredentials
+
+from app.database import SessionLocal
+from app.dependencies import get_current_user, require_admin
+from app.metricas import peticion_actual
+from app.serializacion import RespuestaJSONRapida
+
+DIRECTORIO = os.getenv("PERFILADO_DIR", "perfiles")
+MAXIMO = int(os.getenv("PERFILADO_MAXIMO", "50"))
+FUNCIONES = int(os.getenv("PERFILADO_FUNCIONES", "40"))
+
+ENCABEZADO = b"x-perfilar"
+PARAMETRO = "perfilar"
+_VALORES_ACTIVOS = {"1", "true", "si", "sí"}
+
+_perfil_actual: ContextVar[Optional[cProfile.Profile]] = ContextVar(
+    "perfil_actual", default=None)
+
+
+def _marcada(scope) -> bool:
+    """True si la petición pide perfilado por encabezado o query string."""
+    for nombre, valor in scope["headers"]:
+        if nombre == ENCABEZADO:
+            return valor.decode("latin-1").strip().lower() in _VALORES_ACTIVOS
+    consulta = scope.get("query_string", b"")
+    if PARAMETRO.encode() in consulta:
+        valores = parse_qs(consulta.decode("latin-1"), keep_blank_values=True).get(PARAMETRO)
+        return bool(valores) and valores[0].strip().lower() in _VALORES_ACTIVOS | {""}
+    return False
+
+
+async def _verificar_administrador(scope):
+    """Aplica get_current_user + require_admin con el token de la petición."""
+    autorizacion = dict(scope["headers"]).get(b"authorization", b"").decode("latin-1")
+    esquema, _, token = autorizacion.partition(" ")
+    if esquema.lower() != "bearer" or not token:
+        raise HTTPException(status_code=401, detail="Se requiere autenticación para perfilar",
+                            headers={"WWW-Authenticate": "Bearer"})
+    db = SessionLocal()
+    try:
+        usuario = await get_current_user(
+            HTTPAuthorizationCredentials(scheme="Bearer", credentials=token), db)
+        await require_admin(current_user=usuario)
+    finally:
+        db.close()
+
+
+# --------------------------
+# Endpoints instrumentados
+# --------------------------
+
+def _envolver(funcion):
+    """Activa el perfilador de la petición (si lo hay) mientras corre el endpoint."""
+    if asyncio.iscoroutinefunction(funcion):
+        @functools.wraps(funcion)
+        async def envuelta(*args, **kwargs):
+            perfilador = _perfil_actual.get()
+            if perfilador is None:
+                return await funcion(*args, **kwargs)
+            # En el hilo del event loop: también cuenta lo que otras tareas
+            # ejecuten mientras este endpoint espera
+            perfilador.enable()
+            try:
+                return await funcion(*args, **kwargs)
+            finally:
+                perfilador.disable()
+    else:
+        @functools.wraps(funcion)
+        def envuelta(*args, **kwargs):
+            perfilador = _perfil_actual.get()
+            if perfilador is None:
+                return funcion(*args, **kwargs)
+            perfilador.enable()
+            try:
+                return funcion(*args, **kwargs)
+            finally:
+                perfilador.disable()
+    return envuelta
+
+
+def instrumentar(app):
+    """
+    Envuelve los endpoints ya registrados en `app`. FastAPI llama a
+    `route.dependant.call` en cada petición (en el threadpool si es síncrono),
+    así que el perfilador se activa en el hilo que ejecuta el endpoint.
+    """
+    for ruta in app.routes:
+        if isinstance(ruta, APIRoute):
+            ruta.dependant.call = _envolver(ruta.dependant.call)
+
+
+# --------------------------
+# Almacenamiento
+# --------------------------
+
+def _resumen(perfilador: cProfile.Profile) -> str:
+    salida = io.StringIO()
+    estadisticas = pstats.Stats(perfilador, stream=salida)
+    estadisticas.strip_dirs().sort_stats("cumulative").print_stats(FUNCIONES)
+    return salida.getvalue()
+
+
+def _podar():
+    """Borra los perfiles más viejos por encima de MAXIMO."""
+    ids = sorted({nombre.rsplit(".", 1)[0] for nombre in os.listdir(DIRECTORIO)
+                  if nombre.endswith((".json", ".prof"))})
+    for viejo in ids[:max(0, len(ids) - MAXIMO)]:
+        for extension in (".json", ".prof"):
+            ruta = os.path.join(DIRECTORIO, viejo + extension)
+            if os.path.exists(ruta):
+                os.remove(ruta)
+
+
+def _guardar(id_perfil: str, perfilador: cProfile.Profile, datos: dict):
+    os.makedirs(DIRECTORIO, exist_ok=True)
+    perfilador.dump_stats(os.path.join(DIRECTORIO, f"{id_perfil}.prof"))
+    datos["resumen"] = _resumen(perfilador)
+    with open(os.path.join(DIRECTORIO, f"{id_perfil}.json"), "w", encoding="utf-8") as archivo:
+        json.dump(datos, archivo, ensure_ascii=False, indent=1)
+    _podar()
+
+
+def ruta_perfil(id_perfil: str, extension: str) -> Optional[str]:
+    """Ruta del archivo de un perfil guardado, o None si el id no es válido o no existe."""
+    if not id_perfil.replace("_", "").isalnum():
+        return None
+    ruta = os.path.join(DIRECTORIO, f"{id_perfil}.{extension}")
+    return ruta if os.path.exists(ruta) else None
+
+
+def listar_perfiles() -> list:
+    """Metadatos de los perfiles guardados, del más reciente al más viejo."""
+    if not os.path.isdir(DIRECTORIO):
+        return []
+    perfiles = []
+    for nombre in sorted(os.listdir(DIRECTORIO), reverse=True):
+        if nombre.endswith(".json"):
+            with open(os.path.join(DIRECTORIO, nombre), encoding="utf-8") as archivo:
+                datos = json.load(archivo)
+            perfiles.append({clave: datos[clave] for clave in
+                             ("id", "fecha", "metodo", "ruta", "estado", "ms", "ms_db", "consultas")})
+    return perfiles
+
+
+# --------------------------
+# Middleware
+# --------------------------
+
+class PerfiladoMiddleware:
+    """
+    Middleware ASGI que perfila las peticiones marcadas. Tiene que quedar
+    dentro de MetricasMiddleware, que es quien cuenta las consultas SQL.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not _marcada(scope):
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            await _verificar_administrador(scope)
+        except HTTPException as error:
+            respuesta = RespuestaJSONRapida({"detail": error.detail}, status_code=error.status_code,
+                                            headers=error.headers)
+            await respuesta(scope, receive, send)
+            return
+
+        id_perfil = f"{datetime.now(timezone.utc):%Y%m%dT%H%M%S}_{uuid.uuid4().hex[:8]}"
+        perfilador = cProfile.Profile()
+        estad = peticion_actual()
+        if estad is not None:
+            estad.sql = []
+        estado = 500
+
+        async def enviar(message):
+            nonlocal estado
+            if message["type"] == "http.response.start":
+                estado = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"x-perfil", id_perfil.encode())]
+            await send(message)
+
+        token = _perfil_actual.set(perfilador)
+        inicio = time.perf_counter()
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            _perfil_actual.reset(token)
+            sql = estad.sql if estad is not None else []
+            consulta = scope.get("query_string", b"").decode("latin-1")
+            _guardar(id_perfil, perfilador, {
+                "id": id_perfil,
+                "fecha": datetime.now(timezone.utc).isoformat(),
+                "metodo": scope["method"],
+                "ruta": scope["path"] + (f"?{consulta}" if consulta else ""),
+                "estado": estado,
+                "ms": round((time.perf_counter() - inicio) * 1000, 2),
+                "ms_db": round(sum(s for _, s in sql) * 1000, 2),
+                "consultas": len(sql),
+                "sql": [{"ms": round(s * 1000, 3), "sentencia": " ".join(sentencia.split())}
+                        for sentencia, s in sql],
+            })
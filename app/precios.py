@@ -0,0 +1,280 @@
+"""
+Tabla de precios en memoria para cotizar y crear pedidos.
+
+`TablaPrecios` es una foto inmutable de los precios del catálogo (materias
+primas, productos establecidos y recetas activas). Se carga entera con una
+consulta por tabla y se comparte entre hilos sin locks: nadie la modifica;
+cuando cambia un precio se reemplaza por otra. Con ella se cotiza un producto
+personalizado o un pedido completo en Python, con Decimal y el mismo redondeo
+que aplican las columnas de la base, sin consultar cada materia prima. El
+precio de cada receta se calcula una vez al cargar la foto.
+
+La versión de la foto son los contadores de version_recurso de materias,
+productos y recetas (los mismos de los ETag, ver app/cache_http.py), que los
+endpoints del catálogo incrementan en cada escritura:
+
+- `tabla_precios(db)` lee esos contadores (una consulta por clave primaria) y
+  recarga la foto si cambiaron: al crear pedidos el precio siempre es el
+  vigente, también si el cambio se hizo en otro worker;
+- `tabla_precios(db, verificar=False)` no consulta nada mientras la foto tenga
+  menos de PRECIOS_TTL_SEGUNDOS (60) y no se haya descartado. Lo usa
+  /pedidos/cotizar. `descartar_tabla()` la descarta en este proceso cuando
+  /productos o /recetas cambian; los demás workers la recargan al vencer.
+"""
+import os
+import threading
+import time
+from decimal import Decimal, ROUND_HALF_UP
+from itertools import groupby
+from types import MappingProxyType
+from typing import Iterable, NamedTuple, Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.cache_http import RECURSO_MATERIAS, RECURSO_PRODUCTOS, RECURSO_RECETAS
+from app.models import DetalleReceta, MateriaPrima, ProductoEstablecido, Receta, VersionRecurso
+
+TTL_SEGUNDOS = float(os.getenv("PRECIOS_TTL_SEGUNDOS", "60"))
+MARGEN_POR_DEFECTO = Decimal('0.30')
+
+_CENTAVOS = Decimal('0.01')
+
+
+def redondear(valor: Decimal) -> Decimal:
+    """Redondeo de las columnas NUMERIC(…, 2) de PostgreSQL."""
+    return valor.quantize(_CENTAVOS, rounding=ROUND_HALF_UP)
+
+
+class Precio(NamedTuple):
+    nombre: str
+    precio_unitario: Decimal
+    unidad: Optional[str] = None
+
+
+class ComponenteCotizado(NamedTuple):
+    id_materia_prima: int
+    nombre_materia: str
+    unidad: str
+    cantidad: Decimal
+    precio_unitario: Decimal
+    subtotal: Decimal
+
+
+class PersonalizadoCotizado(NamedTuple):
+    precio_unitario: Decimal
+    componentes: Tuple[ComponenteCotizado, ...]
+    nombre: Optional[str] = None
+    id_receta: Optional[int] = None
+
+
+class Cantidad(NamedTuple):
+    id_materia_prima: int
+    cantidad: Decimal
+
+
+class RecetaPrecio(NamedTuple):
+    nombre: str
+    margen: Optional[Decimal]
+    materias: Tuple[Cantidad, ...]
+    cotizado: PersonalizadoCotizado
+
+
+class TablaPrecios:
+    """Precios de catálogo de una versión. Inmutable."""
+
+    __slots__ = ("version", "materias", "productos", "recetas")
+
+    def __init__(self, version: Tuple[int, ...], materias: dict, productos: dict,
+                 recetas: Optional[dict] = None):
+        """`recetas`: id_receta -> (nombre, margen, materias como Cantidad)."""
+        self.version = version
+        self.materias = MappingProxyType(materias)
+        self.productos = MappingProxyType(productos)
+        self.recetas = MappingProxyType({
+            id_receta: RecetaPrecio(nombre, margen, cantidades, self.cotizar_personalizado(
+                cantidades, margen)._replace(nombre=nombre, id_receta=id_receta))
+            for id_receta, (nombre, margen, cantidades) in (recetas or {}).items()
+        })
+
+    @property
+    def etiqueta(self) -> str:
+        return ".".join(str(v) for v in self.version)
+
+    def producto(self, id_producto: Optional[int]) -> Precio:
+        precio = self.productos.get(id_producto)
+        if precio is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                                detail="Producto establecido no encontrado")
+        return precio
+
+    def materia(self, id_materia: int) -> Precio:
+        precio = self.materias.get(id_materia)
+        if precio is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                                detail=f"Materia prima {id_materia} no encontrada")
+        return precio
+
+    def receta(self, id_receta: int) -> RecetaPrecio:
+        receta = self.recetas.get(id_receta)
+        if receta is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                                detail=f"Receta {id_receta} no encontrada o inactiva")
+        return receta
+
+    def cotizar_personalizado(self, detalles: Iterable,
+                              margen: Optional[Decimal] = None) -> PersonalizadoCotizado:
+        """
+        Precio de un producto personalizado (`detalles` con id_materia_prima y
+        cantidad): cada materia a su precio con margen; el precio del producto
+        es la suma sin redondear de cantidad x precio, redondeada al final.
+        """
+        margen = margen or MARGEN_POR_DEFECTO
+        componentes, total = [], Decimal('0')
+        for detalle in detalles:
+            materia = self.materia(detalle.id_materia_prima)
+            if any(c.id_materia_prima == detalle.id_materia_prima for c in componentes):
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Materia prima {detalle.id_materia_prima} repetida en el producto personalizado")
+            precio_con_margen = materia.precio_unitario * (1 + margen)
+            total += detalle.cantidad * precio_con_margen
+            precio = redondear(precio_con_margen)
+            componentes.append(ComponenteCotizado(
+                detalle.id_materia_prima, materia.nombre, materia.unidad, detalle.cantidad,
+                precio, redondear(redondear(detalle.cantidad) * precio)))
+        return PersonalizadoCotizado(redondear(total), tuple(componentes))
+
+    def cotizar_producto(self, datos) -> PersonalizadoCotizado:
+        """
+        Precio de un ProductoPersonalizadoCreate. Con `id_receta` parte de la
+        receta: cada materia de `detalles` reemplaza su cantidad en la receta
+        (o se agrega; con cantidad 0 se quita) y `margen` reemplaza el de la
+        receta. Sin cambios se usa el precio ya calculado de la receta.
+        """
+        if datos.id_receta is None:
+            return self.cotizar_personalizado(datos.detalles, datos.margen)._replace(
+                nombre=datos.nombre_personalizado)
+
+        receta = self.receta(datos.id_receta)
+        nombre = datos.nombre_personalizado or receta.nombre
+        if not datos.detalles and datos.margen is None:
+            return receta.cotizado._replace(nombre=nombre)
+
+        cantidades = dict(receta.materias)
+        cambiadas = set()
+        for detalle in datos.detalles:
+            if detalle.id_materia_prima in cambiadas:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Materia prima {detalle.id_materia_prima} repetida en el producto personalizado")
+            cambiadas.add(detalle.id_materia_prima)
+            cantidades[detalle.id_materia_prima] = detalle.cantidad
+        componentes = [Cantidad(i, c) for i, c in cantidades.items() if c > 0]
+        if not componentes:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                                detail="El producto personalizado quedó sin materias primas")
+        return self.cotizar_personalizado(componentes, datos.margen or receta.margen)._replace(
+            nombre=nombre, id_receta=datos.id_receta)
+
+    def cotizar_pedido(self, detalles: Iterable) -> dict:
+        """Cotización de las líneas de un pedido (DetallePedidoCreate) con la forma de CotizacionResponse."""
+        lineas, total = [], Decimal('0.00')
+        for detalle in detalles:
+            if detalle.tipo_producto == "Establecido":
+                producto = self.producto(detalle.id_producto_establecido)
+                linea = {
+                    "tipo_producto": "Establecido",
+                    "id_producto_establecido": detalle.id_producto_establecido,
+                    "nombre": producto.nombre,
+                    "precio_unitario": producto.precio_unitario,
+                }
+            else:
+                if not detalle.producto_personalizado:
+                    raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                                        detail="Datos incompletos para producto personalizado")
+                cotizado = self.cotizar_producto(detalle.producto_personalizado)
+                linea = {
+                    "tipo_producto": "Personalizado",
+                    "id_receta": cotizado.id_receta,
+                    "nombre": cotizado.nombre,
+                    "precio_unitario": cotizado.precio_unitario,
+                    "componentes": [c._asdict() for c in cotizado.componentes],
+                }
+            linea["cantidad"] = detalle.cantidad
+            linea["subtotal"] = detalle.cantidad * linea["precio_unitario"]
+            total += linea["subtotal"]
+            lineas.append(linea)
+        return {"version_precios": self.etiqueta, "total": total, "detalles": lineas}
+
+
+# --------------------------
+# Foto vigente del proceso
+# --------------------------
+
+_tabla: Optional[TablaPrecios] = None
+# Última vez que se comprobó contra la base que _tabla sigue vigente
+_verificada = 0.0
+_lock = threading.Lock()
+
+
+_RECURSOS = (RECURSO_MATERIAS, RECURSO_PRODUCTOS, RECURSO_RECETAS)
+
+
+def _versiones(db: Session) -> Tuple[int, ...]:
+    versiones = dict(db.execute(
+        select(VersionRecurso.recurso, VersionRecurso.version)
+        .where(VersionRecurso.recurso.in_(_RECURSOS))
+    ).all())
+    return tuple(versiones.get(recurso, 0) for recurso in _RECURSOS)
+
+
+def _cargar(db: Session, version: Tuple[int, ...]) -> TablaPrecios:
+    # Los contadores se leen antes que los precios: la foto nunca es más vieja que su versión
+    materias = {fila.id_materia_prima: Precio(fila.nombre, fila.precio_unitario, fila.unidad)
+                for fila in db.execute(select(MateriaPrima.id_materia_prima, MateriaPrima.nombre,
+                                              MateriaPrima.precio_unitario, MateriaPrima.unidad))}
+    productos = {fila.id_producto_establecido: Precio(fila.nombre, fila.precio_unitario)
+                 for fila in db.execute(select(ProductoEstablecido.id_producto_establecido,
+                                               ProductoEstablecido.nombre,
+                                               ProductoEstablecido.precio_unitario))}
+    filas = db.execute(
+        select(Receta.id_receta, Receta.nombre, Receta.margen,
+               DetalleReceta.id_materia_prima, DetalleReceta.cantidad)
+        .join(DetalleReceta, DetalleReceta.id_receta == Receta.id_receta)
+        .where(Receta.activa.is_(True))
+        .order_by(Receta.id_receta, DetalleReceta.id_materia_prima)
+    ).all()
+    recetas = {}
+    for id_receta, grupo in groupby(filas, key=lambda fila: fila.id_receta):
+        grupo = list(grupo)
+        recetas[id_receta] = (grupo[0].nombre, grupo[0].margen,
+                              tuple(Cantidad(f.id_materia_prima, f.cantidad) for f in grupo))
+    return TablaPrecios(version, materias, productos, recetas)
+
+
+def tabla_precios(db: Session, verificar: bool = True) -> TablaPrecios:
+    """
+    Foto de precios vigente. Con `verificar` compara su versión con la base;
+    sin él solo la recarga si no hay, se descartó o venció el TTL.
+    """
+    global _tabla, _verificada
+    tabla = _tabla
+    ahora = time.monotonic()
+    if tabla is not None and not verificar and ahora - _verificada < TTL_SEGUNDOS:
+        return tabla
+    version = _versiones(db)
+    if tabla is None or tabla.version != version:
+        with _lock:
+            if _tabla is None or _tabla.version != version:
+                _tabla = _cargar(db, version)
+            tabla = _tabla
+    _verificada = ahora
+    return tabla
+
+
+def descartar_tabla():
+    """Descarta la foto de este proceso; la próxima consulta la recarga."""
+    global _tabla
+    _tabla = None
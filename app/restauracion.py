@@ -0,0 +1,331 @@
+"""
+Restauración de los backups SQL generados por /backups/backup-sql.
+
+El archivo se lee en streaming: cada INSERT se convierte al formato de texto de
+COPY y se acumula en un archivo temporal por tabla. Luego las tablas se cargan
+en orden de dependencias (FK) con COPY FROM STDIN por lotes grandes y al final
+se reajustan las secuencias de las columnas serial.
+
+Uso desde consola (contra la base configurada en DATABASE_URL):
+
+    python -m app.restauracion backups/backup_simple_20250630_231921.sql
+"""
+import io
+import os
+import re
+import sys
+import tempfile
+import time
+from typing import Dict, Iterable, List, Optional
+
+from app.models import Base
+
+# Filas por sentencia COPY
+TAMANO_LOTE = int(os.getenv("RESTAURACION_TAMANO_LOTE", "50000"))
+# A partir de este tamaño el spool de cada tabla pasa de memoria a disco
+_SPOOL_MAX_MEMORIA = 8 * 1024 * 1024
+
+# Tablas que no se restauran: los contadores de ETag deben seguir creciendo
+# desde su valor actual para no repetir versiones ya entregadas a los clientes
+_TABLAS_EXCLUIDAS = {"version_recurso"}
+
+_RE_CREATE = re.compile(r"^CREATE TABLE (\w+) \(")
+_RE_COLUMNA = re.compile(r"^\s+(\w+)\s")
+_RE_INSERT = re.compile(r"^INSERT INTO (\w+) VALUES \((.*)\);\s*$", re.DOTALL)
+
+
+class ErrorRestauracion(Exception):
+    """Error de formato o de carga durante la restauración."""
+
+
+def _parsear_valores(texto: str) -> List[Optional[str]]:
+    """Convierte la lista de VALUES de un INSERT del backup en valores de texto."""
+    valores = []
+    i, n = 0, len(texto)
+    while i < n:
+        while i < n and texto[i] in " \t":
+            i += 1
+        if i < n and texto[i] == "'":
+            i += 1
+            partes = []
+            while True:
+                fin = texto.find("'", i)
+                if fin == -1:
+                    raise ErrorRestauracion("Cadena sin cerrar en INSERT")
+                partes.append(texto[i:fin])
+                if fin + 1 < n and texto[fin + 1] == "'":
+                    partes.append("'")
+                    i = fin + 2
+                else:
+                    i = fin + 1
+                    break
+            valores.append("".join(partes))
+        else:
+            fin = texto.find(",", i)
+            if fin == -1:
+                fin = n
+            token = texto[i:fin].strip()
+            valores.append(None if token == "NULL" else token)
+            i = fin
+        while i < n and texto[i] in " \t":
+            i += 1
+        if i < n:
+            if texto[i] != ",":
+                raise ErrorRestauracion(f"Valor mal formado en INSERT: {texto[:80]}")
+            i += 1
+    return valores
+
+
+def _escapar_copy(valor: Optional[str]) -> str:
+    """Escapa un valor para el formato de texto de COPY."""
+    if valor is None:
+        return "\\N"
+    return (valor.replace("\\", "\\\\")
+            .replace("\t", "\\t")
+            .replace("\n", "\\n")
+            .replace("\r", "\\r"))
+
+
+def _sentencias(lineas: Iterable[str]) -> Iterable[str]:
+    """Agrupa las líneas del archivo en sentencias (un INSERT puede abarcar varias líneas)."""
+    pendiente = []
+    comillas = 0
+    for linea in lineas:
+        if pendiente:
+            pendiente.append(linea)
+            comillas += linea.count("'")
+            if comillas % 2 == 0:
+                yield "".join(pendiente)
+                pendiente, comillas = [], 0
+            continue
+        if linea.startswith("INSERT INTO"):
+            comillas = linea.count("'")
+            if comillas % 2 != 0:
+                pendiente = [linea]
+                continue
+        yield linea
+    if pendiente:
+        raise ErrorRestauracion("El archivo termina en medio de un INSERT")
+
+
+def _columnas_destino(cursor) -> Dict[str, List[str]]:
+    """Columnas en las que se puede escribir (excluye las generadas) por tabla."""
+    cursor.execute("""
+        SELECT table_name, column_name
+        FROM information_schema.columns
+        WHERE table_schema = 'public'
+        AND is_generated = 'NEVER'
+        ORDER BY table_name, ordinal_position
+    """)
+    columnas: Dict[str, List[str]] = {}
+    for tabla, columna in cursor.fetchall():
+        columnas.setdefault(tabla, []).append(columna)
+    return columnas
+
+
+def _orden_carga(tablas: Iterable[str]) -> List[str]:
+    """Ordena las tablas para que los padres de cada FK se carguen primero."""
+    tablas = set(tablas)
+    orden = [t.name for t in Base.metadata.sorted_tables if t.name in tablas]
+    return orden + sorted(tablas - set(orden))
+
+
+def _quote(identificador: str) -> str:
+    return '"' + identificador.replace('"', '""') + '"'
+
+
+class _SpoolTabla:
+    """Filas de una tabla ya convertidas a formato COPY, a la espera de ser cargadas."""
+
+    def __init__(self, tabla: str, columnas_archivo: List[str], columnas_destino: List[str]):
+        destino = set(columnas_destino)
+        self.tabla = tabla
+        self.indices = [i for i, c in enumerate(columnas_archivo) if c in destino]
+        self.columnas = [columnas_archivo[i] for i in self.indices]
+        self.filas = 0
+        self.archivo = tempfile.SpooledTemporaryFile(
+            max_size=_SPOOL_MAX_MEMORIA, mode="w+", encoding="utf-8", newline="\n")
+
+    def agregar(self, valores: List[Optional[str]]):
+        self.archivo.write(
+            "\t".join(_escapar_copy(valores[i]) for i in self.indices) + "\n")
+        self.filas += 1
+
+    def lotes(self, tamano: int) -> Iterable[str]:
+        self.archivo.seek(0)
+        lote = []
+        for linea in self.archivo:
+            lote.append(linea)
+            if len(lote) >= tamano:
+                yield "".join(lote)
+                lote = []
+        if lote:
+            yield "".join(lote)
+
+    def cerrar(self):
+        self.archivo.close()
+
+
+def _desactivar_restricciones(cursor) -> str:
+    """
+    Intenta desactivar los triggers de FK durante la carga (requiere superusuario).
+    Si no hay permisos, se difieren las restricciones diferibles y se confía en el
+    orden de carga por dependencias.
+    """
+    cursor.execute("SAVEPOINT restauracion_replica")
+    try:
+        cursor.execute("SET LOCAL session_replication_role = replica")
+        cursor.execute("RELEASE SAVEPOINT restauracion_replica")
+        return "replica"
+    except Exception:
+        cursor.execute("ROLLBACK TO SAVEPOINT restauracion_replica")
+        cursor.execute("SET CONSTRAINTS ALL DEFERRED")
+        return "diferidas"
+
+
+def _reajustar_secuencias(cursor, tablas: List[str]) -> int:
+    """Mueve cada secuencia serial al siguiente valor libre de su tabla."""
+    ajustadas = 0
+    for tabla in tablas:
+        cursor.execute("""
+            SELECT column_name, pg_get_serial_sequence(%s, column_name)
+            FROM information_schema.columns
+            WHERE table_schema = 'public' AND table_name = %s
+        """, (_quote(tabla), tabla))
+        for columna, secuencia in cursor.fetchall():
+            if not secuencia:
+                continue
+            cursor.execute(
+                f"SELECT setval(%s, COALESCE(MAX({_quote(columna)}), 0) + 1, false) "
+                f"FROM {_quote(tabla)}",
+                (secuencia,)
+            )
+            ajustadas += 1
+    return ajustadas
+
+
+def restaurar(conexion, lineas: Iterable[str], tamano_lote: int = TAMANO_LOTE,
+              truncar: bool = True) -> dict:
+    """
+    Restaura un backup SQL sobre una conexión DBAPI de psycopg2.
+
+    No hace commit: el llamador decide si confirma o revierte la transacción.
+    Con `truncar` las tablas presentes en el backup se vacían antes de cargar
+    (TRUNCATE ... CASCADE también vacía las tablas que las referencian).
+    """
+    inicio = time.perf_counter()
+    cursor = conexion.cursor()
+    destino = _columnas_destino(cursor)
+
+    spools: Dict[str, _SpoolTabla] = {}
+    columnas_archivo: Dict[str, List[str]] = {}
+    tabla_actual = None
+    bytes_leidos = 0
+    omitidas = set()
+
+    try:
+        # 1. Lectura en streaming del archivo y conversión a formato COPY
+        for sentencia in _sentencias(lineas):
+            bytes_leidos += len(sentencia.encode("utf-8"))
+            m = _RE_CREATE.match(sentencia)
+            if m:
+                tabla_actual = m.group(1)
+                columnas_archivo[tabla_actual] = []
+                continue
+            if tabla_actual and not sentencia.startswith(("INSERT", "--", ")")):
+                c = _RE_COLUMNA.match(sentencia)
+                if c and c.group(1) != "PRIMARY":
+                    columnas_archivo[tabla_actual].append(c.group(1))
+                continue
+            m = _RE_INSERT.match(sentencia)
+            if not m:
+                continue
+            tabla = m.group(1)
+            if tabla not in destino or tabla in _TABLAS_EXCLUIDAS:
+                omitidas.add(tabla)
+                continue
+            if tabla not in spools:
+                if tabla not in columnas_archivo:
+                    raise ErrorRestauracion(f"INSERT sin CREATE TABLE previo: {tabla}")
+                spools[tabla] = _SpoolTabla(tabla, columnas_archivo[tabla], destino[tabla])
+            valores = _parsear_valores(m.group(2))
+            if len(valores) != len(columnas_archivo[tabla]):
+                raise ErrorRestauracion(
+                    f"{tabla}: se esperaban {len(columnas_archivo[tabla])} valores, "
+                    f"se encontraron {len(valores)}")
+            spools[tabla].agregar(valores)
+
+        orden = _orden_carga(spools)
+        lectura = time.perf_counter() - inicio
+
+        # 2. Carga por COPY en orden de dependencias
+        modo = _desactivar_restricciones(cursor)
+        cursor.execute("SET LOCAL synchronous_commit = off")
+        if truncar and orden:
+            cursor.execute(
+                f"TRUNCATE {', '.join(_quote(t) for t in orden)} RESTART IDENTITY CASCADE")
+
+        detalle_tablas = []
+        for tabla in orden:
+            spool = spools[tabla]
+            t0 = time.perf_counter()
+            copy_sql = (f"COPY {_quote(tabla)} "
+                        f"({', '.join(_quote(c) for c in spool.columnas)}) FROM STDIN")
+            lotes = 0
+            for lote in spool.lotes(tamano_lote):
+                cursor.copy_expert(copy_sql, io.StringIO(lote))
+                lotes += 1
+            detalle_tablas.append({
+                "tabla": tabla,
+                "filas": spool.filas,
+                "lotes": lotes,
+                "segundos": round(time.perf_counter() - t0, 3),
+            })
+
+        # 3. Secuencias
+        secuencias = _reajustar_secuencias(cursor, orden)
+    finally:
+        for spool in spools.values():
+            spool.cerrar()
+
+    total = time.perf_counter() - inicio
+    filas = sum(t["filas"] for t in detalle_tablas)
+    return {
+        "tablas": detalle_tablas,
+        "tablas_omitidas": sorted(omitidas),
+        "filas_totales": filas,
+        "bytes_leidos": bytes_leidos,
+        "secuencias_reajustadas": secuencias,
+        "modo_restricciones": modo,
+        "segundos_lectura": round(lectura, 3),
+        "segundos_totales": round(total, 3),
+        "filas_por_segundo": round(filas / total, 1) if total > 0 else 0.0,
+        "mb_por_segundo": round(bytes_leidos / (1024 * 1024) / total, 2) if total > 0 else 0.0,
+    }
+
+
+if __name__ == "__main__":
+    from app.database import engine
+
+    if len(sys.argv) < 2:
+        print("Uso: python -m app.restauracion <archivo.sql> [tamano_lote]")
+        sys.exit(1)
+
+    lote = int(sys.argv[2]) if len(sys.argv) > 2 else TAMANO_LOTE
+    conexion = engine.raw_connection()
+    try:
+        with open(sys.argv[1], encoding="utf-8") as f:
+            reporte = restaurar(conexion, f, tamano_lote=lote)
+        # Igual que invalidar_todo() de app.cache_http
+        conexion.cursor().execute("UPDATE version_recurso SET version = version + 1")
+        conexion.commit()
+    except Exception:
+        conexion.rollback()
+        raise
+    finally:
+        conexion.close()
+
+    for t in reporte["tablas"]:
+        print(f"{t['tabla']:<35} {t['filas']:>10} filas  {t['segundos']:>8.3f}s")
+    print(f"Total: {reporte['filas_totales']} filas en {reporte['segundos_totales']}s "
+          f"({reporte['filas_por_segundo']} filas/s, {reporte['mb_por_segundo']} MB/s)")
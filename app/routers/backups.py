@@ -1,16 +1,19 @@
+import io
 import os
 import subprocess
 import csv
 from sqlalchemy import inspect, text
 from datetime import datetime
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, UploadFile, File
 from fastapi.responses import FileResponse
 from sqlalchemy.orm import Session
 from typing import List
 from app.database import get_db
 from app.models.personal import Personal
-from app.schemas.backup import BackupResponse, BackupListResponse
+from app.schemas.backup import BackupResponse, BackupListResponse, RestauracionResponse
 from app.dependencies import get_current_active_user, require_admin
+from app.restauracion import restaurar, ErrorRestauracion, TAMANO_LOTE
+from app.cache_http import invalidar_todo
 
 router = APIRouter(
     prefix="/backups",
@@ -216,3 +219,86 @@ def eliminar_backup(
         )
 
     os.remove(filepath)
+
+
+def _ejecutar_restauracion(db: Session, lineas, origen: str, tamano_lote: int) -> dict:
+    """Corre la restauración dentro de la transacción de la sesión y la confirma."""
+    if db.get_bind().dialect.name != "postgresql":
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="La restauración solo está disponible sobre PostgreSQL"
+        )
+
+    try:
+        reporte = restaurar(db.connection().connection, lineas, tamano_lote=tamano_lote)
+        invalidar_todo(db)
+        db.commit()
+    except ErrorRestauracion as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Backup inválido: {str(e)}"
+        )
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error al restaurar backup: {str(e)}"
+        )
+
+    return {"origen": origen, **reporte}
+
+
+@router.post(
+    "/restaurar/{filename}",
+    response_model=RestauracionResponse,
+    summary="Restaurar un backup del catálogo"
+)
+def restaurar_backup(
+    filename: str,
+    tamano_lote: int = Query(TAMANO_LOTE, ge=1000, le=1_000_000),
+    db: Session = Depends(get_db),
+    current_user: Personal = Depends(require_admin)
+):
+    """
+    Restaura un backup existente en el directorio de backups.
+    Las tablas del backup se vacían y se recargan con COPY en orden de dependencias.
+    Requiere privilegios de administrador.
+    """
+    # Validar nombre de archivo por seguridad
+    if not filename.endswith(".sql") or "/" in filename or ".." in filename:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Nombre de archivo inválido"
+        )
+
+    filepath = os.path.join(BACKUP_DIR, filename)
+
+    if not os.path.exists(filepath):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Backup no encontrado"
+        )
+
+    with open(filepath, encoding="utf-8") as f:
+        return _ejecutar_restauracion(db, f, filename, tamano_lote)
+
+
+@router.post(
+    "/restaurar",
+    response_model=RestauracionResponse,
+    summary="Restaurar un backup subido"
+)
+def restaurar_backup_subido(
+    archivo: UploadFile = File(...),
+    tamano_lote: int = Query(TAMANO_LOTE, ge=1000, le=1_000_000),
+    db: Session = Depends(get_db),
+    current_user: Personal = Depends(require_admin)
+):
+    """
+    Restaura un backup SQL enviado como archivo (multipart).
+    El archivo se procesa en streaming, sin cargarlo completo en memoria.
+    Requiere privilegios de administrador.
+    """
+    lineas = io.TextIOWrapper(archivo.file, encoding="utf-8")
+    return _ejecutar_restauracion(db, lineas, archivo.filename or "subido", tamano_lote)
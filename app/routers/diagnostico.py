@@ -0,0 +1,78 @@
+import json
+from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import FileResponse
+from app.models.personal import Personal
+from app.schemas.diagnostico import PerfilResumenResponse, PerfilResponse, ConsultasResponse
+from app.dependencies import require_admin
+from app.perfilado import listar_perfiles, ruta_perfil
+from app.consultas_lentas import registro_consultas, UMBRAL_MS
+
+router = APIRouter(
+    prefix="/diagnostico",
+    tags=["Diagnóstico"],
+)
+
+
+@router.get("/perfiles", response_model=List[PerfilResumenResponse])
+def listar_perfiles_guardados(
+    current_user: Personal = Depends(require_admin)
+):
+    """
+    Perfiles de peticiones guardados (las pedidas con X-Perfilar: 1 o
+    ?perfilar=1), del más reciente al más viejo.
+    """
+    return listar_perfiles()
+
+
+@router.get("/perfiles/{perfil_id}", response_model=PerfilResponse)
+def obtener_perfil(
+    perfil_id: str,
+    current_user: Personal = Depends(require_admin)
+):
+    """Resumen de cProfile y sentencias SQL de una petición perfilada"""
+    ruta = ruta_perfil(perfil_id, "json")
+    if ruta is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Perfil no encontrado")
+    with open(ruta, encoding="utf-8") as archivo:
+        return json.load(archivo)
+
+
+@router.get("/perfiles/{perfil_id}/descargar")
+def descargar_perfil(
+    perfil_id: str,
+    current_user: Personal = Depends(require_admin)
+):
+    """Archivo .prof de cProfile (se abre con pstats, snakeviz, etc.)"""
+    ruta = ruta_perfil(perfil_id, "prof")
+    if ruta is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Perfil no encontrado")
+    return FileResponse(
+        ruta,
+        filename=f"{perfil_id}.prof",
+        media_type="application/octet-stream"
+    )
+
+
+@router.get("/consultas", response_model=ConsultasResponse)
+def consultas_mas_costosas(
+    orden: str = Query("total", pattern="^(total|p95|max|cantidad)$"),
+    limite: int = Query(20, ge=1, le=500),
+    current_user: Personal = Depends(require_admin)
+):
+    """
+    Consultas SQL agrupadas por huella (literales y parámetros normalizados)
+    desde que arrancó el proceso, de mayor a menor según `orden`.
+    """
+    return {
+        "umbral_lentas_ms": UMBRAL_MS,
+        "consultas": registro_consultas.top(orden, limite)
+    }
+
+
+@router.delete("/consultas", status_code=status.HTTP_204_NO_CONTENT)
+def reiniciar_consultas(
+    current_user: Personal = Depends(require_admin)
+):
+    """Vacía los agregados por huella (p. ej. después de un despliegue)"""
+    registro_consultas.reiniciar()
@@ -1,8 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select, text, tuple_, literal_column
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session, selectinload
 from typing import List, Optional
 from decimal import Decimal
-from datetime import date
+from datetime import date, datetime
 from app.models.personal import Personal
 from app.database import get_db
 from app.models import (
@@ -10,7 +14,9 @@ from app.models import (
     InventarioProductoEstablecido,
     Sucursal,
     MateriaPrima,
-    ProductoEstablecido
+    ProductoEstablecido,
+    Transferencia,
+    DetalleTransferencia
 )
 from app.schemas.inventario import (
     InventarioMateriaResponse,
@@ -19,10 +25,37 @@ from app.schemas.inventario import (
     AjusteProductoStock,
     TransferenciaProductos,
     AlertaStockResponse,
+    AlertaInventarioResponse,
     AsignarMateriaPrimaSucursal,
-    AsignarProductoSucursal
+    AsignarProductoSucursal,
+    AjusteLoteMateria,
+    AjusteLoteProducto,
+    AjusteLoteResponse,
+    MovimientoTransferencia,
+    TransferenciaLote,
+    TransferenciaResponse,
+    InicializarSucursal,
+    InicializarSucursalResponse,
+    SnapshotResponse,
+    StockHistoricoResponse,
+    VariacionResponse
 )
+from app.serializacion import RespuestaJSONRapida
+from app.cambios_stock import registrar_cambio, TIPO_MATERIA, TIPO_PRODUCTO
+from app.eventos import canal_sucursal, obtener_backend
+from app.historial_inventario import tomar_snapshot, stock_en, reporte_variacion
 from app.dependencies import get_current_user, require_encargado, require_admin_or_encargado, require_admin
+from app.cache_http import (
+    RECURSO_MATERIAS,
+    RECURSO_PRODUCTOS,
+    recurso_inventario_materias,
+    recurso_inventario_productos,
+    etag_recursos,
+    no_modificado,
+    respuesta_no_modificada,
+    marcar_etag,
+    invalidar
+)
 
 router = APIRouter(
     prefix="/inventario",
@@ -74,6 +107,9 @@ def asignar_materia_prima_sucursal(
     )
 
     db.add(nuevo_inventario)
+    registrar_cambio(db, TIPO_MATERIA, asignacion.id_sucursal, asignacion.id_materia_prima,
+                     None, asignacion.cantidad_inicial, "asignacion")
+    invalidar(db, recurso_inventario_materias(asignacion.id_sucursal))
     db.commit()
 
     return {
@@ -87,11 +123,20 @@ def asignar_materia_prima_sucursal(
 @router.get("/materias-primas/sucursal/{sucursal_id}", response_model=List[InventarioMateriaResponse])
 def obtener_inventario_materias(
     sucursal_id: int,
+    request: Request,
+    response: Response,
     bajo_stock: Optional[bool] = None,
     db: Session = Depends(get_db),
     current_user: Personal = Depends(get_current_user)
 ):
-    """Obtiene el inventario de materias primas de una sucursal"""
+    """Obtiene el inventario de materias primas de una sucursal (admite If-None-Match)"""
+    # El listado incluye datos del catálogo, así que depende de ambas versiones
+    etag = etag_recursos(
+        db, RECURSO_MATERIAS, recurso_inventario_materias(sucursal_id))
+    if no_modificado(request, etag):
+        return respuesta_no_modificada(etag)
+    marcar_etag(response, etag)
+
     # Verificar existencia de sucursal
     if not db.query(Sucursal).filter_by(id_sucursal=sucursal_id).first():
         raise HTTPException(status_code=404, detail="Sucursal no encontrada")
@@ -156,7 +201,11 @@ def ajustar_stock_materia(
         raise HTTPException(
             status_code=404, detail="Materia prima no encontrada")
 
+    anterior = inventario.cantidad_stock
     inventario.cantidad_stock = ajuste.cantidad
+    registrar_cambio(db, TIPO_MATERIA, id_sucursal, id_materia,
+                     anterior, inventario.cantidad_stock, "ajuste")
+    invalidar(db, recurso_inventario_materias(id_sucursal))
     db.commit()
 
     return {
@@ -210,6 +259,9 @@ def asignar_producto_sucursal(
     )
 
     db.add(nuevo_inventario)
+    registrar_cambio(db, TIPO_PRODUCTO, asignacion.id_sucursal, asignacion.id_producto_establecido,
+                     None, asignacion.cantidad_inicial, "asignacion")
+    invalidar(db, recurso_inventario_productos(asignacion.id_sucursal))
     db.commit()
 
     return {
@@ -223,10 +275,18 @@ def asignar_producto_sucursal(
 @router.get("/productos/sucursal/{sucursal_id}", response_model=List[InventarioProductoResponse])
 def obtener_inventario_productos(
     sucursal_id: int,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     current_user: Personal = Depends(get_current_user)
 ):
-    """Obtiene el inventario de productos establecidos de una sucursal"""
+    """Obtiene el inventario de productos establecidos de una sucursal (admite If-None-Match)"""
+    etag = etag_recursos(
+        db, RECURSO_PRODUCTOS, recurso_inventario_productos(sucursal_id))
+    if no_modificado(request, etag):
+        return respuesta_no_modificada(etag)
+    marcar_etag(response, etag)
+
     # Verificar existencia de sucursal
     if not db.query(Sucursal).filter_by(id_sucursal=sucursal_id).first():
         raise HTTPException(status_code=404, detail="Sucursal no encontrada")
@@ -271,7 +331,11 @@ def ajustar_stock_producto(
         raise HTTPException(
             status_code=404, detail="Registro de inventario no encontrado")
 
+    anterior = inventario.cantidad_disponible
     inventario.cantidad_disponible = ajuste.cantidad
+    registrar_cambio(db, TIPO_PRODUCTO, id_sucursal, id_producto,
+                     anterior, inventario.cantidad_disponible, "ajuste")
+    invalidar(db, recurso_inventario_productos(id_sucursal))
     db.commit()
 
     return {
@@ -287,65 +351,151 @@ def transferir_productos(
     current_user: Personal = Depends(require_admin_or_encargado)
 ):
     """Transfiere productos entre sucursales (solo admin o encargado)"""
-    # Validaciones básicas
-    if transferencia.id_sucursal_origen == transferencia.id_sucursal_destino:
-        raise HTTPException(
-            status_code=400, detail="No se puede transferir a la misma sucursal")
-
     if transferencia.cantidad <= 0:
         raise HTTPException(
             status_code=400, detail="La cantidad debe ser mayor a cero")
 
-    # Verificar sucursales
-    sucursal_origen = db.query(Sucursal).get(transferencia.id_sucursal_origen)
-    sucursal_destino = db.query(Sucursal).get(
-        transferencia.id_sucursal_destino)
-
-    if not sucursal_origen or not sucursal_destino:
-        raise HTTPException(status_code=404, detail="Sucursal no encontrada")
+    # Usa el mismo motor que las transferencias por lote (bloqueos y documento)
+    movimiento = MovimientoTransferencia(
+        tipo_item='producto',
+        id_item=transferencia.id_producto_establecido,
+        id_sucursal_origen=transferencia.id_sucursal_origen,
+        id_sucursal_destino=transferencia.id_sucursal_destino,
+        cantidad=transferencia.cantidad
+    )
+    _, stocks = _aplicar_transferencias(
+        db, [movimiento], current_user.id_personal, transferencia.motivo)
+    db.commit()
 
-    # Verificar producto en origen
-    inventario_origen = db.query(InventarioProductoEstablecido).filter_by(
-        id_sucursal=transferencia.id_sucursal_origen,
-        id_producto_establecido=transferencia.id_producto_establecido
-    ).first()
+    return {
+        "message": "Transferencia completada",
+        "stock_origen_actualizado": stocks[(
+            'producto', transferencia.id_sucursal_origen, transferencia.id_producto_establecido)],
+        "stock_destino_actualizado": stocks[(
+            'producto', transferencia.id_sucursal_destino, transferencia.id_producto_establecido)]
+    }
 
-    if not inventario_origen:
-        raise HTTPException(
-            status_code=404, detail="Producto no encontrado en sucursal origen")
 
-    # Verificar stock suficiente
-    if inventario_origen.cantidad_disponible < transferencia.cantidad:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Stock insuficiente. Disponible: {inventario_origen.cantidad_disponible}, Solicitado: {transferencia.cantidad}"
-        )
+# Una sola consulta para toda la cadena: bajo stock de materias y productos y
+# materias caducadas o por caducar. count(*) OVER () da el total para paginar;
+# con {columnas} = count(*) y {pagina} vacía la misma consulta solo cuenta.
+_SQL_ALERTAS = """
+    WITH alertas AS (
+        SELECT 'materia_prima' AS tipo, 'bajo_stock' AS motivo,
+               CASE WHEN i.cantidad_stock <= 0 THEN 3
+                    WHEN i.cantidad_stock < m.stock_minimo / 2 THEN 2
+                    ELSE 1 END AS nivel,
+               i.id_sucursal, i.id_materia_prima AS id_item, m.nombre, m.unidad,
+               i.cantidad_stock AS stock_actual, m.stock_minimo,
+               m.stock_minimo - i.cantidad_stock AS diferencia, m.fecha_caducidad
+        FROM inventario_materiaprima i
+        JOIN materia_prima m ON m.id_materia_prima = i.id_materia_prima
+        WHERE i.cantidad_stock < m.stock_minimo
+        UNION ALL
+        SELECT 'materia_prima',
+               CASE WHEN m.fecha_caducidad < CURRENT_DATE THEN 'caducado' ELSE 'por_caducar' END,
+               CASE WHEN m.fecha_caducidad < CURRENT_DATE THEN 3
+                    WHEN m.fecha_caducidad <= CURRENT_DATE + 2 THEN 2
+                    ELSE 1 END,
+               i.id_sucursal, i.id_materia_prima, m.nombre, m.unidad,
+               i.cantidad_stock, m.stock_minimo, NULL, m.fecha_caducidad
+        FROM materia_prima m
+        JOIN inventario_materiaprima i ON i.id_materia_prima = m.id_materia_prima
+        WHERE m.fecha_caducidad IS NOT NULL
+        AND m.fecha_caducidad <= CURRENT_DATE + :dias_caducidad
+        AND i.cantidad_stock > 0
+        UNION ALL
+        SELECT 'producto', 'bajo_stock',
+               CASE WHEN i.cantidad_disponible <= 0 THEN 3
+                    WHEN i.cantidad_disponible * 2 < p.stock_minimo THEN 2
+                    ELSE 1 END,
+               i.id_sucursal, i.id_producto_establecido, p.nombre, NULL,
+               i.cantidad_disponible, p.stock_minimo,
+               p.stock_minimo - i.cantidad_disponible, NULL
+        FROM producto_establecido p
+        JOIN inventario_productoestablecido i
+          ON i.id_producto_establecido = p.id_producto_establecido
+        WHERE p.stock_minimo > 0
+        AND i.cantidad_disponible < p.stock_minimo
+    )
+    SELECT {columnas}
+    FROM alertas a
+    JOIN sucursal s ON s.id_sucursal = a.id_sucursal
+    WHERE (CAST(:tipo AS VARCHAR) IS NULL OR a.tipo = :tipo)
+    AND (CAST(:id_sucursal AS INTEGER) IS NULL OR a.id_sucursal = :id_sucursal)
+    AND a.nivel >= :nivel_minimo
+    {pagina}
+"""
+_COLUMNAS_ALERTAS = "a.*, s.nombre AS sucursal_nombre, count(*) OVER () AS total"
+_PAGINA_ALERTAS = "ORDER BY {orden} LIMIT :limite OFFSET :desplazamiento"
 
-    # Buscar o crear registro en destino
-    inventario_destino = db.query(InventarioProductoEstablecido).filter_by(
-        id_sucursal=transferencia.id_sucursal_destino,
-        id_producto_establecido=transferencia.id_producto_establecido
-    ).first()
+_ORDEN_ALERTAS = {
+    "severidad": "a.nivel DESC, a.diferencia DESC NULLS LAST, a.id_sucursal, a.id_item",
+    "sucursal": "a.id_sucursal, a.nivel DESC, a.id_item",
+    "nombre": "a.nombre, a.id_sucursal",
+    "caducidad": "a.fecha_caducidad NULLS LAST, a.nivel DESC, a.id_sucursal",
+}
+_SEVERIDADES = {3: "critica", 2: "alta", 1: "media"}
 
-    if not inventario_destino:
-        inventario_destino = InventarioProductoEstablecido(
-            id_sucursal=transferencia.id_sucursal_destino,
-            id_producto_establecido=transferencia.id_producto_establecido,
-            cantidad_disponible=0
-        )
-        db.add(inventario_destino)
 
-    # Realizar transferencia
-    inventario_origen.cantidad_disponible -= transferencia.cantidad
-    inventario_destino.cantidad_disponible += transferencia.cantidad
+@router.get("/alertas", response_model=List[AlertaInventarioResponse])
+def obtener_alertas_cadena(
+    tipo: Optional[str] = Query(None, pattern="^(materia_prima|producto)$"),
+    id_sucursal: Optional[int] = None,
+    severidad_minima: str = Query("media", pattern="^(critica|alta|media)$"),
+    dias_caducidad: int = Query(7, ge=0, le=365),
+    orden: str = Query("severidad", pattern="^(severidad|sucursal|nombre|caducidad)$"),
+    page: int = Query(1, ge=1),
+    page_size: int = Query(50, ge=1, le=500),
+    db: Session = Depends(get_db),
+    current_user: Personal = Depends(get_current_user)
+):
+    """
+    Alertas de inventario de todas las sucursales (bajo stock de materias primas y
+    productos, materias caducadas o por caducar), ordenadas por severidad y paginadas.
+    """
+    niveles = {v: k for k, v in _SEVERIDADES.items()}
+    filtros = {
+        "tipo": tipo,
+        "id_sucursal": id_sucursal,
+        "nivel_minimo": niveles[severidad_minima],
+        "dias_caducidad": dias_caducidad,
+    }
+    filas = db.execute(
+        text(_SQL_ALERTAS.format(columnas=_COLUMNAS_ALERTAS,
+                                 pagina=_PAGINA_ALERTAS.format(orden=_ORDEN_ALERTAS[orden]))),
+        {**filtros, "limite": page_size, "desplazamiento": (page - 1) * page_size}
+    ).mappings().all()
 
-    db.commit()
+    if filas:
+        total = filas[0]["total"]
+    elif page > 1:
+        # Página después de la última: el total se cuenta aparte
+        total = db.execute(text(_SQL_ALERTAS.format(columnas="count(*)", pagina="")), filtros).scalar()
+    else:
+        total = 0
+    alertas = [{
+        "tipo": f["tipo"],
+        "motivo": f["motivo"],
+        "severidad": _SEVERIDADES[f["nivel"]],
+        "id_item": f["id_item"],
+        "nombre": f["nombre"],
+        "unidad": f["unidad"],
+        "stock_actual": f["stock_actual"],
+        "stock_minimo": f["stock_minimo"],
+        "diferencia": f["diferencia"],
+        "sucursal_id": f["id_sucursal"],
+        "sucursal_nombre": f["sucursal_nombre"],
+        "fecha_caducidad": f["fecha_caducidad"]
+    } for f in filas]
 
-    return {
-        "message": "Transferencia completada",
-        "stock_origen_actualizado": inventario_origen.cantidad_disponible,
-        "stock_destino_actualizado": inventario_destino.cantidad_disponible
+    headers = {
+        "X-Total-Count": str(total),
+        "X-Page": str(page),
+        "X-Page-Size": str(page_size),
+        "X-Total-Pages": str((total + page_size - 1) // page_size)
     }
+    return RespuestaJSONRapida(content=alertas, headers=headers)
 
 
 @router.get("/alertas/sucursal/{sucursal_id}", response_model=List[AlertaStockResponse])
@@ -388,3 +538,559 @@ def obtener_alertas_stock(
     } for item in materias_bajas]
 
     return alertas
+
+
+# Comentario SSE que mantiene viva la conexión a través de proxies
+_SSE_LATIDO = b": ping\n\n"
+SEGUNDOS_LATIDO = 15
+
+
+def _sucursal_para_stream(
+    sucursal_id: int,
+    db: Session = Depends(get_db),
+    current_user: Personal = Depends(get_current_user)
+) -> int:
+    """
+    Verifica la sucursal antes de abrir el stream. Es síncrona para que FastAPI
+    la corra en el threadpool y la consulta no bloquee el event loop.
+    """
+    if not db.query(Sucursal).get(sucursal_id):
+        raise HTTPException(status_code=404, detail="Sucursal no encontrada")
+    # El stream no usa la base: se libera la conexión en vez de retenerla
+    # mientras dure la suscripción
+    db.close()
+    return sucursal_id
+
+
+@router.get("/alertas/sucursal/{sucursal_id}/stream")
+async def stream_alertas_stock(
+    request: Request,
+    sucursal_id: int = Depends(_sucursal_para_stream)
+):
+    """
+    Canal Server-Sent Events con los cruces de stock mínimo de una sucursal.
+    Emite 'stock_bajo' cuando una materia prima o producto baja de su mínimo y
+    'stock_repuesto' cuando vuelve a alcanzarlo (por pedidos confirmados, ajustes
+    o transferencias). Reemplaza el sondeo de /alertas/sucursal/{id}.
+    """
+    backend = obtener_backend()
+    suscripcion = backend.suscribir(canal_sucursal(sucursal_id))
+
+    async def eventos():
+        try:
+            yield b"retry: 5000\n\n"
+            while not await request.is_disconnected():
+                try:
+                    yield await asyncio.wait_for(suscripcion.siguiente(), SEGUNDOS_LATIDO)
+                except asyncio.TimeoutError:
+                    yield _SSE_LATIDO
+        finally:
+            backend.desuscribir(suscripcion)
+
+    return StreamingResponse(
+        eventos(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+# --------------------------
+# Ajustes de stock por lote
+# --------------------------
+
+
+def _combinar_ajustes(ajustes, campo_item: str) -> dict:
+    """
+    Combina los ajustes repetidos de un mismo (sucursal, item) en orden de llegada:
+    un absoluto reemplaza lo anterior y los deltas se acumulan sobre él.
+    Devuelve {(id_sucursal, id_item): (modo, cantidad)} conservando el orden.
+    """
+    combinados = {}
+    for ajuste in ajustes:
+        clave = (ajuste.id_sucursal, getattr(ajuste, campo_item))
+        previo = combinados.get(clave)
+        if ajuste.modo == 'absoluto' or previo is None:
+            combinados[clave] = (ajuste.modo, ajuste.cantidad)
+        else:
+            combinados[clave] = (previo[0], previo[1] + ajuste.cantidad)
+    return combinados
+
+
+def _ajustar_stock_lote(
+    db: Session,
+    modelo,
+    catalogo,
+    campo_item: str,
+    campo_cantidad: str,
+    ajustes,
+    stock_minimo: bool,
+    tipo: str
+) -> dict:
+    """
+    Aplica un lote de ajustes sobre una tabla de inventario en una sola transacción.
+
+    Se valida todo con una consulta por tabla (sucursales, catálogo y filas
+    existentes) y luego se escriben los absolutos y los deltas con un
+    INSERT ... ON CONFLICT DO UPDATE por grupo. Un delta que dejaría el stock
+    en negativo no se aplica (la condición va en el propio UPDATE).
+    """
+    combinados = _combinar_ajustes(ajustes, campo_item)
+    claves = list(combinados)
+    col_item = getattr(modelo, campo_item)
+    col_cantidad = getattr(modelo, campo_cantidad)
+    col_catalogo = getattr(catalogo, campo_item)
+
+    ids_sucursal = {s for s, _ in claves}
+    ids_item = {i for _, i in claves}
+    sucursales = set(db.execute(
+        select(Sucursal.id_sucursal).where(Sucursal.id_sucursal.in_(ids_sucursal))
+    ).scalars())
+    columnas_catalogo = [col_catalogo]
+    if stock_minimo:
+        columnas_catalogo.append(catalogo.stock_minimo)
+    minimos = {fila[0]: (fila[1] if stock_minimo else None) for fila in db.execute(
+        select(*columnas_catalogo).where(col_catalogo.in_(ids_item))
+    )}
+    existentes = {(s, i): c for s, i, c in db.execute(
+        select(modelo.id_sucursal, col_item, col_cantidad)
+        .where(tuple_(modelo.id_sucursal, col_item).in_(claves))
+    )}
+
+    resultados = {}
+    filas = {'absoluto': [], 'delta': []}
+    for clave in sorted(claves):
+        id_sucursal, id_item = clave
+        modo, cantidad = combinados[clave]
+        resultado = {"id_sucursal": id_sucursal, "id_item": id_item}
+        if id_sucursal not in sucursales:
+            resultados[clave] = {**resultado, "resultado": "no_encontrado",
+                                 "detalle": "Sucursal no encontrada"}
+        elif id_item not in minimos:
+            resultados[clave] = {**resultado, "resultado": "no_encontrado",
+                                 "detalle": "Item no encontrado en el catálogo"}
+        elif cantidad < 0 and (modo == 'absoluto' or clave not in existentes):
+            resultados[clave] = {**resultado, "resultado": "rechazado",
+                                 "detalle": "El stock no puede quedar negativo"}
+        else:
+            filas[modo].append({
+                "id_sucursal": id_sucursal,
+                campo_item: id_item,
+                campo_cantidad: cantidad
+            })
+
+    for modo, valores in filas.items():
+        if not valores:
+            continue
+        stmt = pg_insert(modelo).values(valores)
+        if modo == 'absoluto':
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[modelo.id_sucursal, col_item],
+                set_={campo_cantidad: stmt.excluded[campo_cantidad]}
+            )
+        else:
+            nuevo = col_cantidad + stmt.excluded[campo_cantidad]
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[modelo.id_sucursal, col_item],
+                set_={campo_cantidad: nuevo},
+                where=nuevo >= 0
+            )
+        stmt = stmt.returning(
+            modelo.id_sucursal, col_item, col_cantidad,
+            literal_column("(xmax = 0)").label("creado")
+        )
+        for id_sucursal, id_item, stock, creado in db.execute(stmt):
+            registrar_cambio(db, tipo, id_sucursal, id_item,
+                             existentes.get((id_sucursal, id_item)), stock, "ajuste")
+            minimo = minimos[id_item]
+            resultados[(id_sucursal, id_item)] = {
+                "id_sucursal": id_sucursal,
+                "id_item": id_item,
+                "resultado": "creado" if creado else "actualizado",
+                "nuevo_stock": stock,
+                "bajo_stock": stock < minimo if minimo is not None else None
+            }
+        # Los deltas filtrados por la condición del UPDATE no vuelven en RETURNING
+        for valor in valores:
+            clave = (valor["id_sucursal"], valor[campo_item])
+            if clave not in resultados:
+                resultados[clave] = {
+                    "id_sucursal": clave[0], "id_item": clave[1],
+                    "resultado": "rechazado", "detalle": "Stock insuficiente"
+                }
+
+    ordenados = [resultados[clave] for clave in claves]
+    conteo = {r["resultado"]: 0 for r in ordenados}
+    for r in ordenados:
+        conteo[r["resultado"]] += 1
+    return {
+        "procesados": len(ordenados),
+        "creados": conteo.get("creado", 0),
+        "actualizados": conteo.get("actualizado", 0),
+        "rechazados": conteo.get("rechazado", 0) + conteo.get("no_encontrado", 0),
+        "resultados": ordenados,
+        "sucursales_afectadas": sorted({
+            r["id_sucursal"] for r in ordenados if r["resultado"] in ("creado", "actualizado")})
+    }
+
+
+@router.post("/materias-primas/ajustar-lote", response_model=AjusteLoteResponse)
+def ajustar_stock_materias_lote(
+    lote: AjusteLoteMateria,
+    db: Session = Depends(get_db),
+    current_user: Personal = Depends(require_admin_or_encargado)
+):
+    """
+    Ajusta el stock de muchas materias primas en una o varias sucursales en una sola
+    transacción (conteos de inventario). Cada ajuste es 'absoluto' o 'delta';
+    los pares (sucursal, materia) sin registro se crean.
+    Devuelve un resultado por par (los repetidos se combinan en orden).
+    """
+    resumen = _ajustar_stock_lote(
+        db, InventarioMateriaPrima, MateriaPrima,
+        "id_materia_prima", "cantidad_stock", lote.ajustes, stock_minimo=True,
+        tipo=TIPO_MATERIA)
+    invalidar(db, *[recurso_inventario_materias(s) for s in resumen.pop("sucursales_afectadas")])
+    db.commit()
+    return resumen
+
+
+@router.post("/productos/ajustar-lote", response_model=AjusteLoteResponse)
+def ajustar_stock_productos_lote(
+    lote: AjusteLoteProducto,
+    db: Session = Depends(get_db),
+    current_user: Personal = Depends(require_admin_or_encargado)
+):
+    """
+    Ajusta el stock de muchos productos en una o varias sucursales en una sola
+    transacción. Mismas reglas que el ajuste por lote de materias primas.
+    """
+    resumen = _ajustar_stock_lote(
+        db, InventarioProductoEstablecido, ProductoEstablecido,
+        "id_producto_establecido", "cantidad_disponible", lote.ajustes, stock_minimo=False,
+        tipo=TIPO_PRODUCTO)
+    invalidar(db, *[recurso_inventario_productos(s) for s in resumen.pop("sucursales_afectadas")])
+    db.commit()
+    return resumen
+
+
+# --------------------------
+# Transferencias por lote
+# --------------------------
+
+# tipo_item -> (inventario, catálogo, columna del item, columna de stock, recurso ETag)
+_TABLAS_TRANSFERENCIA = {
+    'materia_prima': (InventarioMateriaPrima, MateriaPrima, "id_materia_prima",
+                      "cantidad_stock", recurso_inventario_materias),
+    'producto': (InventarioProductoEstablecido, ProductoEstablecido, "id_producto_establecido",
+                 "cantidad_disponible", recurso_inventario_productos),
+}
+
+
+def _aplicar_transferencias(db: Session, movimientos: List[MovimientoTransferencia],
+                            id_personal: int, motivo: Optional[str] = None):
+    """
+    Aplica todos los movimientos en la transacción actual y registra el documento
+    de transferencia (no hace commit).
+
+    Los movimientos se netean por (sucursal, item) y las filas de inventario
+    involucradas se bloquean con SELECT ... FOR UPDATE en un orden fijo (tabla,
+    sucursal, item), así dos lotes concurrentes no pueden cruzarse en un deadlock.
+    Si a alguna sucursal origen no le alcanza el stock no se aplica nada.
+
+    Devuelve (transferencia, {(tipo_item, id_sucursal, id_item): nuevo_stock}).
+    """
+    netos = {tipo: {} for tipo in _TABLAS_TRANSFERENCIA}
+    for m in movimientos:
+        if m.id_sucursal_origen == m.id_sucursal_destino:
+            raise HTTPException(
+                status_code=400, detail="No se puede transferir a la misma sucursal")
+        if m.tipo_item == 'producto' and m.cantidad != int(m.cantidad):
+            raise HTTPException(
+                status_code=400, detail="La cantidad de un producto debe ser entera")
+        por_tipo = netos[m.tipo_item]
+        origen = (m.id_sucursal_origen, m.id_item)
+        destino = (m.id_sucursal_destino, m.id_item)
+        por_tipo[origen] = por_tipo.get(origen, 0) - m.cantidad
+        por_tipo[destino] = por_tipo.get(destino, 0) + m.cantidad
+
+    ids_sucursal = {s for por_tipo in netos.values() for s, _ in por_tipo}
+    existentes = set(db.execute(
+        select(Sucursal.id_sucursal).where(Sucursal.id_sucursal.in_(ids_sucursal))
+    ).scalars())
+    if ids_sucursal - existentes:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Sucursales no encontradas: {sorted(ids_sucursal - existentes)}")
+
+    faltantes = []
+    stocks = {}
+    for tipo, por_tipo in netos.items():
+        if not por_tipo:
+            continue
+        modelo, catalogo, campo_item, campo_cantidad, _ = _TABLAS_TRANSFERENCIA[tipo]
+        col_item = getattr(modelo, campo_item)
+        col_cantidad = getattr(modelo, campo_cantidad)
+
+        ids_item = {i for _, i in por_tipo}
+        en_catalogo = set(db.execute(
+            select(getattr(catalogo, campo_item)).where(getattr(catalogo, campo_item).in_(ids_item))
+        ).scalars())
+        if ids_item - en_catalogo:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Items de tipo {tipo} no encontrados: {sorted(ids_item - en_catalogo)}")
+
+        # Bloqueo de origen y destino en orden determinista
+        claves = sorted(por_tipo)
+        actuales = {(s, i): c for s, i, c in db.execute(
+            select(modelo.id_sucursal, col_item, col_cantidad)
+            .where(tuple_(modelo.id_sucursal, col_item).in_(claves))
+            .order_by(modelo.id_sucursal, col_item)
+            .with_for_update()
+        )}
+        for clave in claves:
+            neto = por_tipo[clave]
+            disponible = actuales.get(clave, 0)
+            if neto < 0 and disponible + neto < 0:
+                faltantes.append({
+                    "tipo_item": tipo,
+                    "id_sucursal": clave[0],
+                    "id_item": clave[1],
+                    "disponible": str(disponible),
+                    "requerido": str(-neto)
+                })
+
+        if faltantes:
+            continue
+        valores = [{
+            "id_sucursal": s,
+            campo_item: i,
+            campo_cantidad: int(por_tipo[(s, i)]) if tipo == 'producto' else por_tipo[(s, i)]
+        } for s, i in claves]
+        stmt = pg_insert(modelo).values(valores)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[modelo.id_sucursal, col_item],
+            set_={campo_cantidad: col_cantidad + stmt.excluded[campo_cantidad]}
+        ).returning(modelo.id_sucursal, col_item, col_cantidad)
+        for s, i, c in db.execute(stmt):
+            stocks[(tipo, s, i)] = c
+            registrar_cambio(db, tipo, s, i, actuales.get((s, i)), c, "transferencia")
+
+    if faltantes:
+        raise HTTPException(
+            status_code=400,
+            detail={"message": "Stock insuficiente", "faltantes": faltantes})
+
+    transferencia = Transferencia(
+        id_personal=id_personal,
+        motivo=motivo,
+        detalles=[DetalleTransferencia(
+            tipo_item=m.tipo_item,
+            id_materia_prima=m.id_item if m.tipo_item == 'materia_prima' else None,
+            id_producto_establecido=m.id_item if m.tipo_item == 'producto' else None,
+            id_sucursal_origen=m.id_sucursal_origen,
+            id_sucursal_destino=m.id_sucursal_destino,
+            cantidad=m.cantidad
+        ) for m in movimientos]
+    )
+    db.add(transferencia)
+    db.flush()
+
+    invalidar(db, *[
+        _TABLAS_TRANSFERENCIA[tipo][4](s)
+        for tipo, por_tipo in netos.items() for s, _ in por_tipo
+    ])
+    return transferencia, stocks
+
+
+@router.post("/transferencias", response_model=TransferenciaResponse, status_code=201)
+def crear_transferencia(
+    lote: TransferenciaLote,
+    db: Session = Depends(get_db),
+    current_user: Personal = Depends(require_admin_or_encargado)
+):
+    """
+    Transfiere materias primas y/o productos entre varias sucursales en una sola
+    transacción y registra el documento de transferencia (solo admin o encargado).
+    """
+    transferencia, _ = _aplicar_transferencias(
+        db, lote.movimientos, current_user.id_personal, lote.motivo)
+    db.commit()
+    return obtener_transferencia(transferencia.id_transferencia, db, current_user)
+
+
+@router.get("/transferencias/{transferencia_id}", response_model=TransferenciaResponse)
+def obtener_transferencia(
+    transferencia_id: int,
+    db: Session = Depends(get_db),
+    current_user: Personal = Depends(get_current_user)
+):
+    """Obtiene un documento de transferencia con sus movimientos"""
+    transferencia = db.query(Transferencia).options(
+        selectinload(Transferencia.detalles)
+    ).filter(Transferencia.id_transferencia == transferencia_id).first()
+
+    if not transferencia:
+        raise HTTPException(status_code=404, detail="Transferencia no encontrada")
+
+    return transferencia
+
+
+# --------------------------
+# Inicialización de sucursales
+# --------------------------
+
+# tabla -> (tabla de inventario, columna del item, columna de stock, catálogo, tipo de item)
+_TABLAS_INICIALIZACION = {
+    'materias_primas': ("inventario_materiaprima", "id_materia_prima", "cantidad_stock",
+                        "materia_prima", TIPO_MATERIA),
+    'productos': ("inventario_productoestablecido", "id_producto_establecido",
+                  "cantidad_disponible", "producto_establecido", TIPO_PRODUCTO),
+}
+
+
+def _sembrar_inventario(db: Session, tabla: str, id_sucursal: int,
+                        id_plantilla: Optional[int], copiar: bool, cantidad) -> dict:
+    """
+    Inserta de una vez los items de la plantilla (o del catálogo) que la sucursal
+    todavía no tiene. Los que ya existen se omiten sin tocar su stock.
+    """
+    inventario, columna, stock, catalogo, tipo = _TABLAS_INICIALIZACION[tabla]
+    if id_plantilla is None:
+        origen = f"SELECT {columna}, CAST(:cantidad AS NUMERIC) AS cantidad FROM {catalogo}"
+    else:
+        valor = stock if copiar else "CAST(:cantidad AS NUMERIC)"
+        origen = (f"SELECT {columna}, {valor} AS cantidad FROM {inventario} "
+                  f"WHERE id_sucursal = :plantilla")
+    fila = db.execute(text(f"""
+        WITH origen AS ({origen}),
+        insertados AS (
+            INSERT INTO {inventario} (id_sucursal, {columna}, {stock})
+            SELECT :destino, {columna}, cantidad FROM origen
+            ORDER BY {columna}
+            ON CONFLICT (id_sucursal, {columna}) DO NOTHING
+            RETURNING {columna}, {stock}
+        ),
+        movimientos AS (
+            INSERT INTO movimiento_inventario
+                (id_sucursal, tipo_item, id_item, cantidad_anterior, cantidad_nueva, delta, origen)
+            SELECT :destino, :tipo, {columna}, 0, {stock}, {stock}, 'inicializacion'
+            FROM insertados
+            WHERE {stock} <> 0
+        )
+        SELECT (SELECT count(*) FROM origen), (SELECT count(*) FROM insertados)
+    """), {"destino": id_sucursal, "plantilla": id_plantilla, "cantidad": cantidad,
+           "tipo": tipo}).one()
+    total, insertados = fila
+    return {"insertados": insertados, "omitidos": total - insertados}
+
+
+@router.post("/sucursales/{sucursal_id}/inicializar", response_model=InicializarSucursalResponse)
+def inicializar_inventario_sucursal(
+    sucursal_id: int,
+    datos: InicializarSucursal,
+    db: Session = Depends(get_db),
+    current_user: Personal = Depends(require_admin)
+):
+    """
+    Carga el inventario inicial de una sucursal (solo admin): copia los items de otra
+    sucursal o asigna todo el catálogo con cantidades por defecto. Es idempotente:
+    los items que la sucursal ya tiene se cuentan como omitidos.
+    """
+    if not db.query(Sucursal).get(sucursal_id):
+        raise HTTPException(status_code=404, detail="Sucursal no encontrada")
+
+    plantilla = datos.id_sucursal_plantilla
+    if plantilla is not None:
+        if plantilla == sucursal_id:
+            raise HTTPException(
+                status_code=400, detail="La sucursal plantilla debe ser otra sucursal")
+        if not db.query(Sucursal).get(plantilla):
+            raise HTTPException(status_code=404, detail="Sucursal plantilla no encontrada")
+
+    resultado = {
+        "id_sucursal": sucursal_id,
+        "origen": f"sucursal:{plantilla}" if plantilla is not None else "catalogo"
+    }
+    if datos.incluir_materias:
+        resultado["materias_primas"] = _sembrar_inventario(
+            db, 'materias_primas', sucursal_id, plantilla,
+            datos.copiar_cantidades, datos.cantidad_materias)
+        if resultado["materias_primas"]["insertados"]:
+            invalidar(db, recurso_inventario_materias(sucursal_id))
+    if datos.incluir_productos:
+        resultado["productos"] = _sembrar_inventario(
+            db, 'productos', sucursal_id, plantilla,
+            datos.copiar_cantidades, datos.cantidad_productos)
+        if resultado["productos"]["insertados"]:
+            invalidar(db, recurso_inventario_productos(sucursal_id))
+
+    db.commit()
+    return resultado
+
+
+# --------------------------
+# Historial de inventario
+# --------------------------
+
+
+@router.post("/snapshots", response_model=SnapshotResponse, status_code=201)
+def crear_snapshot_inventario(
+    db: Session = Depends(get_db),
+    current_user: Personal = Depends(require_admin)
+):
+    """
+    Guarda el stock actual de todas las sucursales (solo admin). Normalmente lo
+    ejecuta una tarea diaria: python -m app.historial_inventario snapshot
+    """
+    resultado = tomar_snapshot(db)
+    db.commit()
+    return resultado
+
+
+def _verificar_sucursal(db: Session, sucursal_id: int):
+    if not db.query(Sucursal).get(sucursal_id):
+        raise HTTPException(status_code=404, detail="Sucursal no encontrada")
+
+
+@router.get("/historial/sucursal/{sucursal_id}", response_model=StockHistoricoResponse)
+def obtener_stock_historico(
+    sucursal_id: int,
+    fecha: datetime,
+    tipo: str = Query("materia_prima", pattern="^(materia_prima|producto)$"),
+    db: Session = Depends(get_db),
+    current_user: Personal = Depends(require_admin_or_encargado)
+):
+    """Stock de cada item de la sucursal en una fecha y hora pasada"""
+    _verificar_sucursal(db, sucursal_id)
+    stock, metodo = stock_en(db, sucursal_id, tipo, fecha)
+    return {
+        "id_sucursal": sucursal_id,
+        "tipo_item": tipo,
+        "fecha": fecha,
+        "metodo": metodo,
+        "items": [{"id_item": i, "cantidad": c} for i, c in sorted(stock.items())]
+    }
+
+
+@router.get("/variacion/sucursal/{sucursal_id}", response_model=VariacionResponse)
+def obtener_variacion_stock(
+    sucursal_id: int,
+    desde: datetime,
+    hasta: Optional[datetime] = None,
+    tipo: str = Query("materia_prima", pattern="^(materia_prima|producto)$"),
+    db: Session = Depends(get_db),
+    current_user: Personal = Depends(require_admin_or_encargado)
+):
+    """
+    Variación de stock por item entre dos fechas, desglosada por origen
+    (pedidos, ajustes, transferencias...) con la merma de los conteos.
+    """
+    _verificar_sucursal(db, sucursal_id)
+    hasta = hasta or datetime.now(desde.tzinfo)
+    if (hasta.tzinfo is None) != (desde.tzinfo is None):
+        raise HTTPException(
+            status_code=400, detail="'desde' y 'hasta' deben indicar zona horaria (o ninguna de las dos)")
+    if hasta < desde:
+        raise HTTPException(status_code=400, detail="'hasta' debe ser posterior a 'desde'")
+    return reporte_variacion(db, sucursal_id, tipo, desde, hasta)
@@ -0,0 +1,16 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from app.metricas import registro
+
+router = APIRouter(
+    tags=["Métricas"],
+)
+
+
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def exponer_metricas():
+    """Métricas de latencia, respuestas y base de datos en formato Prometheus"""
+    return PlainTextResponse(
+        registro.exponer(),
+        media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
@@ -1,11 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.responses import JSONResponse
-from fastapi.encoders import jsonable_encoder
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
 from sqlalchemy.orm import Session, joinedload
-from typing import List, Optional
+from typing import List, Literal, Optional
 from decimal import Decimal
-from datetime import datetime
-from sqlalchemy import text, func  # Agrega esto al inicio de tu archivo
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import text, func, insert, select, tuple_, update  # Agrega esto al inicio de tu archivo
 from app.database import get_db
 from app.models import (
     Pedido,
@@ -24,7 +22,12 @@ from app.models.inventario_producto_establecido import InventarioProductoEstable
 from app.schemas.pedidos import (
     DetallePedidoEstablecidoResponse,
     DetallePedidoPersonalizadoResponse,
+    CotizacionCreate,
+    CotizacionResponse,
     PedidoCreate,
+    PedidoLoteCreate,
+    PedidoLoteItem,
+    PedidoLoteResponse,
     PedidoResponse,
     PedidoUpdate,
     EstadoPedido,
@@ -33,6 +36,11 @@ from app.schemas.pedidos import (
     ProductoPersonalizadoResponse
 )
 from app.dependencies import get_current_user
+from app.serializacion import RespuestaJSONRapida, pedidos_a_lista
+from app.estados_pedido import transicionar, COLUMNAS
+from app.precios import TablaPrecios, tabla_precios
+from app.archivo import pedido_archivado
+from app.idempotencia import reservar_clave, guardar_respuesta
 from app.models.personal import Personal
 router = APIRouter(
     prefix="/pedidos",
@@ -40,13 +48,46 @@ router = APIRouter(
 )
 
 
-def _procesar_producto_establecido(db: Session, pedido_id: int, detalle_data: DetallePedidoCreate, sucursal_id: int):
+# Encabezado de las respuestas cortas (RFC 7240)
+PREFERENCIA_APLICADA = {"Preference-Applied": "return=minimal"}
+
+
+def preferencia_minima(
+    prefer: Optional[str] = Header(None),
+    respuesta: Optional[Literal["completa", "minima"]] = Query(
+        None, description="'minima' devuelve solo id, estado y total (igual que Prefer: return=minimal)")
+) -> bool:
+    """
+    True si el cliente pidió la respuesta corta de una escritura, con
+    `Prefer: return=minimal` o `?respuesta=minima` (el parámetro manda).
+    """
+    if respuesta is not None:
+        return respuesta == "minima"
+    if not prefer:
+        return False
+    return any(preferencia.split(";")[0].strip().lower() == "return=minimal"
+               for preferencia in prefer.split(","))
+
+
+def _resumen_pedido(pedido) -> dict:
+    """
+    Respuesta corta con lo que ya está en memoria (el Pedido o la fila que
+    devolvió el UPDATE), sin volver a leer el pedido. Con un Pedido hay que
+    armarla antes del commit: después los atributos expiran.
+    """
+    return {
+        "id_pedido": pedido.id_pedido,
+        "id_sucursal": pedido.id_sucursal,
+        "estado": pedido.estado,
+        "metodo_pago": pedido.metodo_pago,
+        "total": pedido.total
+    }
+
+
+def _procesar_producto_establecido(db: Session, pedido_id: int, detalle_data: DetallePedidoCreate,
+                                   sucursal_id: int, tabla: TablaPrecios):
     """Procesa un producto establecido en el pedido"""
-    producto = db.query(ProductoEstablecido).get(
-        detalle_data.id_producto_establecido)
-    if not producto:
-        raise HTTPException(
-            status_code=404, detail="Producto establecido no encontrado")
+    producto = tabla.producto(detalle_data.id_producto_establecido)
 
     # Verificar disponibilidad en inventario
     inventario = db.query(InventarioProductoEstablecido).filter_by(
@@ -71,63 +112,54 @@ def _procesar_producto_establecido(db: Session, pedido_id: int, detalle_data: De
     db.add(detalle)
 
 
-def _procesar_producto_personalizado(db: Session, pedido_id: int, detalle_data: DetallePedidoCreate, sucursal_id: int):
+def _procesar_producto_personalizado(db: Session, pedido_id: int, detalle_data: DetallePedidoCreate,
+                                     sucursal_id: int, tabla: TablaPrecios):
     """Procesa un producto personalizado en el pedido"""
     if not detalle_data.producto_personalizado:
         raise HTTPException(
             status_code=400, detail="Datos incompletos para producto personalizado")
 
+    # Precios de la foto en memoria (valida también que existan las materias y la receta)
+    cotizado = tabla.cotizar_producto(detalle_data.producto_personalizado)
+
     # Crear el producto personalizado
     producto_pers = ProductoPersonalizado(
         id_pedido=pedido_id,
-        nombre_personalizado=detalle_data.producto_personalizado.nombre_personalizado
+        nombre_personalizado=cotizado.nombre,
+        id_receta=cotizado.id_receta
     )
     db.add(producto_pers)
     db.flush()  # Para obtener el ID
 
-    # Procesar cada materia prima del producto personalizado
-    precio_total_personalizado = Decimal('0')
-
-    for mp_data in detalle_data.producto_personalizado.detalles:
-        materia_prima = db.query(MateriaPrima).get(mp_data.id_materia_prima)
-        if not materia_prima:
-            raise HTTPException(
-                status_code=404, detail=f"Materia prima {mp_data.id_materia_prima} no encontrada")
-
+    for componente in cotizado.componentes:
         # Verificar disponibilidad en inventario
         inventario = db.query(InventarioMateriaPrima).filter_by(
             id_sucursal=sucursal_id,
-            id_materia_prima=mp_data.id_materia_prima
+            id_materia_prima=componente.id_materia_prima
         ).first()
 
-        if not inventario or inventario.cantidad_stock < mp_data.cantidad:
+        if not inventario or inventario.cantidad_stock < componente.cantidad:
             raise HTTPException(
                 status_code=400,
-                detail=f"Stock insuficiente para {materia_prima.nombre}"
+                detail=f"Stock insuficiente para {componente.nombre_materia}"
             )
 
-        # Calcular precio con margen de ganancia
-        margen = detalle_data.producto_personalizado.margen or Decimal('0.30')
-        precio_con_margen = materia_prima.precio_unitario * (1 + margen)
-
         # Crear detalle de materia prima
         detalle_mp = DetalleProductoPersonalizado(
             id_producto_personalizado=producto_pers.id_producto_personalizado,
-            id_materia_prima=mp_data.id_materia_prima,
-            cantidad=mp_data.cantidad,
-            precio_unitario=precio_con_margen
+            id_materia_prima=componente.id_materia_prima,
+            cantidad=componente.cantidad,
+            precio_unitario=componente.precio_unitario
         )
         db.add(detalle_mp)
 
-        precio_total_personalizado += mp_data.cantidad * precio_con_margen
-
     # Crear detalle del pedido para el producto personalizado
     detalle = DetallePedido(
         id_pedido=pedido_id,
         tipo_producto="Personalizado",
         id_producto_personalizado=producto_pers.id_producto_personalizado,
         cantidad=detalle_data.cantidad,
-        precio_unitario=precio_total_personalizado
+        precio_unitario=cotizado.precio_unitario
     )
     db.add(detalle)
 
@@ -169,11 +201,22 @@ def _actualizar_total_pedido(db: Session, pedido_id: int):
 def crear_pedido(
     pedido_data: PedidoCreate,
     db: Session = Depends(get_db),
-    current_user: Personal = Depends(get_current_user)
+    current_user: Personal = Depends(get_current_user),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=100),
+    minima: bool = Depends(preferencia_minima)
 ):
     """
     Crea un nuevo pedido con sus detalles, tanto para productos establecidos como personalizados.
+    Con Idempotency-Key, los reintentos con la misma clave devuelven el pedido
+    ya creado en lugar de duplicarlo (ver app/idempotencia.py). Con
+    Prefer: return=minimal devuelve solo id, estado y total.
     """
+    if idempotency_key:
+        repetida = reservar_clave(db, idempotency_key, current_user.id_personal,
+                                  "POST /pedidos/", pedido_data.model_dump(mode="json"))
+        if repetida is not None:
+            return repetida
+
     # Validaciones iniciales (sucursal, personal, cliente)
     sucursal = db.query(Sucursal).get(pedido_data.id_sucursal)
     if not sucursal:
@@ -202,91 +245,291 @@ def crear_pedido(
     db.flush()  # Para obtener el ID del pedido
 
     # Procesar cada detalle del pedido
+    tabla = tabla_precios(db)
     for detalle_data in pedido_data.detalles:
         if detalle_data.tipo_producto == "Establecido":
             _procesar_producto_establecido(
-                db, pedido.id_pedido, detalle_data, pedido_data.id_sucursal)
+                db, pedido.id_pedido, detalle_data, pedido_data.id_sucursal, tabla)
         else:
             _procesar_producto_personalizado(
-                db, pedido.id_pedido, detalle_data, pedido_data.id_sucursal)
+                db, pedido.id_pedido, detalle_data, pedido_data.id_sucursal, tabla)
 
     # Calcular el total del pedido
     _actualizar_total_pedido(db, pedido.id_pedido)
 
+    if idempotency_key:
+        # La respuesta se guarda en la misma transacción que el pedido
+        respuesta = guardar_respuesta(
+            db, idempotency_key, current_user.id_personal,
+            _resumen_pedido(pedido) if minima else obtener_pedido_completo(pedido.id_pedido, db),
+            status.HTTP_201_CREATED, PREFERENCIA_APLICADA if minima else None)
+        db.commit()
+        return respuesta
+
+    if minima:
+        respuesta = RespuestaJSONRapida(content=_resumen_pedido(pedido),
+                                        status_code=status.HTTP_201_CREATED,
+                                        headers=PREFERENCIA_APLICADA)
+        db.commit()
+        return respuesta
+
     db.commit()
     return obtener_pedido_completo(pedido.id_pedido, db)
 
 
-@router.patch("/{pedido_id}", response_model=PedidoResponse)
-def actualizar_pedido(
-    pedido_id: int,
-    pedido_update: PedidoUpdate,
+# Margen que un reloj de terminal puede estar adelantado
+_TOLERANCIA_FECHA = timedelta(minutes=5)
+
+
+def _crear_pedidos_lote(db: Session, pedidos: List[PedidoLoteItem]) -> dict:
+    """
+    Crea un lote de pedidos con una consulta por tabla para validar y un INSERT
+    por tabla para escribir, en una sola transacción.
+
+    Cada pedido se valida con las mismas reglas que POST /pedidos/ (incluido
+    el stock disponible al momento de la carga, que recién se descuenta al
+    confirmar). Los que no pasan se informan como rechazados con el mismo
+    mensaje de error y no impiden crear los demás.
+    """
+    ahora = datetime.now(timezone.utc)
+
+    # Todo lo que el lote referencia, para leerlo de una vez
+    tabla = tabla_precios(db)
+    claves_producto, claves_materia = set(), set()
+    for p in pedidos:
+        for d in p.detalles:
+            if d.tipo_producto == "Establecido":
+                claves_producto.add((p.id_sucursal, d.id_producto_establecido))
+            elif d.producto_personalizado:
+                personalizado = d.producto_personalizado
+                receta = tabla.recetas.get(personalizado.id_receta)
+                claves_materia.update((p.id_sucursal, mp.id_materia_prima)
+                                      for mp in personalizado.detalles + list(receta.materias if receta else ()))
+    ids_cliente = {p.id_cliente for p in pedidos if p.id_cliente is not None}
+
+    sucursales = set(db.execute(
+        select(Sucursal.id_sucursal)
+        .where(Sucursal.id_sucursal.in_({p.id_sucursal for p in pedidos}))
+    ).scalars())
+    personal = set(db.execute(
+        select(Personal.id_personal)
+        .where(Personal.id_personal.in_({p.id_personal for p in pedidos}))
+    ).scalars())
+    clientes = set(db.execute(
+        select(Cliente.id_cliente).where(Cliente.id_cliente.in_(ids_cliente))
+    ).scalars()) if ids_cliente else set()
+
+    stock_productos, stock_materias = {}, {}
+    if claves_producto:
+        stock_productos = {(s, i): c for s, i, c in db.execute(
+            select(InventarioProductoEstablecido.id_sucursal,
+                   InventarioProductoEstablecido.id_producto_establecido,
+                   InventarioProductoEstablecido.cantidad_disponible)
+            .where(tuple_(InventarioProductoEstablecido.id_sucursal,
+                          InventarioProductoEstablecido.id_producto_establecido).in_(claves_producto))
+        )}
+
+    if claves_materia:
+        stock_materias = {(s, i): c for s, i, c in db.execute(
+            select(InventarioMateriaPrima.id_sucursal, InventarioMateriaPrima.id_materia_prima,
+                   InventarioMateriaPrima.cantidad_stock)
+            .where(tuple_(InventarioMateriaPrima.id_sucursal,
+                          InventarioMateriaPrima.id_materia_prima).in_(claves_materia))
+        )}
+
+    def validar(p: PedidoLoteItem):
+        """Devuelve (líneas con precio, total) o el mensaje de error del pedido."""
+        if p.fecha_pedido is not None and p.fecha_pedido > ahora + _TOLERANCIA_FECHA:
+            return "La fecha del pedido está en el futuro"
+        if p.id_sucursal not in sucursales:
+            return "Sucursal no encontrada"
+        if p.id_personal not in personal:
+            return "Personal no encontrado"
+        if p.id_cliente is not None and p.id_cliente not in clientes:
+            return "Cliente no encontrado"
+
+        lineas, total = [], Decimal('0.00')
+        for d in p.detalles:
+            try:
+                if d.tipo_producto == "Establecido":
+                    producto = tabla.producto(d.id_producto_establecido)
+                    if stock_productos.get((p.id_sucursal, d.id_producto_establecido), 0) < d.cantidad:
+                        return f"Stock insuficiente para el producto {producto.nombre}"
+                    lineas.append((d, producto.precio_unitario, None))
+                    total += d.cantidad * producto.precio_unitario
+                    continue
+
+                if not d.producto_personalizado:
+                    return "Datos incompletos para producto personalizado"
+                cotizado = tabla.cotizar_producto(d.producto_personalizado)
+            except HTTPException as error:
+                return error.detail
+            for componente in cotizado.componentes:
+                if stock_materias.get((p.id_sucursal, componente.id_materia_prima), 0) < componente.cantidad:
+                    return f"Stock insuficiente para {componente.nombre_materia}"
+            lineas.append((d, cotizado.precio_unitario, cotizado))
+            total += d.cantidad * cotizado.precio_unitario
+        return lineas, total
+
+    resultados, validos = [], []
+    for indice, p in enumerate(pedidos):
+        validacion = validar(p)
+        if isinstance(validacion, str):
+            resultados.append({"indice": indice, "referencia": p.referencia,
+                               "resultado": "rechazado", "detalle": validacion})
+        else:
+            resultados.append({"indice": indice, "referencia": p.referencia,
+                               "resultado": "creado", "total": validacion[1]})
+            validos.append((indice, p, *validacion))
+
+    if validos:
+        ids_pedido = db.execute(
+            insert(Pedido).returning(Pedido.id_pedido, sort_by_parameter_order=True),
+            [{
+                "id_personal": p.id_personal,
+                "id_sucursal": p.id_sucursal,
+                "id_cliente": p.id_cliente,
+                "estado": EstadoPedido.PENDIENTE.value,
+                "metodo_pago": p.metodo_pago.value if p.metodo_pago else None,
+                "total": total,
+                "fecha_pedido": p.fecha_pedido or ahora,
+            } for _, p, _, total in validos]
+        ).scalars().all()
+
+        personalizados = [(id_pedido, cotizado) for id_pedido, (_, _, lineas, _) in zip(ids_pedido, validos)
+                          for _, _, cotizado in lineas if cotizado is not None]
+        ids_personalizado = iter(db.execute(
+            insert(ProductoPersonalizado).returning(
+                ProductoPersonalizado.id_producto_personalizado, sort_by_parameter_order=True),
+            [{"id_pedido": id_pedido, "nombre_personalizado": cotizado.nombre,
+              "id_receta": cotizado.id_receta}
+             for id_pedido, cotizado in personalizados]
+        ).scalars().all() if personalizados else [])
+
+        filas_detalle, filas_componente = [], []
+        for id_pedido, (indice, _, lineas, _) in zip(ids_pedido, validos):
+            resultados[indice]["id_pedido"] = id_pedido
+            for d, precio, cotizado in lineas:
+                fila = {"id_pedido": id_pedido, "tipo_producto": d.tipo_producto,
+                        "id_producto_establecido": None, "id_producto_personalizado": None,
+                        "cantidad": d.cantidad, "precio_unitario": precio}
+                if cotizado is None:
+                    fila["id_producto_establecido"] = d.id_producto_establecido
+                else:
+                    fila["id_producto_personalizado"] = next(ids_personalizado)
+                    filas_componente.extend({
+                        "id_producto_personalizado": fila["id_producto_personalizado"],
+                        "id_materia_prima": componente.id_materia_prima,
+                        "cantidad": componente.cantidad,
+                        "precio_unitario": componente.precio_unitario
+                    } for componente in cotizado.componentes)
+                filas_detalle.append(fila)
+        if filas_componente:
+            db.execute(insert(DetalleProductoPersonalizado), filas_componente)
+        if filas_detalle:
+            # Sobre la tabla: por el subtotal calculado, el INSERT del ORM iría fila por fila
+            db.execute(insert(DetallePedido.__table__), filas_detalle)
+
+    return {
+        "procesados": len(resultados),
+        "creados": len(validos),
+        "rechazados": len(resultados) - len(validos),
+        "resultados": resultados
+    }
+
+
+@router.post("/lote", response_model=PedidoLoteResponse)
+def crear_pedidos_lote(
+    lote: PedidoLoteCreate,
     db: Session = Depends(get_db),
-    current_user: Personal = Depends(get_current_user)
+    current_user: Personal = Depends(get_current_user),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=100)
 ):
     """
-    Actualiza el estado o método de pago de un pedido.
-    Si el estado cambia a 'Pagado', se descuenta del inventario.
+    Carga de una vez las ventas que una terminal acumuló sin conexión. Cada
+    pedido puede traer la hora real de la venta (`fecha_pedido`) y una
+    `referencia` local. Devuelve un resultado por pedido, en el orden recibido,
+    con el id y total de los creados o el motivo de los rechazados (no el
+    pedido completo: para eso, GET /pedidos/{id}).
     """
-    pedido = db.query(Pedido).get(pedido_id)
-    if not pedido:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Pedido no encontrado"
-        )
-
-    # Actualizar estado si se proporciona
-    if pedido_update.estado:
-        if pedido_update.estado == EstadoPedido.PAGADO and pedido.estado != EstadoPedido.PAGADO.value:
-            # Descontar del inventario solo cuando cambia a Pagado
-            descontar_inventario(pedido, db)
+    if idempotency_key:
+        repetida = reservar_clave(db, idempotency_key, current_user.id_personal,
+                                  "POST /pedidos/lote", lote.model_dump(mode="json"))
+        if repetida is not None:
+            return repetida
 
-        pedido.estado = pedido_update.estado.value
+    resumen = _crear_pedidos_lote(db, lote.pedidos)
 
-    # Actualizar método de pago si se proporciona
-    if pedido_update.metodo_pago:
-        pedido.metodo_pago = pedido_update.metodo_pago.value
+    if idempotency_key:
+        respuesta = guardar_respuesta(db, idempotency_key, current_user.id_personal,
+                                      resumen, status.HTTP_200_OK)
+        db.commit()
+        return respuesta
 
     db.commit()
-    return obtener_pedido_completo(pedido_id, db)
+    return resumen
 
 
-def descontar_inventario(pedido: Pedido, db: Session):
+@router.post("/cotizar", response_model=CotizacionResponse)
+def cotizar_pedido(
+    cotizacion: CotizacionCreate,
+    db: Session = Depends(get_db),
+    current_user: Personal = Depends(get_current_user)
+):
     """
-    Descuenta del inventario los productos y materias primas utilizadas en el pedido.
+    Precio de las líneas de un pedido, sin crearlo ni revisar stock: los mismos
+    precios unitarios y total que tendría POST /pedidos/ con esos detalles.
+    Se calcula con la foto de precios en memoria (sin consultas mientras no
+    cambie el catálogo); `version_precios` identifica la foto usada.
     """
-    for detalle in pedido.detalles:
-        if detalle.tipo_producto == 'Establecido':
-            # Descontar producto establecido
-            inventario = db.query(InventarioProductoEstablecido).filter_by(
-                id_sucursal=pedido.id_sucursal,
-                id_producto_establecido=detalle.id_producto_establecido
-            ).first()
+    return tabla_precios(db, verificar=False).cotizar_pedido(cotizacion.detalles)
 
-            if not inventario or inventario.cantidad_disponible < detalle.cantidad:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=f"Stock insuficiente para el producto {detalle.id_producto_establecido}"
-                )
 
-            inventario.cantidad_disponible -= detalle.cantidad
+@router.patch("/{pedido_id}", response_model=PedidoResponse)
+def actualizar_pedido(
+    pedido_id: int,
+    pedido_update: PedidoUpdate,
+    db: Session = Depends(get_db),
+    current_user: Personal = Depends(get_current_user),
+    minima: bool = Depends(preferencia_minima)
+):
+    """
+    Actualiza el estado o método de pago de un pedido.
+    Los cambios de estado siguen app/estados_pedido.py: pasar a 'Pagado'
+    descuenta del inventario y cancelar un pedido pagado lo repone. Con
+    `estado_esperado` el cambio solo se aplica si el pedido sigue en ese
+    estado (409 si no). Con Prefer: return=minimal devuelve solo id, estado y total.
+    """
+    valores = {}
+    if pedido_update.metodo_pago:
+        valores["metodo_pago"] = pedido_update.metodo_pago.value
 
-        elif detalle.tipo_producto == 'Personalizado':
-            # Descontar materias primas del producto personalizado
-            producto_personalizado = detalle.producto_personalizado
-            for detalle_mp in producto_personalizado.detalles:
-                inventario = db.query(InventarioMateriaPrima).filter_by(
-                    id_sucursal=pedido.id_sucursal,
-                    id_materia_prima=detalle_mp.id_materia_prima
-                ).first()
+    if pedido_update.estado:
+        # El método de pago va en el mismo UPDATE que el estado
+        esperado = pedido_update.estado_esperado
+        fila = transicionar(db, pedido_id, pedido_update.estado.value,
+                            esperado.value if esperado else None, **valores)
+    else:
+        if valores:
+            consulta = update(Pedido).where(Pedido.id_pedido == pedido_id)\
+                .values(**valores).returning(*COLUMNAS)
+        else:
+            consulta = select(*COLUMNAS).where(Pedido.id_pedido == pedido_id)
+        fila = db.execute(consulta).first()
+        if fila is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Pedido no encontrado"
+            )
 
-                if not inventario or inventario.cantidad_stock < detalle_mp.cantidad:
-                    raise HTTPException(
-                        status_code=status.HTTP_400_BAD_REQUEST,
-                        detail=f"Stock insuficiente para la materia prima {detalle_mp.id_materia_prima}"
-                    )
+    if minima:
+        respuesta = RespuestaJSONRapida(content=_resumen_pedido(fila),
+                                        headers=PREFERENCIA_APLICADA)
+        db.commit()
+        return respuesta
 
-                inventario.cantidad_stock -= detalle_mp.cantidad
+    db.commit()
+    return obtener_pedido_completo(pedido_id, db)
 
 
 @router.get("/{pedido_id}", response_model=PedidoResponse)
@@ -296,8 +539,14 @@ def obtener_pedido(
     current_user: Personal = Depends(get_current_user)
 ):
     """
-    Obtiene un pedido completo con todos sus detalles.
+    Obtiene un pedido completo con todos sus detalles. Los pedidos que ya
+    pasaron al archivo (ver app/archivo.py) se leen de pedido_archivo.
     """
+    if db.query(Pedido.id_pedido).filter(Pedido.id_pedido == pedido_id).first() is None:
+        archivado = pedido_archivado(db, pedido_id)
+        if archivado is None:
+            raise HTTPException(status_code=404, detail="Pedido no encontrado")
+        return archivado
     return obtener_pedido_completo(pedido_id, db)
 
 
@@ -355,6 +604,7 @@ def obtener_pedido_completo(pedido_id: int, db: Session) -> PedidoResponse:
                 "producto_personalizado": {
                     "id_producto_personalizado": producto_personalizado.id_producto_personalizado,
                     "nombre_personalizado": producto_personalizado.nombre_personalizado,
+                    "id_receta": producto_personalizado.id_receta,
                     "detalles": detalles_mp
                 },
                 "cantidad": detalle.cantidad,
@@ -390,60 +640,57 @@ def obtener_pedido_completo(pedido_id: int, db: Session) -> PedidoResponse:
 def confirmar_pedido(
     pedido_id: int,
     db: Session = Depends(get_db),
-    current_user: Personal = Depends(get_current_user)
+    current_user: Personal = Depends(get_current_user),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=100),
+    minima: bool = Depends(preferencia_minima)
 ):
-    """Cambia el estado a 'Pagado' y descuenta del inventario"""
-    pedido = db.query(Pedido).get(pedido_id)
-    if not pedido:
-        raise HTTPException(status_code=404, detail="Pedido no encontrado")
-
-    if pedido.estado == EstadoPedido.PAGADO.value:
-        raise HTTPException(status_code=400, detail="El pedido ya está pagado")
+    """
+    Cambia el estado a 'Pagado' y descuenta del inventario (transición
+    Pendiente -> Pagado de app/estados_pedido.py). Con Idempotency-Key, un
+    reintento devuelve la confirmación original en lugar de "El pedido ya está
+    pagado". Con Prefer: return=minimal devuelve solo id, estado y total.
+    """
+    if idempotency_key:
+        repetida = reservar_clave(db, idempotency_key, current_user.id_personal,
+                                  f"PATCH /pedidos/{pedido_id}/confirmar")
+        if repetida is not None:
+            return repetida
+
+    fila = transicionar(db, pedido_id, EstadoPedido.PAGADO.value)
+
+    if idempotency_key:
+        respuesta = guardar_respuesta(
+            db, idempotency_key, current_user.id_personal,
+            _resumen_pedido(fila) if minima else obtener_pedido_completo(pedido_id, db),
+            status.HTTP_200_OK, PREFERENCIA_APLICADA if minima else None)
+        db.commit()
+        return respuesta
 
-    if pedido.estado == EstadoPedido.CANCELADO.value:
-        raise HTTPException(
-            status_code=400, detail="Pedido cancelado no puede confirmarse")
-
-    # Verificar y descontar inventario
-    with db.begin_nested():
-        for detalle in pedido.detalles:
-            if detalle.tipo_producto == 'Establecido':
-                # Descontar producto establecido
-                inventario = db.query(InventarioProductoEstablecido).filter_by(
-                    id_sucursal=pedido.id_sucursal,
-                    id_producto_establecido=detalle.id_producto_establecido
-                ).with_for_update().first()
-
-                if not inventario or inventario.cantidad_disponible < detalle.cantidad:
-                    raise HTTPException(
-                        status_code=400,
-                        detail=f"Stock insuficiente para el producto {detalle.id_producto_establecido}"
-                    )
-                inventario.cantidad_disponible -= detalle.cantidad
-
-            elif detalle.tipo_producto == 'Personalizado':
-                # Descontar materias primas
-                producto_personalizado = detalle.producto_personalizado
-                for detalle_mp in producto_personalizado.detalles:
-                    inventario = db.query(InventarioMateriaPrima).filter_by(
-                        id_sucursal=pedido.id_sucursal,
-                        id_materia_prima=detalle_mp.id_materia_prima
-                    ).with_for_update().first()
-
-                    if not inventario or inventario.cantidad_stock < detalle_mp.cantidad:
-                        raise HTTPException(
-                            status_code=400,
-                            detail=f"Stock insuficiente para la materia prima {detalle_mp.id_materia_prima}"
-                        )
-                    inventario.cantidad_stock -= detalle_mp.cantidad
-
-        # Cambiar estado
-        pedido.estado = EstadoPedido.PAGADO.value
+    if minima:
+        respuesta = RespuestaJSONRapida(content=_resumen_pedido(fila),
+                                        headers=PREFERENCIA_APLICADA)
         db.commit()
+        return respuesta
+
+    db.commit()
 
     return obtener_pedido_completo(pedido_id, db)
 
 
+# Relaciones que usa pedido_a_dict, cargadas con la consulta de pedidos
+_CARGA_PEDIDO_COMPLETO = (
+    joinedload(Pedido.detalles)
+    .joinedload(DetallePedido.producto_establecido),
+    joinedload(Pedido.detalles)
+    .joinedload(DetallePedido.producto_personalizado)
+    .joinedload(ProductoPersonalizado.detalles)
+    .joinedload(DetalleProductoPersonalizado.materia_prima),
+    joinedload(Pedido.personal),
+    joinedload(Pedido.sucursal),
+    joinedload(Pedido.cliente)
+)
+
+
 @router.get("/sucursal/{sucursal_id}", response_model=List[PedidoResponse])
 def listar_pedidos_sucursal(
     sucursal_id: int,
@@ -462,27 +709,34 @@ def listar_pedidos_sucursal(
             detail="Sucursal no encontrada"
         )
 
-    query = db.query(Pedido).filter_by(id_sucursal=sucursal_id)
+    query = db.query(Pedido).options(*_CARGA_PEDIDO_COMPLETO)\
+        .filter_by(id_sucursal=sucursal_id)
 
     if estado:
         query = query.filter_by(estado=estado)
 
     pedidos = query.order_by(Pedido.fecha_pedido.desc()).all()
 
-    return [obtener_pedido_completo(p.id_pedido, db) for p in pedidos]
+    # Relaciones ya cargadas: sin una consulta por pedido (ni por detalle).
+    # Se valida con response_model para no cambiar el formato de este endpoint
+    return pedidos_a_lista(pedidos)
 
 
 @router.get("/sucursal/{sucursal_id}/optimizado", response_model=List[PedidoResponse])
 def listar_pedidos_sucursal_optimizado(
     sucursal_id: int,
     estado: Optional[str] = None,
+    desde: Optional[datetime] = None,
+    hasta: Optional[datetime] = None,
     page: int = 1,
     page_size: int = 20,
     db: Session = Depends(get_db),
     current_user: Personal = Depends(get_current_user)
 ):
     """
-    Lista paginada de pedidos con joins optimizados - VERSIÓN CORREGIDA
+    Lista paginada de pedidos con joins optimizados - VERSIÓN CORREGIDA.
+    `desde`/`hasta` acotan por fecha_pedido (con pedido particionado solo se
+    leen las particiones de ese rango).
     """
     # Validar parámetros de paginación
     if page < 1:
@@ -491,94 +745,28 @@ def listar_pedidos_sucursal_optimizado(
         page_size = 20
 
     # Consulta base con joins optimizados
-    query = db.query(Pedido).options(
-        joinedload(Pedido.detalles)
-        .joinedload(DetallePedido.producto_establecido),
-        joinedload(Pedido.detalles)
-        .joinedload(DetallePedido.producto_personalizado)
-        .joinedload(ProductoPersonalizado.detalles)
-        .joinedload(DetalleProductoPersonalizado.materia_prima),
-        joinedload(Pedido.personal),
-        joinedload(Pedido.sucursal),
-        joinedload(Pedido.cliente)
-    ).filter(Pedido.id_sucursal == sucursal_id)
+    query = db.query(Pedido).options(*_CARGA_PEDIDO_COMPLETO)\
+        .filter(Pedido.id_sucursal == sucursal_id)
 
+    filtros = []
     if estado:
-        query = query.filter(Pedido.estado == estado)
+        filtros.append(Pedido.estado == estado)
+    if desde:
+        filtros.append(Pedido.fecha_pedido >= desde)
+    if hasta:
+        filtros.append(Pedido.fecha_pedido < hasta)
+    query = query.filter(*filtros)
+
+    # Paginación (el conteo se hace sin los joins de carga)
+    total = db.query(func.count(Pedido.id_pedido))\
+        .filter(Pedido.id_sucursal == sucursal_id, *filtros)\
+        .scalar()
 
-    # Paginación
-    total = query.count()
     pedidos = query.order_by(Pedido.fecha_pedido.desc())\
         .offset((page - 1) * page_size)\
         .limit(page_size)\
         .all()
 
-    # Construir respuesta optimizada y validada
-    response = []
-    for p in pedidos:
-        detalles_response = []
-
-        for detalle in p.detalles:
-            if detalle.tipo_producto == 'Establecido':
-                detalle_data = DetallePedidoEstablecidoResponse(
-                    id_detalle_pedido=detalle.id_detalle_pedido,
-                    tipo_producto="Establecido",
-                    id_producto_establecido=detalle.id_producto_establecido,
-                    nombre_producto=detalle.producto_establecido.nombre if detalle.producto_establecido else "Desconocido",
-                    cantidad=detalle.cantidad,
-                    precio_unitario=float(
-                        detalle.precio_unitario) if detalle.precio_unitario else 0.0,
-                    subtotal=float(
-                        detalle.subtotal) if detalle.subtotal else 0.0
-                )
-            else:
-                detalles_mp = []
-                if detalle.producto_personalizado and detalle.producto_personalizado.detalles:
-                    for mp in detalle.producto_personalizado.detalles:
-                        detalles_mp.append({
-                            "id_materia_prima": mp.id_materia_prima,
-                            "nombre_materia": mp.materia_prima.nombre if mp.materia_prima else "Desconocido",
-                            "cantidad": mp.cantidad,
-                            "precio_unitario": float(mp.precio_unitario) if mp.precio_unitario else 0.0,
-                            "subtotal": float(mp.subtotal) if mp.subtotal else 0.0,
-                            "unidad": mp.materia_prima.unidad if mp.materia_prima and mp.materia_prima.unidad else "unidad"
-                        })
-
-                detalle_data = DetallePedidoPersonalizadoResponse(
-                    id_detalle_pedido=detalle.id_detalle_pedido,
-                    tipo_producto="Personalizado",
-                    id_producto_personalizado=detalle.id_producto_personalizado,
-                    producto_personalizado=ProductoPersonalizadoResponse(
-                        id_producto_personalizado=detalle.producto_personalizado.id_producto_personalizado if detalle.producto_personalizado else None,
-                        nombre_personalizado=detalle.producto_personalizado.nombre_personalizado if detalle.producto_personalizado else "Desconocido",
-                        detalles=detalles_mp
-                    ),
-                    cantidad=detalle.cantidad,
-                    precio_unitario=float(
-                        detalle.precio_unitario) if detalle.precio_unitario else 0.0,
-                    subtotal=float(
-                        detalle.subtotal) if detalle.subtotal else 0.0
-                )
-
-            detalles_response.append(detalle_data)
-
-        pedido_response = PedidoResponse(
-            id_pedido=p.id_pedido,
-            fecha_pedido=p.fecha_pedido,
-            id_personal=p.id_personal,
-            nombre_personal=p.personal.nombre if p.personal else "Desconocido",
-            id_sucursal=p.id_sucursal,
-            nombre_sucursal=p.sucursal.nombre if p.sucursal else "Desconocido",
-            id_cliente=p.id_cliente,
-            nombre_cliente=p.cliente.apellido if p.cliente else None,
-            estado=p.estado,
-            metodo_pago=p.metodo_pago,
-            total=float(p.total) if p.total else 0.0,
-            detalles=detalles_response
-        )
-
-        response.append(pedido_response)
-
     # Agregar headers de paginación
     headers = {
         "X-Total-Count": str(total),
@@ -587,19 +775,24 @@ def listar_pedidos_sucursal_optimizado(
         "X-Total-Pages": str((total + page_size - 1) // page_size)
     }
 
-    return JSONResponse(content=jsonable_encoder(response), headers=headers)
+    # Serialización directa desde el ORM (sin validar modelos ni jsonable_encoder)
+    return RespuestaJSONRapida(content=pedidos_a_lista(pedidos), headers=headers)
 
 
 @router.get("/sucursal/{sucursal_id}/resumido", response_model=List[dict])
 def listar_pedidos_resumido(
     sucursal_id: int,
     estado: Optional[str] = None,
+    desde: Optional[datetime] = None,
+    hasta: Optional[datetime] = None,
     db: Session = Depends(get_db),
     current_user: Personal = Depends(get_current_user)
 ):
     """
     Endpoint rápido para listado tabular con datos básicos
     """
+    # fecha_pedido va en el GROUP BY porque con pedido particionado la clave
+    # primaria es (id_pedido, fecha_pedido)
     query = db.query(
         Pedido.id_pedido,
         Pedido.fecha_pedido,
@@ -611,10 +804,14 @@ def listar_pedidos_resumido(
     ).join(Pedido.personal)\
      .outerjoin(Pedido.detalles)\
      .filter(Pedido.id_sucursal == sucursal_id)\
-     .group_by(Pedido.id_pedido, Personal.nombre)
+     .group_by(Pedido.id_pedido, Pedido.fecha_pedido, Personal.nombre)
 
     if estado:
         query = query.filter(Pedido.estado == estado)
+    if desde:
+        query = query.filter(Pedido.fecha_pedido >= desde)
+    if hasta:
+        query = query.filter(Pedido.fecha_pedido < hasta)
 
     pedidos = query.order_by(Pedido.fecha_pedido.desc()).all()
 
@@ -1,4 +1,4 @@
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from typing import List
 from fastapi import APIRouter, Depends, Query, HTTPException
 from sqlalchemy.orm import Session
@@ -10,6 +10,7 @@ from app.models import Pedido, DetallePedido, ProductoEstablecido, MateriaPrima,
 from app.models.detalle_producto_personalizado import DetalleProductoPersonalizado
 from app.models.producto_personalizado import ProductoPersonalizado
 from app.dependencies import require_admin, require_vendedor
+from app.archivo import FuentesPedidos
 from app.models.personal import Personal
 router = APIRouter(
     prefix="/predicciones",
@@ -59,28 +60,36 @@ def predecir_tendencias(
     Método simple: Comparación de ventas entre dos períodos iguales.
     """
     try:
-        fecha_fin = datetime.now()
+        fecha_fin = datetime.now(timezone.utc)
         fecha_medio = fecha_fin - timedelta(days=dias_analisis//2)
         fecha_inicio = fecha_fin - timedelta(days=dias_analisis)
+        # Tablas de pedidos, o su unión con el archivo si el período llega hasta ahí
+        fuentes = FuentesPedidos(db, fecha_inicio)
+        pedido = fuentes.entidad(Pedido)
+        detalle = fuentes.entidad(DetallePedido)
 
         # Consulta para el período más reciente (segunda mitad)
         ventas_recientes = db.query(
             ProductoEstablecido.nombre,
-            func.sum(DetallePedido.cantidad).label("ventas")
-        ).join(DetallePedido).join(Pedido).filter(
-            Pedido.fecha_pedido >= fecha_medio,
-            Pedido.fecha_pedido <= fecha_fin,
-            Pedido.estado == "Pagado"
+            func.sum(detalle.cantidad).label("ventas")
+        ).join(
+            detalle, detalle.id_producto_establecido == ProductoEstablecido.id_producto_establecido
+        ).join(pedido, pedido.id_pedido == detalle.id_pedido).filter(
+            pedido.fecha_pedido >= fecha_medio,
+            pedido.fecha_pedido <= fecha_fin,
+            pedido.estado == "Pagado"
         ).group_by(ProductoEstablecido.nombre).all()
 
         # Consulta para el período anterior (primera mitad)
         ventas_anteriores = db.query(
             ProductoEstablecido.nombre,
-            func.sum(DetallePedido.cantidad).label("ventas")
-        ).join(DetallePedido).join(Pedido).filter(
-            Pedido.fecha_pedido >= fecha_inicio,
-            Pedido.fecha_pedido < fecha_medio,
-            Pedido.estado == "Pagado"
+            func.sum(detalle.cantidad).label("ventas")
+        ).join(
+            detalle, detalle.id_producto_establecido == ProductoEstablecido.id_producto_establecido
+        ).join(pedido, pedido.id_pedido == detalle.id_pedido).filter(
+            pedido.fecha_pedido >= fecha_inicio,
+            pedido.fecha_pedido < fecha_medio,
+            pedido.estado == "Pagado"
         ).group_by(ProductoEstablecido.nombre).all()
 
         # Convertir a diccionarios para fácil acceso
@@ -136,12 +145,16 @@ def predecir_demanda(
                 status_code=404, detail="Producto no encontrado")
 
         # Calcular promedio de ventas diarias últimos 30 días
+        fecha_inicio = datetime.now(timezone.utc) - timedelta(days=30)
+        fuentes = FuentesPedidos(db, fecha_inicio)
+        pedido = fuentes.entidad(Pedido)
+        detalle = fuentes.entidad(DetallePedido)
         ventas_totales = db.query(
-            func.sum(DetallePedido.cantidad)
-        ).join(Pedido).filter(
-            DetallePedido.id_producto_establecido == producto_id,
-            Pedido.fecha_pedido >= datetime.now() - timedelta(days=30),
-            Pedido.estado == "Pagado"
+            func.sum(detalle.cantidad)
+        ).join(pedido, pedido.id_pedido == detalle.id_pedido).filter(
+            detalle.id_producto_establecido == producto_id,
+            pedido.fecha_pedido >= fecha_inicio,
+            pedido.estado == "Pagado"
         ).scalar() or 0
 
         promedio_diario = ventas_totales / 30
@@ -172,14 +185,23 @@ def predecir_stock_riesgo(
     """
     try:
         # Calcular consumo diario promedio de cada materia prima (últimos 30 días)
+        fecha_inicio = datetime.now(timezone.utc) - timedelta(days=30)
+        fuentes = FuentesPedidos(db, fecha_inicio)
+        pedido = fuentes.entidad(Pedido)
+        personalizado = fuentes.entidad(ProductoPersonalizado)
+        detalle_mp = fuentes.entidad(DetalleProductoPersonalizado)
         consumo = db.query(
             MateriaPrima.nombre,
             MateriaPrima.unidad,
-            func.sum(DetalleProductoPersonalizado.cantidad).label(
+            func.sum(detalle_mp.cantidad).label(
                 "total_consumido")
-        ).join(DetalleProductoPersonalizado).join(ProductoPersonalizado).join(Pedido).filter(
-            Pedido.fecha_pedido >= datetime.now() - timedelta(days=30),
-            Pedido.estado == "Pagado"
+        ).join(
+            detalle_mp, detalle_mp.id_materia_prima == MateriaPrima.id_materia_prima
+        ).join(
+            personalizado, personalizado.id_producto_personalizado == detalle_mp.id_producto_personalizado
+        ).join(pedido, pedido.id_pedido == personalizado.id_pedido).filter(
+            pedido.fecha_pedido >= fecha_inicio,
+            pedido.estado == "Pagado"
         ).group_by(MateriaPrima.nombre, MateriaPrima.unidad).all()
 
         # Calcular stock total por materia prima
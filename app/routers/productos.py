@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
 from typing import List, Literal, Optional
 from decimal import Decimal
@@ -12,6 +12,16 @@ from app.schemas.productos import (
 )
 from app.models.personal import Personal
 from app.dependencies import get_current_user, require_admin, require_encargado
+from app.precios import descartar_tabla
+from app.cache_http import (
+    RECURSO_PRODUCTOS,
+    RECURSO_MATERIAS,
+    etag_recursos,
+    no_modificado,
+    respuesta_no_modificada,
+    marcar_etag,
+    invalidar
+)
 
 router = APIRouter(
     prefix="/productos",
@@ -36,20 +46,29 @@ def crear_producto(
     """Crea un nuevo producto (helado o topping) - Solo admin"""
     db_producto = ProductoEstablecido(**producto.model_dump())
     db.add(db_producto)
+    invalidar(db, RECURSO_PRODUCTOS)
     db.commit()
+    descartar_tabla()
     db.refresh(db_producto)
     return db_producto
 
 
 @router.get("/establecidos", response_model=List[ProductoEstablecidoResponse])
 def listar_productos(
+    request: Request,
+    response: Response,
     tipo: Literal['helado', 'topping', 'todos'] = Query('todos'),
     skip: int = 0,
     limit: int = 100,
     db: Session = Depends(get_db),
     current_user: Personal = Depends(get_current_user)
 ):
-    """Lista productos con filtro por tipo"""
+    """Lista productos con filtro por tipo (admite If-None-Match)"""
+    etag = etag_recursos(db, RECURSO_PRODUCTOS)
+    if no_modificado(request, etag):
+        return respuesta_no_modificada(etag)
+    marcar_etag(response, etag)
+
     query = db.query(ProductoEstablecido)
 
     if tipo != 'todos':
@@ -79,7 +98,9 @@ def actualizar_producto(
     for field, value in producto_data.model_dump().items():
         setattr(producto, field, value)
 
+    invalidar(db, RECURSO_PRODUCTOS)
     db.commit()
+    descartar_tabla()
     db.refresh(producto)
     return producto
 
@@ -106,7 +127,9 @@ def eliminar_producto(
         )
 
     db.delete(producto)
+    invalidar(db, RECURSO_PRODUCTOS)
     db.commit()
+    descartar_tabla()
     return None
 
 # --------------------------
@@ -127,18 +150,27 @@ def crear_materia_prima(
     """Registra una nueva materia prima - Solo admin"""
     db_materia = MateriaPrima(**materia.model_dump())
     db.add(db_materia)
+    invalidar(db, RECURSO_MATERIAS)
     db.commit()
+    descartar_tabla()
     db.refresh(db_materia)
     return db_materia
 
 
 @router.get("/materias-primas", response_model=List[MateriaPrimaResponse])
 def listar_materias_primas(
+    request: Request,
+    response: Response,
     stock_min: Optional[Decimal] = Query(None, gt=0),
     db: Session = Depends(get_db),
     current_user: Personal = Depends(get_current_user)
 ):
-    """Lista materias primas con filtro por stock mínimo"""
+    """Lista materias primas con filtro por stock mínimo (admite If-None-Match)"""
+    etag = etag_recursos(db, RECURSO_MATERIAS)
+    if no_modificado(request, etag):
+        return respuesta_no_modificada(etag)
+    marcar_etag(response, etag)
+
     query = db.query(MateriaPrima)
     if stock_min is not None:
         query = query.filter(MateriaPrima.stock_minimo >= stock_min)
@@ -164,7 +196,9 @@ def actualizar_materia_prima(
     for field, value in materia_data.model_dump().items():
         setattr(materia, field, value)
 
+    invalidar(db, RECURSO_MATERIAS)
     db.commit()
+    descartar_tabla()
     db.refresh(materia)
     return materia
 
@@ -185,12 +219,14 @@ def eliminar_materia_prima(
             status_code=404, detail="Materia prima no encontrada")
 
     # Validar que no esté en uso (ejemplo básico)
-    if materia.detalles_productos or materia.inventarios:
+    if materia.detalles_productos or materia.inventarios or materia.detalles_recetas:
         raise HTTPException(
             status_code=400,
-            detail="No se puede eliminar: está en uso en productos o inventarios"
+            detail="No se puede eliminar: está en uso en productos, recetas o inventarios"
         )
 
     db.delete(materia)
+    invalidar(db, RECURSO_MATERIAS)
     db.commit()
+    descartar_tabla()
     return None
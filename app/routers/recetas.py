@@ -0,0 +1,139 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy.orm import Session, selectinload
+from typing import List
+from app.database import get_db
+from app.models import Receta, DetalleReceta
+from app.schemas.recetas import RecetaCreate, RecetaUpdate, RecetaResponse
+from app.models.personal import Personal
+from app.dependencies import get_current_user, require_admin
+from app.precios import TablaPrecios, tabla_precios, descartar_tabla
+from app.cache_http import (
+    RECURSO_MATERIAS,
+    RECURSO_RECETAS,
+    etag_recursos,
+    no_modificado,
+    respuesta_no_modificada,
+    marcar_etag,
+    invalidar
+)
+
+router = APIRouter(
+    prefix="/recetas",
+    tags=["Recetas"],
+)
+
+
+def _receta_a_dict(receta: Receta, tabla: TablaPrecios) -> dict:
+    """Receta con sus materias a los precios vigentes (con margen), como en un pedido."""
+    cotizado = tabla.cotizar_personalizado(receta.detalles, receta.margen)
+    return {
+        "id_receta": receta.id_receta,
+        "nombre": receta.nombre,
+        "margen": receta.margen,
+        "activa": receta.activa,
+        "fecha_creacion": receta.fecha_creacion,
+        "precio_unitario": cotizado.precio_unitario,
+        "detalles": [c._asdict() for c in cotizado.componentes]
+    }
+
+
+def _nombre_en_uso(db: Session, nombre: str, excepto: int = None) -> bool:
+    query = db.query(Receta.id_receta).filter(Receta.nombre == nombre)
+    if excepto is not None:
+        query = query.filter(Receta.id_receta != excepto)
+    return query.first() is not None
+
+
+@router.post("/", response_model=RecetaResponse, status_code=201)
+def crear_receta(
+    receta: RecetaCreate,
+    db: Session = Depends(get_db),
+    current_user: Personal = Depends(require_admin)
+):
+    """
+    Crea una receta (combinación frecuente de materias primas) - Solo admin.
+    Los pedidos la usan con `producto_personalizado.id_receta`.
+    """
+    # Valida que existan las materias primas
+    tabla = tabla_precios(db)
+    tabla.cotizar_personalizado(receta.detalles, receta.margen)
+    if _nombre_en_uso(db, receta.nombre):
+        raise HTTPException(status_code=400, detail="Ya existe una receta con ese nombre")
+
+    db_receta = Receta(
+        nombre=receta.nombre,
+        margen=receta.margen,
+        detalles=[DetalleReceta(id_materia_prima=d.id_materia_prima, cantidad=d.cantidad)
+                  for d in receta.detalles]
+    )
+    db.add(db_receta)
+    invalidar(db, RECURSO_RECETAS)
+    db.commit()
+    descartar_tabla()
+    db.refresh(db_receta)
+    return _receta_a_dict(db_receta, tabla)
+
+
+@router.get("/", response_model=List[RecetaResponse])
+def listar_recetas(
+    request: Request,
+    response: Response,
+    incluir_inactivas: bool = Query(False),
+    db: Session = Depends(get_db),
+    current_user: Personal = Depends(get_current_user)
+):
+    """Lista las recetas con su precio vigente (admite If-None-Match)"""
+    # El precio depende también de las materias primas
+    etag = etag_recursos(db, RECURSO_RECETAS, RECURSO_MATERIAS,
+                         variante=str(incluir_inactivas))
+    if no_modificado(request, etag):
+        return respuesta_no_modificada(etag)
+    marcar_etag(response, etag)
+
+    query = db.query(Receta).options(selectinload(Receta.detalles))
+    if not incluir_inactivas:
+        query = query.filter(Receta.activa.is_(True))
+    tabla = tabla_precios(db)
+    return [_receta_a_dict(receta, tabla) for receta in query.order_by(Receta.nombre).all()]
+
+
+@router.get("/{receta_id}", response_model=RecetaResponse)
+def obtener_receta(
+    receta_id: int,
+    db: Session = Depends(get_db),
+    current_user: Personal = Depends(get_current_user)
+):
+    """Obtiene una receta, activa o no, con su precio vigente"""
+    receta = db.query(Receta).get(receta_id)
+    if not receta:
+        raise HTTPException(status_code=404, detail="Receta no encontrada")
+    return _receta_a_dict(receta, tabla_precios(db))
+
+
+@router.patch("/{receta_id}", response_model=RecetaResponse)
+def actualizar_receta(
+    receta_id: int,
+    receta_data: RecetaUpdate,
+    db: Session = Depends(get_db),
+    current_user: Personal = Depends(require_admin)
+):
+    """
+    Cambia el nombre o activa/desactiva una receta - Solo admin. Las materias
+    no se modifican: los productos vendidos con la receta siguen apuntando a
+    ella; para otra combinación se crea otra receta y se desactiva esta.
+    """
+    receta = db.query(Receta).get(receta_id)
+    if not receta:
+        raise HTTPException(status_code=404, detail="Receta no encontrada")
+
+    cambios = receta_data.model_dump(exclude_unset=True, exclude_none=True)
+    if "nombre" in cambios and _nombre_en_uso(db, cambios["nombre"], excepto=receta_id):
+        raise HTTPException(status_code=400, detail="Ya existe una receta con ese nombre")
+    for field, value in cambios.items():
+        setattr(receta, field, value)
+
+    invalidar(db, RECURSO_RECETAS)
+    db.commit()
+    descartar_tabla()
+    db.refresh(receta)
+    return _receta_a_dict(receta, tabla_precios(db))
@@ -21,6 +21,7 @@ from pydantic import BaseModel
 from typing import Dict, Any
 from app.models.personal import Personal
 from app.dependencies import require_admin, require_vendedor
+from app.archivo import FuentesPedidos
 router = APIRouter(
     prefix="/reportes",
     tags=["Reportes"],
@@ -70,22 +71,23 @@ def productos_mas_vendidos(
     Devuelve solo productos establecidos ordenados por cantidad vendida.
     """
     try:
-        fecha_inicio = datetime.now() - timedelta(days=dias)
+        fecha_inicio = datetime.now(timezone.utc) - timedelta(days=dias)
+        fuentes = FuentesPedidos(db, fecha_inicio)
 
         # Consulta básica sin joins complejos
-        resultados = db.execute(text("""
+        resultados = db.execute(text(f"""
             SELECT 
                 pe.nombre AS producto,
                 SUM(dp.cantidad) AS unidades_vendidas,
                 SUM(dp.subtotal) AS ingresos
-            FROM detalle_pedido dp
+            FROM {fuentes.sql("detalle_pedido")} dp
             JOIN producto_establecido pe ON dp.id_producto_establecido = pe.id_producto_establecido
-            JOIN pedido p ON dp.id_pedido = p.id_pedido
+            JOIN {fuentes.sql("pedido")} p ON dp.id_pedido = p.id_pedido
             WHERE p.estado = 'Pagado'
             AND p.fecha_pedido >= :fecha_inicio
             GROUP BY pe.nombre
             ORDER BY unidades_vendidas DESC
-        """), {"fecha_inicio": fecha_inicio}).fetchall()
+        """), {"fecha_inicio": fecha_inicio, **fuentes.parametros}).fetchall()
 
         datos = [{
             "producto": producto,
@@ -123,28 +125,30 @@ def sucursales_top(
     """
     try:
         fecha_inicio = datetime.now(timezone.utc) - timedelta(days=dias)
+        # Pedido, o su unión con el archivo si el período llega hasta ahí
+        pedido = FuentesPedidos(db, fecha_inicio).entidad(Pedido)
 
         query = db.query(
             Sucursal.nombre.label("sucursal"),
-            func.count(Pedido.id_pedido).label("total_pedidos"),
-            func.sum(Pedido.total).label("ventas_totales"),
-            (func.sum(Pedido.total) / func.count(Pedido.id_pedido)
+            func.count(pedido.id_pedido).label("total_pedidos"),
+            func.sum(pedido.total).label("ventas_totales"),
+            (func.sum(pedido.total) / func.count(pedido.id_pedido)
              ).label("promedio_por_pedido")
         ).join(
-            Pedido,
-            Pedido.id_sucursal == Sucursal.id_sucursal
+            pedido,
+            pedido.id_sucursal == Sucursal.id_sucursal
         ).filter(
-            Pedido.estado == "Pagado",
-            Pedido.fecha_pedido >= fecha_inicio
+            pedido.estado == "Pagado",
+            pedido.fecha_pedido >= fecha_inicio
         ).group_by(
             Sucursal.nombre
         )
 
         # Ordenar según criterio
         if ordenar_por == "pedidos":
-            query = query.order_by(func.count(Pedido.id_pedido).desc())
+            query = query.order_by(func.count(pedido.id_pedido).desc())
         else:  # default por ventas
-            query = query.order_by(func.sum(Pedido.total).desc())
+            query = query.order_by(func.sum(pedido.total).desc())
 
         resultados = query.all()
 
@@ -186,24 +190,25 @@ def materias_mas_usadas(
     Devuelve las materias primas ordenadas por cantidad utilizada.
     """
     try:
-        fecha_inicio = datetime.now() - timedelta(days=dias)
+        fecha_inicio = datetime.now(timezone.utc) - timedelta(days=dias)
+        fuentes = FuentesPedidos(db, fecha_inicio)
 
         # Consulta corregida con el nombre exacto de la tabla
-        resultados = db.execute(text("""
+        resultados = db.execute(text(f"""
             SELECT 
                 mp.nombre AS materia_prima,
                 SUM(dpp.cantidad) AS total_utilizado,
                 mp.unidad
-            FROM detalle_productopersonalizado dpp
+            FROM {fuentes.sql("detalle_productopersonalizado")} dpp
             JOIN materia_prima mp ON dpp.id_materia_prima = mp.id_materia_prima
-            JOIN producto_personalizado pp ON dpp.id_producto_personalizado = pp.id_producto_personalizado
-            JOIN pedido p ON pp.id_pedido = p.id_pedido
+            JOIN {fuentes.sql("producto_personalizado")} pp ON dpp.id_producto_personalizado = pp.id_producto_personalizado
+            JOIN {fuentes.sql("pedido")} p ON pp.id_pedido = p.id_pedido
             WHERE p.fecha_pedido >= :fecha_inicio
             AND p.estado = 'Pagado'  
             GROUP BY mp.nombre, mp.unidad
             ORDER BY total_utilizado DESC
             LIMIT 10
-        """), {"fecha_inicio": fecha_inicio}).fetchall()
+        """), {"fecha_inicio": fecha_inicio, **fuentes.parametros}).fetchall()
 
         datos = [{
             "materia_prima": nombre,
@@ -243,32 +248,34 @@ def clientes_frecuentes(
     """
     try:
         fecha_inicio = datetime.now(timezone.utc) - timedelta(days=dias)
+        # Pedido, o su unión con el archivo si el período llega hasta ahí
+        pedido = FuentesPedidos(db, fecha_inicio).entidad(Pedido)
 
         query = db.query(
             Cliente.id_cliente,
             Cliente.ci_nit,
             Cliente.apellido,
-            func.count(Pedido.id_pedido).label("total_pedidos"),
-            func.sum(Pedido.total).label("total_gastado"),
-            (func.sum(Pedido.total) / func.count(Pedido.id_pedido)
+            func.count(pedido.id_pedido).label("total_pedidos"),
+            func.sum(pedido.total).label("total_gastado"),
+            (func.sum(pedido.total) / func.count(pedido.id_pedido)
              ).label("promedio_por_pedido")
         ).join(
-            Pedido,
-            Pedido.id_cliente == Cliente.id_cliente
+            pedido,
+            pedido.id_cliente == Cliente.id_cliente
         ).filter(
-            Pedido.estado == "Pagado",
-            Pedido.fecha_pedido >= fecha_inicio,
-            Pedido.id_cliente.isnot(None)
+            pedido.estado == "Pagado",
+            pedido.fecha_pedido >= fecha_inicio,
+            pedido.id_cliente.isnot(None)
         ).group_by(
             Cliente.id_cliente,
             Cliente.ci_nit,
             Cliente.apellido
         ).order_by(
-            func.sum(Pedido.total).desc()
+            func.sum(pedido.total).desc()
         ).limit(top)
 
         if sucursal_id:
-            query = query.filter(Pedido.id_sucursal == sucursal_id)
+            query = query.filter(pedido.id_sucursal == sucursal_id)
 
         resultados = query.all()
 
@@ -314,23 +321,25 @@ def ventas_por_horario(
     """
     try:
         fecha_inicio = datetime.now(timezone.utc) - timedelta(days=dias)
+        # Pedido, o su unión con el archivo si el período llega hasta ahí
+        pedido = FuentesPedidos(db, fecha_inicio).entidad(Pedido)
 
         query = db.query(
-            func.extract('hour', Pedido.fecha_pedido).label("hora"),
-            func.count(Pedido.id_pedido).label("total_pedidos"),
-            func.sum(Pedido.total).label("ventas_totales"),
-            func.avg(Pedido.total).label("ticket_promedio")
+            func.extract('hour', pedido.fecha_pedido).label("hora"),
+            func.count(pedido.id_pedido).label("total_pedidos"),
+            func.sum(pedido.total).label("ventas_totales"),
+            func.avg(pedido.total).label("ticket_promedio")
         ).filter(
-            Pedido.estado == "Pagado",
-            Pedido.fecha_pedido >= fecha_inicio
+            pedido.estado == "Pagado",
+            pedido.fecha_pedido >= fecha_inicio
         ).group_by(
-            func.extract('hour', Pedido.fecha_pedido)
+            func.extract('hour', pedido.fecha_pedido)
         ).order_by(
-            func.extract('hour', Pedido.fecha_pedido)
+            func.extract('hour', pedido.fecha_pedido)
         )
 
         if sucursal_id:
-            query = query.filter(Pedido.id_sucursal == sucursal_id)
+            query = query.filter(pedido.id_sucursal == sucursal_id)
 
         resultados = query.all()
 
@@ -362,3 +371,58 @@ def ventas_por_horario(
             status_code=500,
             detail=f"Error al generar reporte de ventas por horario: {str(e)}"
         )
+
+# 6. Recetas Más Vendidas
+
+
+@router.get("/recetas-mas-vendidas", response_model=ReporteResponse)
+def recetas_mas_vendidas(
+    dias: int = Query(30, description="Período en días"),
+    db: Session = Depends(get_db),
+    current_user: Personal = Depends(require_admin)
+):
+    """
+    Productos personalizados vendidos por receta (con o sin cambios sobre
+    ella): unidades e ingresos. Los armados sin receta no entran.
+    """
+    try:
+        fecha_inicio = datetime.now(timezone.utc) - timedelta(days=dias)
+        fuentes = FuentesPedidos(db, fecha_inicio)
+
+        resultados = db.execute(text(f"""
+            SELECT
+                r.id_receta,
+                r.nombre AS receta,
+                SUM(dp.cantidad) AS unidades_vendidas,
+                SUM(dp.subtotal) AS ingresos
+            FROM {fuentes.sql("producto_personalizado")} pp
+            JOIN receta r ON r.id_receta = pp.id_receta
+            JOIN {fuentes.sql("detalle_pedido")} dp ON dp.id_producto_personalizado = pp.id_producto_personalizado
+            JOIN {fuentes.sql("pedido")} p ON pp.id_pedido = p.id_pedido
+            WHERE p.estado = 'Pagado'
+            AND p.fecha_pedido >= :fecha_inicio
+            GROUP BY r.id_receta, r.nombre
+            ORDER BY unidades_vendidas DESC
+        """), {"fecha_inicio": fecha_inicio, **fuentes.parametros}).fetchall()
+
+        datos = [{
+            "id_receta": id_receta,
+            "receta": receta,
+            "unidades_vendidas": int(unidades),
+            "ingresos": float(ingresos)
+        } for id_receta, receta, unidades, ingresos in resultados]
+
+        return {
+            "meta": {
+                "dias_analizados": dias,
+                "fecha_inicio": fecha_inicio.isoformat(),
+                "total_recetas": len(datos)
+            },
+            "data": datos
+        }
+
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error al generar reporte de recetas: {str(e)}"
+        )
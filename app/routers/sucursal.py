@@ -1,17 +1,36 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status, Request, Response
+from sqlalchemy import func
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional, Union
 from app.database import get_db
 from app.models.inventario_materia_prima import InventarioMateriaPrima
 from app.models.inventario_producto_establecido import InventarioProductoEstablecido
 from app.models.personal import Personal
 from app.models.sucursal import Sucursal
+from app.models.materia_prima import MateriaPrima
+from app.models.producto_establecido import ProductoEstablecido
 from app.schemas.sucursal import (
     SucursalCreate,
     SucursalResponse,
-    SucursalUpdate
+    SucursalUpdate,
+    InventarioSucursalResponse,
+    InventarioSucursalColumnas,
+    ItemInventarioMateria,
+    ItemInventarioProducto
 )
 from app.dependencies import get_current_user, require_admin, require_encargado
+from app.serializacion import RespuestaJSONRapida
+from app.cache_http import (
+    RECURSO_SUCURSALES,
+    RECURSO_MATERIAS,
+    RECURSO_PRODUCTOS,
+    recursos_inventario,
+    etag_recursos,
+    no_modificado,
+    respuesta_no_modificada,
+    marcar_etag,
+    invalidar
+)
 
 router = APIRouter(
     prefix="/sucursales",
@@ -32,6 +51,7 @@ def crear_sucursal(
     """Crea una nueva sucursal (solo admin)"""
     db_sucursal = Sucursal(**sucursal.model_dump())
     db.add(db_sucursal)
+    invalidar(db, RECURSO_SUCURSALES)
     db.commit()
     db.refresh(db_sucursal)
     return db_sucursal
@@ -39,12 +59,19 @@ def crear_sucursal(
 
 @router.get("/", response_model=List[SucursalResponse])
 def listar_sucursales(
+    request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = 100,
     db: Session = Depends(get_db),
     current_user: Personal = Depends(get_current_user)
 ):
-    """Lista todas las sucursales (paginado)"""
+    """Lista todas las sucursales (paginado, admite If-None-Match)"""
+    etag = etag_recursos(db, RECURSO_SUCURSALES)
+    if no_modificado(request, etag):
+        return respuesta_no_modificada(etag)
+    marcar_etag(response, etag)
+
     return db.query(Sucursal).offset(skip).limit(limit).all()
 
 
@@ -83,18 +110,121 @@ def actualizar_sucursal(
     for field, value in update_data.items():
         setattr(sucursal, field, value)
 
+    invalidar(db, RECURSO_SUCURSALES)
     db.commit()
     db.refresh(sucursal)
     return sucursal
 
 
-@router.get("/{sucursal_id}/inventario")
+def _pagina(query, skip: int, limit: int, *orden):
+    """
+    Filas de la página y total de la lista filtrada. El total sale de la
+    columna count(*) OVER de la primera fila; solo si la página quedó vacía
+    por `skip` se cuenta aparte.
+    """
+    filas = query.order_by(*orden).offset(skip).limit(limit).all()
+    if filas:
+        return filas, filas[0].total
+    if skip:
+        return filas, query.with_entities(func.count()).scalar()
+    return filas, 0
+
+
+def _inventario_materias(db: Session, sucursal_id: int, nombre: Optional[str],
+                         solo_bajo_stock: bool, skip: int, limit: int):
+    """Inventario de materias primas con los datos del catálogo en una consulta."""
+    bajo_stock = InventarioMateriaPrima.cantidad_stock < func.coalesce(MateriaPrima.stock_minimo, 0)
+    query = db.query(
+        InventarioMateriaPrima.id_sucursal,
+        InventarioMateriaPrima.id_materia_prima,
+        MateriaPrima.nombre,
+        MateriaPrima.unidad,
+        MateriaPrima.precio_unitario,
+        InventarioMateriaPrima.cantidad_stock,
+        MateriaPrima.stock_minimo,
+        MateriaPrima.fecha_caducidad,
+        bajo_stock.label("bajo_stock"),
+        func.count().over().label("total")
+    ).join(
+        MateriaPrima,
+        MateriaPrima.id_materia_prima == InventarioMateriaPrima.id_materia_prima
+    ).filter(InventarioMateriaPrima.id_sucursal == sucursal_id)
+
+    if nombre:
+        query = query.filter(MateriaPrima.nombre.ilike(f"%{nombre}%"))
+    if solo_bajo_stock:
+        query = query.filter(bajo_stock)
+
+    return _pagina(query, skip, limit, MateriaPrima.nombre, InventarioMateriaPrima.id_materia_prima)
+
+
+def _inventario_productos(db: Session, sucursal_id: int, nombre: Optional[str],
+                          solo_bajo_stock: bool, skip: int, limit: int):
+    """Inventario de productos con los datos del catálogo en una consulta."""
+    bajo_stock = InventarioProductoEstablecido.cantidad_disponible < ProductoEstablecido.stock_minimo
+    query = db.query(
+        InventarioProductoEstablecido.id_sucursal,
+        InventarioProductoEstablecido.id_producto_establecido,
+        ProductoEstablecido.nombre,
+        ProductoEstablecido.es_helado,
+        ProductoEstablecido.precio_unitario,
+        InventarioProductoEstablecido.cantidad_disponible,
+        ProductoEstablecido.stock_minimo,
+        bajo_stock.label("bajo_stock"),
+        func.count().over().label("total")
+    ).join(
+        ProductoEstablecido,
+        ProductoEstablecido.id_producto_establecido == InventarioProductoEstablecido.id_producto_establecido
+    ).filter(InventarioProductoEstablecido.id_sucursal == sucursal_id)
+
+    if nombre:
+        query = query.filter(ProductoEstablecido.nombre.ilike(f"%{nombre}%"))
+    if solo_bajo_stock:
+        query = query.filter(bajo_stock)
+
+    return _pagina(query, skip, limit,
+                   ProductoEstablecido.nombre, InventarioProductoEstablecido.id_producto_establecido)
+
+
+def _a_columnas(filas, campos) -> dict:
+    """Formato columnar: un arreglo por campo en lugar de un objeto por fila."""
+    return {campo: [getattr(f, campo) for f in filas] for campo in campos}
+
+
+_CAMPOS_MATERIA = list(ItemInventarioMateria.model_fields)
+_CAMPOS_PRODUCTO = list(ItemInventarioProducto.model_fields)
+
+
+@router.get("/{sucursal_id}/inventario",
+            response_model=Union[InventarioSucursalResponse, InventarioSucursalColumnas])
 def obtener_inventario_sucursal(
     sucursal_id: int,
+    request: Request,
+    tipo: str = Query("todos", pattern="^(todos|materias|productos)$"),
+    nombre: Optional[str] = None,
+    solo_bajo_stock: bool = False,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(500, ge=1, le=1000),
+    formato: str = Query("filas", pattern="^(filas|columnas)$"),
     db: Session = Depends(get_db),
     current_user: Personal = Depends(get_current_user)
 ):
-    """Obtiene el inventario completo de una sucursal"""
+    """
+    Obtiene el inventario de una sucursal con nombre, unidad, precio y mínimo de
+    cada item (admite If-None-Match).
+    - tipo: materias, productos o todos
+    - nombre / solo_bajo_stock: filtros; skip / limit se aplican a cada lista
+    - formato=columnas: cada lista se devuelve como un arreglo por campo (sin
+      id_sucursal), más compacto para el POS
+    """
+    etag = etag_recursos(
+        db, RECURSO_SUCURSALES, RECURSO_MATERIAS, RECURSO_PRODUCTOS,
+        *recursos_inventario(sucursal_id),
+        variante=str(request.query_params)
+    )
+    if no_modificado(request, etag):
+        return respuesta_no_modificada(etag)
+
     sucursal = db.query(Sucursal).get(sucursal_id)
     if not sucursal:
         raise HTTPException(
@@ -102,11 +232,29 @@ def obtener_inventario_sucursal(
             detail="Sucursal no encontrada"
         )
 
-    return {
-        "sucursal": sucursal,
-        "inventario_materias": sucursal.inventario_materias,
-        "inventario_productos": sucursal.inventario_productos
+    materias, total_materias = _inventario_materias(
+        db, sucursal_id, nombre, solo_bajo_stock, skip, limit) if tipo in ("todos", "materias") else ([], 0)
+    productos, total_productos = _inventario_productos(
+        db, sucursal_id, nombre, solo_bajo_stock, skip, limit) if tipo in ("todos", "productos") else ([], 0)
+
+    resultado = {
+        "sucursal": SucursalResponse.model_validate(sucursal).model_dump(),
+        "total_materias": total_materias,
+        "total_productos": total_productos,
     }
+    if formato == "columnas":
+        resultado["inventario_materias"] = _a_columnas(materias, _CAMPOS_MATERIA[1:])
+        resultado["inventario_productos"] = _a_columnas(productos, _CAMPOS_PRODUCTO[1:])
+    else:
+        resultado["inventario_materias"] = [
+            {campo: getattr(f, campo) for campo in _CAMPOS_MATERIA} for f in materias]
+        resultado["inventario_productos"] = [
+            {campo: getattr(f, campo) for campo in _CAMPOS_PRODUCTO} for f in productos]
+
+    # Ya tiene la forma del schema: se serializa directo con orjson
+    respuesta = RespuestaJSONRapida(content=resultado)
+    marcar_etag(respuesta, etag)
+    return respuesta
 
 
 @router.delete(
@@ -165,6 +313,7 @@ def eliminar_sucursal(
 
     # Si pasa todas las validaciones, eliminar
     db.delete(sucursal)
+    invalidar(db, RECURSO_SUCURSALES)
     db.commit()
 
     return None  # 204 No Content
@@ -1,4 +1,5 @@
 from datetime import datetime
+from typing import List
 from pydantic import BaseModel
 
 
@@ -23,3 +24,24 @@ class BackupListResponse(BaseModel):
         json_encoders = {
             datetime: lambda v: v.isoformat()
         }
+
+
+class RestauracionTablaResponse(BaseModel):
+    tabla: str
+    filas: int
+    lotes: int
+    segundos: float
+
+
+class RestauracionResponse(BaseModel):
+    origen: str
+    tablas: List[RestauracionTablaResponse]
+    tablas_omitidas: List[str]
+    filas_totales: int
+    bytes_leidos: int
+    secuencias_reajustadas: int
+    modo_restricciones: str
+    segundos_lectura: float
+    segundos_totales: float
+    filas_por_segundo: float
+    mb_por_segundo: float
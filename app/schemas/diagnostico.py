@@ -0,0 +1,38 @@
+from typing import List
+from pydantic import BaseModel
+
+
+class PerfilResumenResponse(BaseModel):
+    id: str
+    fecha: str
+    metodo: str
+    ruta: str
+    estado: int
+    ms: float
+    ms_db: float
+    consultas: int
+
+
+class SentenciaPerfilResponse(BaseModel):
+    ms: float
+    sentencia: str
+
+
+class PerfilResponse(PerfilResumenResponse):
+    resumen: str
+    sql: List[SentenciaPerfilResponse]
+
+
+class HuellaConsultaResponse(BaseModel):
+    huella: str
+    cantidad: int
+    total_ms: float
+    promedio_ms: float
+    p95_ms: float
+    max_ms: float
+    lentas: int
+
+
+class ConsultasResponse(BaseModel):
+    umbral_lentas_ms: float
+    consultas: List[HuellaConsultaResponse]
@@ -1,7 +1,7 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import List, Literal, Optional
 from decimal import Decimal
-from datetime import date
+from datetime import date, datetime
 
 
 class InventarioMateriaBase(BaseModel):
@@ -74,6 +74,11 @@ class AlertaStockResponse(BaseModel):
     sucursal_nombre: Optional[str] = None
     fecha_caducidad: Optional[date] = None
 
+
+class AlertaInventarioResponse(AlertaStockResponse):
+    motivo: Literal['bajo_stock', 'por_caducar', 'caducado']
+    severidad: Literal['critica', 'alta', 'media']
+
 # ... (los schemas anteriores permanecen igual)
 
 
@@ -87,3 +92,169 @@ class AsignarProductoSucursal(BaseModel):
     id_producto_establecido: int
     id_sucursal: int
     cantidad_inicial: int
+
+
+# --------------------------
+# Ajustes de stock por lote
+# --------------------------
+
+ModoAjuste = Literal['absoluto', 'delta']
+
+
+class AjusteLoteMateriaItem(BaseModel):
+    id_sucursal: int
+    id_materia_prima: int
+    cantidad: Decimal = Field(max_digits=10, decimal_places=2)
+    modo: ModoAjuste = Field(
+        'absoluto', description="'absoluto' fija el stock, 'delta' lo suma o resta")
+
+
+class AjusteLoteMateria(BaseModel):
+    ajustes: List[AjusteLoteMateriaItem] = Field(..., min_length=1, max_length=5000)
+    motivo: Optional[str] = None
+
+
+class AjusteLoteProductoItem(BaseModel):
+    id_sucursal: int
+    id_producto_establecido: int
+    cantidad: int
+    modo: ModoAjuste = Field(
+        'absoluto', description="'absoluto' fija el stock, 'delta' lo suma o resta")
+
+
+class AjusteLoteProducto(BaseModel):
+    ajustes: List[AjusteLoteProductoItem] = Field(..., min_length=1, max_length=5000)
+    motivo: Optional[str] = None
+
+
+class ResultadoAjusteLote(BaseModel):
+    id_sucursal: int
+    id_item: int
+    resultado: Literal['creado', 'actualizado', 'rechazado', 'no_encontrado']
+    nuevo_stock: Optional[Decimal] = None
+    bajo_stock: Optional[bool] = None
+    detalle: Optional[str] = None
+
+
+class AjusteLoteResponse(BaseModel):
+    procesados: int
+    creados: int
+    actualizados: int
+    rechazados: int
+    resultados: List[ResultadoAjusteLote]
+
+
+# --------------------------
+# Transferencias por lote
+# --------------------------
+
+TipoItemTransferencia = Literal['materia_prima', 'producto']
+
+
+class MovimientoTransferencia(BaseModel):
+    tipo_item: TipoItemTransferencia
+    id_item: int
+    id_sucursal_origen: int
+    id_sucursal_destino: int
+    cantidad: Decimal = Field(..., gt=0, max_digits=10, decimal_places=2)
+
+
+class TransferenciaLote(BaseModel):
+    movimientos: List[MovimientoTransferencia] = Field(..., min_length=1, max_length=5000)
+    motivo: Optional[str] = None
+
+
+class DetalleTransferenciaResponse(BaseModel):
+    id_detalle_transferencia: int
+    tipo_item: TipoItemTransferencia
+    id_item: int
+    id_sucursal_origen: int
+    id_sucursal_destino: int
+    cantidad: Decimal
+
+    class Config:
+        from_attributes = True
+
+
+class TransferenciaResponse(BaseModel):
+    id_transferencia: int
+    fecha: Optional[datetime] = None
+    id_personal: int
+    motivo: Optional[str] = None
+    detalles: List[DetalleTransferenciaResponse]
+
+    class Config:
+        from_attributes = True
+
+
+# --------------------------
+# Inicialización de sucursales
+# --------------------------
+
+class InicializarSucursal(BaseModel):
+    id_sucursal_plantilla: Optional[int] = Field(
+        None, description="Sucursal de la que se copian los items; sin valor se usa todo el catálogo")
+    copiar_cantidades: bool = Field(
+        False, description="Con plantilla, copia también sus cantidades actuales")
+    cantidad_materias: Decimal = Field(Decimal('0'), ge=0, max_digits=10, decimal_places=2)
+    cantidad_productos: int = Field(0, ge=0)
+    incluir_materias: bool = True
+    incluir_productos: bool = True
+
+
+class ConteoInicializacion(BaseModel):
+    insertados: int
+    omitidos: int
+
+
+class InicializarSucursalResponse(BaseModel):
+    id_sucursal: int
+    origen: str
+    materias_primas: Optional[ConteoInicializacion] = None
+    productos: Optional[ConteoInicializacion] = None
+
+
+# --------------------------
+# Historial de inventario
+# --------------------------
+
+class SnapshotResponse(BaseModel):
+    fecha_corte: datetime
+    snapshots: dict
+
+
+class StockHistoricoItem(BaseModel):
+    id_item: int
+    cantidad: Decimal
+
+
+class StockHistoricoResponse(BaseModel):
+    id_sucursal: int
+    tipo_item: TipoItemTransferencia
+    fecha: datetime
+    metodo: Literal['snapshot', 'actual']
+    items: List[StockHistoricoItem]
+
+
+class VariacionItem(BaseModel):
+    id_item: int
+    nombre: Optional[str] = None
+    stock_inicial: Decimal
+    stock_final: Decimal
+    variacion: Decimal
+    pedido: Decimal
+    cancelacion: Decimal
+    ajuste: Decimal
+    transferencia: Decimal
+    asignacion: Decimal
+    inicializacion: Decimal
+    merma: Decimal
+
+
+class VariacionResponse(BaseModel):
+    id_sucursal: int
+    tipo_item: TipoItemTransferencia
+    desde: datetime
+    hasta: datetime
+    metodo: Literal['snapshot', 'actual']
+    items: List[VariacionItem]
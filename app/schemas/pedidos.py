@@ -1,4 +1,4 @@
-from datetime import datetime
+from datetime import datetime, timezone
 from decimal import Decimal
 from typing import Literal, Optional, List
 from pydantic import BaseModel, Field, validator
@@ -25,9 +25,23 @@ class DetalleProductoPersonalizadoCreate(BaseModel):
 
 class ProductoPersonalizadoCreate(BaseModel):
     nombre_personalizado: Optional[str] = None
-    detalles: List[DetalleProductoPersonalizadoCreate]
+    id_receta: Optional[int] = Field(
+        None,
+        description="Receta de partida; `detalles` y `margen` pasan a ser cambios sobre ella"
+    )
+    detalles: List[DetalleProductoPersonalizadoCreate] = Field(
+        default_factory=list,
+        description="Materias primas; con receta, cantidades que reemplazan las suyas (0 la quita)"
+    )
     margen: Optional[Decimal] = Field(
-        Decimal('0.30'), gt=0, description="Margen de ganancia (ej. 0.30 = 30%)")
+        None, gt=0, description="Margen de ganancia (ej. 0.30 = 30%). Por defecto 0.30 o el de la receta")
+
+    @validator('detalles', always=True)
+    @classmethod
+    def validate_detalles(cls, v, values):
+        if not v and values.get('id_receta') is None:
+            raise ValueError("Se requiere id_receta o al menos una materia prima")
+        return v
 
 
 class DetallePedidoCreate(BaseModel):
@@ -78,9 +92,82 @@ class PedidoCreate(BaseModel):
         return v
 
 
+class PedidoLoteItem(PedidoCreate):
+    fecha_pedido: Optional[datetime] = Field(
+        None,
+        description="Hora de la venta en la terminal. Sin zona horaria se toma como UTC; "
+                    "si no se envía, la hora de la carga"
+    )
+    referencia: Optional[str] = Field(
+        None, max_length=100,
+        description="Identificador local de la venta en la terminal; se devuelve en el resultado"
+    )
+
+    @validator('fecha_pedido')
+    @classmethod
+    def validate_fecha_pedido(cls, v):
+        if v is not None and v.tzinfo is None:
+            return v.replace(tzinfo=timezone.utc)
+        return v
+
+
+class PedidoLoteCreate(BaseModel):
+    pedidos: List[PedidoLoteItem] = Field(..., min_length=1, max_length=1000)
+
+
+class ResultadoPedidoLote(BaseModel):
+    indice: int
+    referencia: Optional[str] = None
+    resultado: Literal['creado', 'rechazado']
+    id_pedido: Optional[int] = None
+    total: Optional[Decimal] = None
+    detalle: Optional[str] = None
+
+
+class PedidoLoteResponse(BaseModel):
+    procesados: int
+    creados: int
+    rechazados: int
+    resultados: List[ResultadoPedidoLote]
+
+
+class CotizacionCreate(BaseModel):
+    detalles: List[DetallePedidoCreate] = Field(..., min_length=1)
+
+
+class ComponenteCotizacion(BaseModel):
+    id_materia_prima: int
+    nombre_materia: str
+    unidad: Optional[str]
+    cantidad: Decimal
+    precio_unitario: Decimal
+    subtotal: Decimal
+
+
+class LineaCotizacion(BaseModel):
+    tipo_producto: Literal['Establecido', 'Personalizado']
+    id_producto_establecido: Optional[int] = None
+    id_receta: Optional[int] = None
+    nombre: Optional[str] = None
+    cantidad: int
+    precio_unitario: Decimal
+    subtotal: Decimal
+    componentes: Optional[List[ComponenteCotizacion]] = None
+
+
+class CotizacionResponse(BaseModel):
+    version_precios: str
+    total: Decimal
+    detalles: List[LineaCotizacion]
+
+
 class PedidoUpdate(BaseModel):
     estado: Optional[EstadoPedido] = None
     metodo_pago: Optional[MetodoPago] = None
+    estado_esperado: Optional[EstadoPedido] = Field(
+        None,
+        description="Si se envía, el cambio de estado solo se aplica si el pedido sigue en este estado"
+    )
 
 
 class DetalleProductoPersonalizadoResponse(BaseModel):
@@ -95,6 +182,7 @@ class DetalleProductoPersonalizadoResponse(BaseModel):
 class ProductoPersonalizadoResponse(BaseModel):
     id_producto_personalizado: int
     nombre_personalizado: Optional[str]
+    id_receta: Optional[int] = None
     detalles: List[DetalleProductoPersonalizadoResponse]
 
 
@@ -17,6 +17,7 @@ class ProductoEstablecidoBase(BaseModel):
     precio_unitario: Decimal = Field(..., gt=0,
                                      decimal_places=2, example=15.50)
     es_helado: bool = Field(default=True, example=True)
+    stock_minimo: int = Field(default=0, ge=0, example=10)
 
 
 class ProductoEstablecidoCreate(ProductoEstablecidoBase):
@@ -0,0 +1,50 @@
+from decimal import Decimal
+from datetime import datetime
+from pydantic import BaseModel, Field, validator
+from typing import List, Optional
+
+
+class DetalleRecetaCreate(BaseModel):
+    id_materia_prima: int
+    cantidad: Decimal = Field(..., gt=0, decimal_places=2, example=0.10)
+
+
+class RecetaCreate(BaseModel):
+    nombre: str = Field(..., max_length=50, example="Bowl clásico")
+    margen: Optional[Decimal] = Field(
+        None, gt=0, decimal_places=2,
+        description="Margen de ganancia (ej. 0.30 = 30%). Por defecto 0.30")
+    detalles: List[DetalleRecetaCreate] = Field(..., min_length=1)
+
+    @validator('detalles')
+    @classmethod
+    def validate_detalles(cls, v):
+        ids = [d.id_materia_prima for d in v]
+        if len(ids) != len(set(ids)):
+            raise ValueError("Materia prima repetida en la receta")
+        return v
+
+
+class RecetaUpdate(BaseModel):
+    """Las materias de una receta no cambian: para otra combinación se crea otra receta."""
+    nombre: Optional[str] = Field(None, max_length=50)
+    activa: Optional[bool] = None
+
+
+class DetalleRecetaResponse(BaseModel):
+    id_materia_prima: int
+    nombre_materia: str
+    unidad: Optional[str]
+    cantidad: Decimal
+    precio_unitario: Decimal
+    subtotal: Decimal
+
+
+class RecetaResponse(BaseModel):
+    id_receta: int
+    nombre: str
+    margen: Optional[Decimal]
+    activa: bool
+    fecha_creacion: Optional[datetime]
+    precio_unitario: Decimal
+    detalles: List[DetalleRecetaResponse]
@@ -1,6 +1,7 @@
 from pydantic import BaseModel, Field
-from datetime import time
-from typing import Optional
+from datetime import date, time
+from decimal import Decimal
+from typing import List, Optional
 
 
 class SucursalBase(BaseModel):
@@ -31,3 +32,65 @@ class SucursalUpdate(BaseModel):
     telefono: Optional[str] = Field(None, min_length=7, max_length=15)
     horario_apertura: Optional[time] = None
     horario_cierre: Optional[time] = None
+
+
+class ItemInventarioMateria(BaseModel):
+    id_sucursal: int
+    id_materia_prima: int
+    nombre: str
+    unidad: str
+    precio_unitario: Decimal
+    cantidad_stock: Decimal
+    stock_minimo: Optional[Decimal] = None
+    fecha_caducidad: Optional[date] = None
+    bajo_stock: bool
+
+
+class ItemInventarioProducto(BaseModel):
+    id_sucursal: int
+    id_producto_establecido: int
+    nombre: str
+    es_helado: Optional[bool] = None
+    precio_unitario: Decimal
+    cantidad_disponible: int
+    stock_minimo: int
+    bajo_stock: bool
+
+
+class InventarioSucursalResponse(BaseModel):
+    sucursal: SucursalResponse
+    total_materias: int
+    total_productos: int
+    inventario_materias: List[ItemInventarioMateria]
+    inventario_productos: List[ItemInventarioProducto]
+
+
+# Formato columnar (formato=columnas): un arreglo por campo, sin id_sucursal
+
+class InventarioMateriasColumnas(BaseModel):
+    id_materia_prima: List[int]
+    nombre: List[str]
+    unidad: List[str]
+    precio_unitario: List[Decimal]
+    cantidad_stock: List[Decimal]
+    stock_minimo: List[Optional[Decimal]]
+    fecha_caducidad: List[Optional[date]]
+    bajo_stock: List[bool]
+
+
+class InventarioProductosColumnas(BaseModel):
+    id_producto_establecido: List[int]
+    nombre: List[str]
+    es_helado: List[Optional[bool]]
+    precio_unitario: List[Decimal]
+    cantidad_disponible: List[int]
+    stock_minimo: List[int]
+    bajo_stock: List[bool]
+
+
+class InventarioSucursalColumnas(BaseModel):
+    sucursal: SucursalResponse
+    total_materias: int
+    total_productos: int
+    inventario_materias: InventarioMateriasColumnas
+    inventario_productos: InventarioProductosColumnas
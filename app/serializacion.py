@@ -0,0 +1,115 @@
+"""
+Serialización rápida de respuestas JSON.
+
+`RespuestaJSONRapida` reemplaza al JSONResponse por defecto usando orjson, y los
+serializadores de pedidos construyen directamente los dicts con la forma de
+`PedidoResponse` a partir de los objetos ORM, sin pasar por la validación de
+pydantic ni por jsonable_encoder. Los Decimal se escriben como texto (igual que
+los serializa pydantic) y las fechas se dejan a orjson, que las escribe en ISO 8601.
+"""
+from decimal import Decimal
+from typing import Any, List
+
+import orjson
+from fastapi.responses import JSONResponse
+
+from app.models import Pedido, DetallePedido
+
+_CERO = Decimal("0")
+
+
+def _por_defecto(valor: Any):
+    """Tipos que orjson no conoce de forma nativa."""
+    if isinstance(valor, Decimal):
+        return str(valor)
+    raise TypeError(f"Tipo no serializable: {type(valor).__name__}")
+
+
+def a_json(content: Any) -> bytes:
+    """Serializa con orjson (también Decimal)."""
+    return orjson.dumps(
+        content,
+        default=_por_defecto,
+        option=orjson.OPT_NON_STR_KEYS
+    )
+
+
+class RespuestaJSONRapida(JSONResponse):
+    """JSONResponse que serializa con orjson (también Decimal)."""
+
+    def render(self, content: Any) -> bytes:
+        return a_json(content)
+
+
+def _dec(valor) -> str:
+    return str(valor if valor is not None else _CERO)
+
+
+def detalle_pedido_a_dict(detalle: DetallePedido) -> dict:
+    """Serializa un detalle de pedido con la forma de DetallePedidoResponse."""
+    if detalle.tipo_producto == 'Establecido':
+        producto = detalle.producto_establecido
+        return {
+            "id_detalle_pedido": detalle.id_detalle_pedido,
+            "tipo_producto": "Establecido",
+            "id_producto_establecido": detalle.id_producto_establecido,
+            "nombre_producto": producto.nombre if producto else "Desconocido",
+            "cantidad": detalle.cantidad,
+            "precio_unitario": _dec(detalle.precio_unitario),
+            "subtotal": _dec(detalle.subtotal)
+        }
+
+    producto_pers = detalle.producto_personalizado
+    detalles_mp = []
+    if producto_pers:
+        for mp in producto_pers.detalles:
+            materia = mp.materia_prima
+            detalles_mp.append({
+                "id_materia_prima": mp.id_materia_prima,
+                "nombre_materia": materia.nombre if materia else "Desconocido",
+                "cantidad": _dec(mp.cantidad),
+                "precio_unitario": _dec(mp.precio_unitario),
+                "subtotal": _dec(mp.subtotal),
+                "unidad": materia.unidad if materia and materia.unidad else "unidad"
+            })
+
+    return {
+        "id_detalle_pedido": detalle.id_detalle_pedido,
+        "tipo_producto": "Personalizado",
+        "id_producto_personalizado": detalle.id_producto_personalizado,
+        "producto_personalizado": {
+            "id_producto_personalizado": producto_pers.id_producto_personalizado if producto_pers else None,
+            "nombre_personalizado": producto_pers.nombre_personalizado if producto_pers else "Desconocido",
+            "id_receta": producto_pers.id_receta if producto_pers else None,
+            "detalles": detalles_mp
+        },
+        "cantidad": detalle.cantidad,
+        "precio_unitario": _dec(detalle.precio_unitario),
+        "subtotal": _dec(detalle.subtotal)
+    }
+
+
+def pedido_a_dict(pedido: Pedido) -> dict:
+    """
+    Serializa un pedido con la forma de PedidoResponse.
+    Espera las relaciones ya cargadas (joinedload) para no disparar lazy loads.
+    """
+    return {
+        "id_pedido": pedido.id_pedido,
+        "fecha_pedido": pedido.fecha_pedido,
+        "id_personal": pedido.id_personal,
+        "nombre_personal": pedido.personal.nombre if pedido.personal else "Desconocido",
+        "id_sucursal": pedido.id_sucursal,
+        "nombre_sucursal": pedido.sucursal.nombre if pedido.sucursal else "Desconocido",
+        "id_cliente": pedido.id_cliente,
+        "nombre_cliente": pedido.cliente.apellido if pedido.cliente else None,
+        "estado": pedido.estado,
+        "metodo_pago": pedido.metodo_pago,
+        "total": _dec(pedido.total),
+        "detalles": [detalle_pedido_a_dict(d) for d in pedido.detalles]
+    }
+
+
+def pedidos_a_lista(pedidos: List[Pedido]) -> List[dict]:
+    """Serializa una lista de pedidos para RespuestaJSONRapida."""
+    return [pedido_a_dict(p) for p in pedidos]
@@ -0,0 +1,263 @@
+"""
+Prueba de carga del punto de venta contra la aplicación en el mismo proceso.
+
+Simula --terminales cajas atendiendo a la vez: cada una inicia sesión con un
+vendedor de su sucursal (los que crea benchmarks/datos_sinteticos.py) y repite
+la mezcla MEZCLA de operaciones durante --segundos; un administrador consulta
+los reportes en paralelo. Las peticiones van a app.main.app por ASGI (httpx,
+sin red), así que se mide la aplicación y la base, no un servidor HTTP.
+
+Al terminar muestra, por endpoint: peticiones, errores, peticiones por segundo
+y latencias p50/p95/p99/máxima en milisegundos. Con --json guarda lo mismo en
+un archivo para comparar corridas.
+
+Necesita la base de DATABASE_URL generada con datos_sinteticos.py. Los
+reportes usan SQL de PostgreSQL: contra SQLite solo tiene sentido --sin-reportes.
+La carga escribe pedidos y descuenta stock: usar una base de pruebas.
+
+    python -m benchmarks.carga_pos
+    python -m benchmarks.carga_pos --terminales 16 --segundos 120 --json carga.json
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+import httpx
+from sqlalchemy import select
+
+from app.database import SessionLocal
+from app.main import app
+from app.models import Personal, Cliente, ProductoEstablecido, MateriaPrima
+from benchmarks.datos_sinteticos import CONTRASENA
+
+# Peso de cada operación de caja
+MEZCLA = {
+    "crear": 40,
+    "confirmar": 25,
+    "listar": 20,
+    "obtener": 13,
+    "login": 2,
+}
+REPORTES = [
+    "/reportes/productos-mas-vendidos",
+    "/reportes/sucursales-top",
+    "/reportes/materias-mas-usadas",
+    "/reportes/clientes-frecuentes",
+    "/reportes/ventas-por-horario",
+    "/predicciones/tendencias",
+    "/predicciones/stock-riesgo",
+]
+# Pausa del administrador entre reportes (segundos)
+PAUSA_REPORTES = 0.5
+
+
+class Resultados:
+    """Latencias (ms) y errores por endpoint."""
+
+    def __init__(self):
+        self.latencias: Dict[str, List[float]] = defaultdict(list)
+        self.errores: Dict[str, int] = defaultdict(int)
+
+    def registrar(self, endpoint: str, inicio: float, respuesta: Optional[httpx.Response]):
+        self.latencias[endpoint].append((time.perf_counter() - inicio) * 1000)
+        if respuesta is None or respuesta.status_code >= 400:
+            self.errores[endpoint] += 1
+
+    def resumen(self, segundos: float) -> List[dict]:
+        filas = []
+        for endpoint in sorted(self.latencias):
+            tiempos = sorted(self.latencias[endpoint])
+            filas.append({
+                "endpoint": endpoint,
+                "peticiones": len(tiempos),
+                "errores": self.errores[endpoint],
+                "por_segundo": round(len(tiempos) / segundos, 1),
+                "p50": round(_percentil(tiempos, 50), 1),
+                "p95": round(_percentil(tiempos, 95), 1),
+                "p99": round(_percentil(tiempos, 99), 1),
+                "max": round(tiempos[-1], 1),
+            })
+        return filas
+
+
+def _percentil(ordenados: List[float], p: int) -> float:
+    """Percentil por rango más cercano sobre una lista ordenada."""
+    indice = max(0, -(-len(ordenados) * p // 100) - 1)
+    return ordenados[indice]
+
+
+def _datos_base(sucursales: int) -> dict:
+    """Vendedores, clientes y catálogo a usar en las peticiones."""
+    db = SessionLocal()
+    try:
+        vendedores = db.execute(
+            select(Personal.usuario, Personal.id_personal, Personal.id_sucursal)
+            .where(Personal.usuario.like("vendedor\\_%"))
+            .order_by(Personal.id_sucursal, Personal.id_personal)
+        ).all()
+        if sucursales:
+            vendedores = [v for v in vendedores if v.id_sucursal <= sucursales]
+        return {
+            "vendedores": vendedores,
+            "clientes": db.execute(select(Cliente.id_cliente).limit(5000)).scalars().all(),
+            "productos": db.execute(select(ProductoEstablecido.id_producto_establecido)).scalars().all(),
+            "materias": db.execute(select(MateriaPrima.id_materia_prima)).scalars().all(),
+        }
+    finally:
+        db.close()
+
+
+def _pedido_nuevo(rnd: random.Random, vendedor, datos: dict) -> dict:
+    detalles = []
+    for _ in range(rnd.choices((1, 2, 3), (50, 35, 15))[0]):
+        if rnd.random() < 0.30:
+            detalles.append({
+                "tipo_producto": "Personalizado",
+                "cantidad": 1,
+                "producto_personalizado": {
+                    "nombre_personalizado": "Bowl",
+                    "detalles": [
+                        {"id_materia_prima": m, "cantidad": "0.10"}
+                        for m in rnd.sample(datos["materias"], 3)
+                    ],
+                },
+            })
+        else:
+            detalles.append({
+                "tipo_producto": "Establecido",
+                "id_producto_establecido": rnd.choice(datos["productos"]),
+                "cantidad": rnd.choice((1, 1, 2)),
+            })
+    return {
+        "id_personal": vendedor.id_personal,
+        "id_sucursal": vendedor.id_sucursal,
+        "id_cliente": rnd.choice(datos["clientes"]) if datos["clientes"] and rnd.random() < 0.4 else None,
+        "metodo_pago": rnd.choice(("Efectivo", "Tarjeta", "Transferencia")),
+        "detalles": detalles,
+    }
+
+
+async def _peticion(cliente: httpx.AsyncClient, resultados: Resultados, endpoint: str,
+                    metodo: str, url: str, **kwargs) -> Optional[httpx.Response]:
+    inicio = time.perf_counter()
+    respuesta = None
+    try:
+        respuesta = await cliente.request(metodo, url, **kwargs)
+        return respuesta
+    finally:
+        resultados.registrar(endpoint, inicio, respuesta)
+
+
+async def _login(cliente, resultados, usuario: str) -> dict:
+    respuesta = await _peticion(cliente, resultados, "POST /auth/login", "POST", "/auth/login",
+                                json={"username": usuario, "password": CONTRASENA})
+    if respuesta.status_code != 200:
+        raise RuntimeError(f"No se pudo iniciar sesión como {usuario}: {respuesta.text}")
+    return {"Authorization": f"Bearer {respuesta.json()['access_token']}"}
+
+
+async def _terminal(cliente, resultados, vendedor, datos: dict, fin: float, semilla: int):
+    rnd = random.Random(semilla)
+    encabezados = await _login(cliente, resultados, vendedor.usuario)
+    pendientes: List[int] = []
+    propios: List[int] = []
+    operaciones, pesos = list(MEZCLA), list(MEZCLA.values())
+    while time.perf_counter() < fin:
+        operacion = rnd.choices(operaciones, pesos)[0]
+        if operacion == "confirmar" and not pendientes:
+            operacion = "crear"
+        if operacion == "obtener" and not propios:
+            operacion = "listar"
+
+        if operacion == "crear":
+            respuesta = await _peticion(cliente, resultados, "POST /pedidos", "POST", "/pedidos/",
+                                        json=_pedido_nuevo(rnd, vendedor, datos), headers=encabezados)
+            if respuesta is not None and respuesta.status_code == 201:
+                pendientes.append(respuesta.json()["id_pedido"])
+        elif operacion == "confirmar":
+            id_pedido = pendientes.pop(0)
+            await _peticion(cliente, resultados, "PATCH /pedidos/{id}/confirmar", "PATCH",
+                            f"/pedidos/{id_pedido}/confirmar", headers=encabezados)
+            propios.append(id_pedido)
+        elif operacion == "listar":
+            await _peticion(cliente, resultados, "GET /pedidos/sucursal/{id}/optimizado", "GET",
+                            f"/pedidos/sucursal/{vendedor.id_sucursal}/optimizado",
+                            headers=encabezados)
+        elif operacion == "obtener":
+            await _peticion(cliente, resultados, "GET /pedidos/{id}", "GET",
+                            f"/pedidos/{rnd.choice(propios[-50:])}", headers=encabezados)
+        else:
+            encabezados = await _login(cliente, resultados, vendedor.usuario)
+
+
+async def _administrador(cliente, resultados, fin: float):
+    encabezados = await _login(cliente, resultados, "admin_bench")
+    i = 0
+    while time.perf_counter() < fin:
+        ruta = REPORTES[i % len(REPORTES)]
+        await _peticion(cliente, resultados, f"GET {ruta}", "GET", ruta, headers=encabezados)
+        i += 1
+        await asyncio.sleep(PAUSA_REPORTES)
+
+
+async def _correr(terminales: int, segundos: float, semilla: int, reportes: bool,
+                  sucursales: int) -> Resultados:
+    datos = await asyncio.to_thread(_datos_base, sucursales)
+    if not datos["vendedores"]:
+        raise RuntimeError("No hay vendedores: generar la base con benchmarks.datos_sinteticos")
+    resultados = Resultados()
+    transporte = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transporte, base_url="http://carga", timeout=60) as cliente:
+        fin = time.perf_counter() + segundos
+        tareas = [
+            _terminal(cliente, resultados, datos["vendedores"][i % len(datos["vendedores"])],
+                      datos, fin, semilla + i)
+            for i in range(terminales)
+        ]
+        if reportes:
+            tareas.append(_administrador(cliente, resultados, fin))
+        await asyncio.gather(*tareas)
+    return resultados
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--terminales", type=int, default=8, help="cajas concurrentes")
+    parser.add_argument("--segundos", type=float, default=60)
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--sucursales", type=int, default=0,
+                        help="limitar las cajas a las primeras N sucursales (0 = todas)")
+    parser.add_argument("--sin-reportes", action="store_true",
+                        help="no consultar reportes en paralelo")
+    parser.add_argument("--json", help="archivo donde guardar los resultados")
+    args = parser.parse_args()
+
+    print(f"{args.terminales} terminales durante {args.segundos:.0f} s...")
+    inicio = time.perf_counter()
+    resultados = asyncio.run(_correr(args.terminales, args.segundos, args.semilla,
+                                     not args.sin_reportes, args.sucursales))
+    duracion = time.perf_counter() - inicio
+    filas = resultados.resumen(duracion)
+
+    print(f"\n{'endpoint':<46}{'n':>7}{'err':>5}{'req/s':>8}{'p50':>8}{'p95':>8}{'p99':>8}{'max':>8}")
+    for f in filas:
+        print(f"{f['endpoint']:<46}{f['peticiones']:>7}{f['errores']:>5}{f['por_segundo']:>8}"
+              f"{f['p50']:>8}{f['p95']:>8}{f['p99']:>8}{f['max']:>8}")
+    total = sum(f["peticiones"] for f in filas)
+    errores = sum(f["errores"] for f in filas)
+    print(f"\n{total} peticiones en {duracion:.1f} s ({total / duracion:.1f} req/s), {errores} errores")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as archivo:
+            json.dump({"terminales": args.terminales, "segundos": round(duracion, 1),
+                       "endpoints": filas}, archivo, indent=2, ensure_ascii=False)
+    return 1 if errores else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,70 @@
+"""
+Benchmark de compresión sobre páginas típicas de /pedidos.
+
+Para páginas de 20, 100 y 1000 pedidos sintéticos (serializados igual que
+/pedidos/sucursal/{id}/optimizado) mide el tamaño resultante y la latencia que
+agrega CompresionMiddleware con cada codificación.
+
+    python -m benchmarks.compresion_pedidos
+"""
+import asyncio
+import time
+
+from app.compresion import CompresionMiddleware, brotli
+from app.serializacion import RespuestaJSONRapida, pedidos_a_lista
+from benchmarks.serializacion_pedidos import pedidos_sinteticos
+
+REPETICIONES = 50
+
+
+def _app_fija(cuerpo: bytes):
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(cuerpo)).encode()),
+        ]})
+        await send({"type": "http.response.body", "body": cuerpo})
+    return app
+
+
+async def _medir(middleware, accept_encoding: bytes) -> tuple:
+    scope = {"type": "http", "headers": [(b"accept-encoding", accept_encoding)]}
+    enviados = []
+
+    async def send(message):
+        enviados.append(message)
+
+    async def receive():
+        return {"type": "http.request"}
+
+    inicio = time.perf_counter()
+    for _ in range(REPETICIONES):
+        enviados.clear()
+        await middleware(scope, receive, send)
+    segundos = (time.perf_counter() - inicio) / REPETICIONES
+    tamano = sum(len(m.get("body", b"")) for m in enviados if m["type"] == "http.response.body")
+    return tamano, segundos
+
+
+def main():
+    variantes = [("identidad", b"identity", {}),
+                 ("gzip-1", b"gzip", {"nivel_gzip": 1}),
+                 ("gzip-6", b"gzip", {"nivel_gzip": 6})]
+    if brotli is not None:
+        variantes += [("br-4", b"br", {"nivel_brotli": 4}),
+                      ("br-6", b"br", {"nivel_brotli": 6})]
+    else:
+        print("(brotli no instalado: se omiten las variantes br)")
+
+    print(f"{'pedidos':>8} {'codificación':<12} {'bytes':>10} {'ratio':>7} {'ms':>8}")
+    for cantidad in (20, 100, 1000):
+        cuerpo = RespuestaJSONRapida(content=pedidos_a_lista(pedidos_sinteticos(cantidad))).body
+        for nombre, accept, opciones in variantes:
+            middleware = CompresionMiddleware(_app_fija(cuerpo), usar_brotli=True, **opciones)
+            tamano, segundos = asyncio.run(_medir(middleware, accept))
+            print(f"{cantidad:>8} {nombre:<12} {tamano:>10} "
+                  f"{tamano / len(cuerpo):>7.3f} {segundos * 1000:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,319 @@
+"""
+Generador de datos sintéticos para pruebas de carga.
+
+Llena la base vacía de DATABASE_URL (PostgreSQL o SQLite) con los modelos de
+app.models: roles, sucursales, personal, catálogo de productos y materias
+primas, inventarios, clientes y pedidos históricos. La mezcla intenta
+parecerse a la operación real:
+
+- pedidos repartidos en los últimos --dias días, más los fines de semana y
+  concentrados por la tarde (ver HORAS);
+- sucursales con volumen desigual (unas pocas concentran la mayoría);
+- 1 a 4 líneas por pedido, ~30 % personalizadas con 2 a 5 materias primas,
+  con el mismo precio que calcula POST /pedidos (margen de 30 %);
+- ~85 % pagados, ~10 % cancelados y el resto pendientes;
+- ~40 % con cliente registrado.
+
+Con la misma --semilla se generan siempre los mismos datos. Las claves se
+asignan aquí (no con la secuencia) para insertar por lotes sin leerlas de
+vuelta; en PostgreSQL las secuencias se ajustan al final.
+
+El personal generado usa la contraseña CONTRASENA: admin_bench (Administrador),
+gerente_{sucursal} y vendedor_{sucursal}_{n}. benchmarks/carga_pos.py inicia
+sesión con esos usuarios.
+
+    python -m benchmarks.datos_sinteticos --pedidos 200000
+    DATABASE_URL=sqlite:///bench.db python -m benchmarks.datos_sinteticos --pedidos 50000
+    python -m benchmarks.datos_sinteticos --pedidos 5000000 --sucursales 50 --reiniciar
+
+--reiniciar borra TODAS las tablas de la aplicación antes de generar: usarlo
+solo contra una base de pruebas.
+"""
+import argparse
+import random
+import sys
+import time
+from datetime import datetime, time as hora, timedelta, timezone
+from decimal import Decimal
+
+from sqlalchemy import func, insert, select, text
+
+from app.database import engine
+from app.models import (
+    Base, Rol, Sucursal, Personal, Cliente, MateriaPrima, ProductoEstablecido,
+    InventarioMateriaPrima, InventarioProductoEstablecido, Pedido, DetallePedido,
+    ProductoPersonalizado, DetalleProductoPersonalizado
+)
+from app.security import get_password_hash
+
+CONTRASENA = "bench1234"
+MARGEN = Decimal("0.30")
+LOTE = 5000
+
+# Peso relativo de cada hora de atención (10 a 21 h, hora local de la sucursal)
+HORAS = {10: 2, 11: 4, 12: 7, 13: 8, 14: 7, 15: 9, 16: 12, 17: 14, 18: 13, 19: 10, 20: 7, 21: 4}
+# Lunes a domingo
+DIAS_SEMANA = [8, 8, 9, 10, 13, 17, 15]
+ESTADOS = (["Pagado"] * 85) + (["Cancelado"] * 10) + (["Pendiente"] * 5)
+METODOS = (["Efectivo"] * 55) + (["Tarjeta"] * 30) + (["Transferencia"] * 15)
+
+MATERIAS = [
+    # (nombre, unidad, precio)
+    ("Base de acaí", "litro", "38.00"), ("Leche entera", "litro", "8.50"),
+    ("Yogur natural", "litro", "14.00"), ("Granola", "kg", "42.00"),
+    ("Frutilla", "kg", "25.00"), ("Banana", "kg", "9.00"), ("Mango", "kg", "18.00"),
+    ("Arándano", "kg", "95.00"), ("Kiwi", "kg", "30.00"), ("Coco rallado", "kg", "48.00"),
+    ("Miel", "litro", "45.00"), ("Chocolate", "kg", "60.00"), ("Dulce de leche", "kg", "35.00"),
+    ("Maní", "kg", "28.00"), ("Almendras", "kg", "110.00"), ("Chía", "kg", "55.00"),
+    ("Leche condensada", "litro", "32.00"), ("Crema de leche", "litro", "36.00"),
+    ("Oreo", "kg", "70.00"), ("Chispas de colores", "kg", "40.00"),
+    ("Vaso 500 ml", "unidad", "0.80"), ("Vaso 300 ml", "unidad", "0.60"),
+    ("Cucharilla", "unidad", "0.15"), ("Paleta de madera", "unidad", "0.10"),
+]
+PRODUCTOS = [
+    # (nombre, precio, es_helado)
+    ("Bowl acaí clásico", "28.00", True), ("Bowl acaí tropical", "32.00", True),
+    ("Bowl acaí proteico", "35.00", True), ("Smoothie frutilla", "18.00", True),
+    ("Smoothie mango", "18.00", True), ("Helado vainilla", "12.00", True),
+    ("Helado chocolate", "12.00", True), ("Helado frutilla", "12.00", True),
+    ("Helado dulce de leche", "13.00", True), ("Paleta de coco", "8.00", True),
+    ("Paleta de maracuyá", "8.00", True), ("Copa familiar", "45.00", True),
+    ("Milkshake", "20.00", True), ("Topping extra", "4.00", False),
+    ("Salsa de chocolate", "3.00", False), ("Cono bañado", "2.50", False),
+    ("Agua mineral", "6.00", False), ("Café americano", "10.00", False),
+]
+APELLIDOS = ["Mamani", "Quispe", "Flores", "Rojas", "Vargas", "Gutiérrez", "Choque",
+             "Fernández", "López", "Mendoza", "Torrez", "Condori", "Rodríguez", "Pérez",
+             "Gonzales", "Cruz", "Morales", "Ríos", "Salazar", "Castro"]
+NOMBRES = ["Ana", "Luis", "María", "Jorge", "Carla", "Diego", "Lucía", "Marco", "Paola",
+           "Raúl", "Sofía", "Iván", "Daniela", "Pablo", "Valeria", "Hugo"]
+
+# Tablas con tipos propios de PostgreSQL (JSONB, ARRAY): no se crean en SQLite
+_SOLO_POSTGRES = {"pedido_archivo", "snapshot_inventario"}
+# Tablas con clave serial generada aquí: (tabla, columna)
+_SECUENCIAS = [
+    ("roles", "id_rol"), ("sucursal", "id_sucursal"), ("personal", "id_personal"),
+    ("cliente", "id_cliente"), ("materia_prima", "id_materia_prima"),
+    ("producto_establecido", "id_producto_establecido"), ("pedido", "id_pedido"),
+    ("producto_personalizado", "id_producto_personalizado"),
+    ("detalle_pedido", "id_detalle_pedido"),
+]
+
+
+def _tablas():
+    if engine.dialect.name == "postgresql":
+        return Base.metadata.sorted_tables
+    return [t for t in Base.metadata.sorted_tables if t.name not in _SOLO_POSTGRES]
+
+
+def _catalogo(conexion, rnd: random.Random, sucursales: int, clientes: int):
+    """Roles, sucursales, personal, catálogo, inventarios y clientes."""
+    conexion.execute(insert(Rol), [
+        {"id_rol": 1, "nombre": "Administrador", "descripcion": "Acceso total"},
+        {"id_rol": 2, "nombre": "Gerente Sucursal", "descripcion": "Encargado de sucursal"},
+        {"id_rol": 3, "nombre": "Vendedor", "descripcion": "Atención en caja"},
+    ])
+    conexion.execute(insert(Sucursal), [
+        {"id_sucursal": s, "nombre": f"Sucursal {s}", "direccion": f"Calle {rnd.randint(1, 90)} #{s * 10}",
+         "telefono": f"7{rnd.randint(1000000, 9999999)}",
+         "horario_apertura": hora(10), "horario_cierre": hora(22)}
+        for s in range(1, sucursales + 1)
+    ])
+
+    # Un solo hash para todos: bcrypt es lento a propósito
+    clave = get_password_hash(CONTRASENA)
+    personal = [{"id_personal": 1, "nombre": "Administrador Bench", "id_rol": 1,
+                 "id_sucursal": None, "usuario": "admin_bench", "contraseña_hash": clave}]
+    for s in range(1, sucursales + 1):
+        personal.append({"id_personal": len(personal) + 1, "nombre": f"Gerente {s}", "id_rol": 2,
+                         "id_sucursal": s, "usuario": f"gerente_{s}", "contraseña_hash": clave})
+        for n in range(1, 4):
+            personal.append({"id_personal": len(personal) + 1,
+                             "nombre": f"{rnd.choice(NOMBRES)} {rnd.choice(APELLIDOS)}",
+                             "id_rol": 3, "id_sucursal": s, "usuario": f"vendedor_{s}_{n}",
+                             "contraseña_hash": clave})
+    conexion.execute(insert(Personal), personal)
+
+    conexion.execute(insert(MateriaPrima), [
+        {"id_materia_prima": i, "nombre": nombre, "unidad": unidad,
+         "precio_unitario": Decimal(precio), "stock_minimo": Decimal("5")}
+        for i, (nombre, unidad, precio) in enumerate(MATERIAS, 1)
+    ])
+    conexion.execute(insert(ProductoEstablecido), [
+        {"id_producto_establecido": i, "nombre": nombre, "precio_unitario": Decimal(precio),
+         "es_helado": es_helado, "stock_minimo": 10}
+        for i, (nombre, precio, es_helado) in enumerate(PRODUCTOS, 1)
+    ])
+    # Stock holgado: la carga de carga_pos.py descuenta de aquí al confirmar
+    conexion.execute(insert(InventarioMateriaPrima), [
+        {"id_sucursal": s, "id_materia_prima": m,
+         "cantidad_stock": Decimal(rnd.randint(50_000, 100_000))}
+        for s in range(1, sucursales + 1) for m in range(1, len(MATERIAS) + 1)
+    ])
+    conexion.execute(insert(InventarioProductoEstablecido), [
+        {"id_sucursal": s, "id_producto_establecido": p,
+         "cantidad_disponible": rnd.randint(50_000, 100_000)}
+        for s in range(1, sucursales + 1) for p in range(1, len(PRODUCTOS) + 1)
+    ])
+
+    inicio = datetime.now(timezone.utc) - timedelta(days=3 * 365)
+    for desde in range(1, clientes + 1, LOTE):
+        conexion.execute(insert(Cliente), [
+            {"id_cliente": c, "ci_nit": str(1_000_000 + c), "apellido": rnd.choice(APELLIDOS),
+             "fecha_registro": inicio + timedelta(minutes=rnd.randint(0, 3 * 365 * 24 * 60))}
+            for c in range(desde, min(desde + LOTE, clientes + 1))
+        ])
+    return personal
+
+
+def _fecha(rnd: random.Random, dias: list, ahora: datetime) -> datetime:
+    """Instante de un pedido según el peso del día de la semana y de la hora."""
+    dia = rnd.choice(dias)
+    instante = datetime.combine(dia, hora(rnd.choices(list(HORAS), list(HORAS.values()))[0]),
+                                timezone.utc) + timedelta(seconds=rnd.randint(0, 3599))
+    return min(instante, ahora)
+
+
+def _pedidos(conexion, rnd: random.Random, cantidad: int, dias_historial: int,
+             sucursales: int, clientes: int, personal: list):
+    ahora = datetime.now(timezone.utc)
+    hoy = ahora.date()
+    # Días del historial repetidos según su peso semanal, para elegir con choice()
+    dias = []
+    for d in range(dias_historial):
+        dia = hoy - timedelta(days=d)
+        dias.extend([dia] * DIAS_SEMANA[dia.weekday()])
+
+    # Volumen por sucursal tipo Zipf: la 1 vende más que la 2, etc.
+    pesos_sucursal = [1 / s ** 0.8 for s in range(1, sucursales + 1)]
+    vendedores = {}
+    for p in personal:
+        if p["id_rol"] == 3:
+            vendedores.setdefault(p["id_sucursal"], []).append(p["id_personal"])
+    precios_producto = [Decimal(p[1]) for p in PRODUCTOS]
+    precios_materia = [Decimal(m[2]) * (1 + MARGEN) for m in MATERIAS]
+    # Los productos más baratos se venden más
+    pesos_producto = [1 / float(p) for p in precios_producto]
+
+    id_detalle = id_personalizado = 0
+    generados = 0
+    inicio = time.perf_counter()
+    while generados < cantidad:
+        pedidos, lineas, personalizados, materias = [], [], [], []
+        for id_pedido in range(generados + 1, min(generados + LOTE, cantidad) + 1):
+            sucursal = rnd.choices(range(1, sucursales + 1), pesos_sucursal)[0]
+            fecha = _fecha(rnd, dias, ahora)
+            total = Decimal("0")
+            for _ in range(rnd.choices((1, 2, 3, 4), (45, 30, 17, 8))[0]):
+                id_detalle += 1
+                cantidad_linea = rnd.choices((1, 2, 3), (75, 20, 5))[0]
+                if rnd.random() < 0.30:
+                    id_personalizado += 1
+                    personalizados.append({
+                        "id_producto_personalizado": id_personalizado, "id_pedido": id_pedido,
+                        "nombre_personalizado": f"Bowl {rnd.choice(NOMBRES)}", "fecha_creacion": fecha,
+                    })
+                    precio = Decimal("0")
+                    for m in rnd.sample(range(len(MATERIAS)), rnd.randint(2, 5)):
+                        cantidad_mp = (Decimal(1) if MATERIAS[m][1] == "unidad"
+                                       else Decimal(rnd.choice(("0.05", "0.10", "0.15", "0.20", "0.25"))))
+                        precio_mp = precios_materia[m].quantize(Decimal("0.01"))
+                        materias.append({
+                            "id_producto_personalizado": id_personalizado, "id_materia_prima": m + 1,
+                            "cantidad": cantidad_mp, "precio_unitario": precio_mp,
+                        })
+                        precio += cantidad_mp * precio_mp
+                    precio = precio.quantize(Decimal("0.01"))
+                    lineas.append({
+                        "id_detalle_pedido": id_detalle, "id_pedido": id_pedido,
+                        "tipo_producto": "Personalizado", "id_producto_personalizado": id_personalizado,
+                        "id_producto_establecido": None, "cantidad": cantidad_linea, "precio_unitario": precio,
+                    })
+                else:
+                    p = rnd.choices(range(len(PRODUCTOS)), pesos_producto)[0]
+                    precio = precios_producto[p]
+                    lineas.append({
+                        "id_detalle_pedido": id_detalle, "id_pedido": id_pedido,
+                        "tipo_producto": "Establecido", "id_producto_establecido": p + 1,
+                        "id_producto_personalizado": None, "cantidad": cantidad_linea, "precio_unitario": precio,
+                    })
+                total += cantidad_linea * precio
+            estado = rnd.choice(ESTADOS)
+            pedidos.append({
+                "id_pedido": id_pedido, "fecha_pedido": fecha,
+                "id_personal": rnd.choice(vendedores[sucursal]), "id_sucursal": sucursal,
+                "id_cliente": rnd.randint(1, clientes) if clientes and rnd.random() < 0.40 else None,
+                "estado": estado,
+                "metodo_pago": rnd.choice(METODOS) if estado != "Pendiente" else None,
+                "total": total,
+            })
+
+        with conexion.begin():
+            conexion.execute(insert(Pedido), pedidos)
+            if personalizados:
+                conexion.execute(insert(ProductoPersonalizado), personalizados)
+                conexion.execute(insert(DetalleProductoPersonalizado), materias)
+            conexion.execute(insert(DetallePedido), lineas)
+        generados += len(pedidos)
+        if generados % (LOTE * 20) == 0 or generados == cantidad:
+            segundos = time.perf_counter() - inicio
+            print(f"  {generados:,} pedidos ({generados / segundos:,.0f}/s)", flush=True)
+
+
+def _ajustar_secuencias(conexion):
+    """En PostgreSQL deja cada secuencia después de la última clave insertada."""
+    for tabla, columna in _SECUENCIAS:
+        conexion.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{tabla}', '{columna}'), "
+            f"COALESCE((SELECT max({columna}) FROM {tabla}), 0) + 1, false)"))
+
+
+def generar(pedidos: int, sucursales: int, clientes: int, dias: int,
+            semilla: int, reiniciar: bool = False) -> int:
+    tablas = _tablas()
+    rnd = random.Random(semilla)
+    with engine.connect() as conexion:
+        with conexion.begin():
+            if reiniciar:
+                Base.metadata.drop_all(conexion, tables=tablas)
+            Base.metadata.create_all(conexion, tables=tablas)
+            con_datos = conexion.execute(select(func.count()).select_from(Sucursal)).scalar()
+        if con_datos:
+            print("La base ya tiene datos: usar --reiniciar para borrarlos o una base vacía",
+                  file=sys.stderr)
+            return 1
+
+        print(f"Catálogo: {sucursales} sucursales, {clientes:,} clientes")
+        with conexion.begin():
+            personal = _catalogo(conexion, rnd, sucursales, clientes)
+        print(f"Pedidos: {pedidos:,} en {dias} días")
+        _pedidos(conexion, rnd, pedidos, dias, sucursales, clientes, personal)
+
+        if engine.dialect.name == "postgresql":
+            with conexion.begin():
+                _ajustar_secuencias(conexion)
+                conexion.execute(text("ANALYZE"))
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--pedidos", type=int, default=1_000_000)
+    parser.add_argument("--sucursales", type=int, default=20)
+    parser.add_argument("--clientes", type=int, default=20_000)
+    parser.add_argument("--dias", type=int, default=365, help="días de historial")
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--reiniciar", action="store_true",
+                        help="borrar y volver a crear todas las tablas antes de generar")
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    codigo = generar(args.pedidos, args.sucursales, args.clientes, args.dias,
+                     args.semilla, args.reiniciar)
+    if codigo == 0:
+        print(f"Listo en {time.perf_counter() - inicio:.0f} s")
+    return codigo
+
+
+if __name__ == "__main__":
+    sys.exit(main())
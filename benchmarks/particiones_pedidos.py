@@ -0,0 +1,180 @@
+"""
+Latencia de los reportes sobre pedido plano vs particionado por mes.
+
+Genera pedidos sintéticos (10 millones por defecto, repartidos en 24 meses y 50
+sucursales) en un esquema aparte, bench_particiones, con dos copias de los
+mismos datos: una tabla plana y una particionada por mes como la que deja
+app/particiones.py, ambas con los índices de app/models/pedido.py. Después
+mide la mediana de cada consulta de reporte/listado en las dos.
+
+Necesita PostgreSQL en DATABASE_URL; no toca las tablas de la aplicación. Con
+--conservar el esquema queda para la siguiente corrida (si tiene la misma
+cantidad de pedidos no se vuelve a generar).
+
+    python -m benchmarks.particiones_pedidos
+    python -m benchmarks.particiones_pedidos --pedidos 2000000 --repeticiones 9 --conservar
+"""
+import argparse
+import statistics
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import text
+
+from app.database import engine
+from app.particiones import inicio_mes, sumar_meses
+
+ESQUEMA = "bench_particiones"
+MESES = 24
+SUCURSALES = 50
+LOTE = 1_000_000
+
+_COLUMNAS = """
+    id_pedido integer NOT NULL,
+    fecha_pedido timestamptz NOT NULL,
+    id_personal integer NOT NULL,
+    id_sucursal integer NOT NULL,
+    id_cliente integer,
+    estado varchar(20) NOT NULL,
+    metodo_pago varchar(20),
+    total numeric(12,2) NOT NULL
+"""
+
+_INDICES = """
+    CREATE INDEX ON {t} (id_sucursal, fecha_pedido DESC);
+    CREATE INDEX ON {t} (id_sucursal, estado, fecha_pedido DESC);
+    CREATE INDEX ON {t} (fecha_pedido) INCLUDE (id_pedido, id_sucursal, id_cliente, total)
+        WHERE estado = 'Pagado';
+"""
+
+# nombre -> SQL con {t} para la tabla; :desde/:hasta/:sucursal como parámetros
+CONSULTAS = {
+    "sucursales-top (30 días)": """
+        SELECT id_sucursal, count(*), sum(total) FROM {t}
+        WHERE estado = 'Pagado' AND fecha_pedido >= :desde
+        GROUP BY id_sucursal ORDER BY sum(total) DESC LIMIT 5
+    """,
+    "ventas-por-horario (30 días)": """
+        SELECT extract(hour FROM fecha_pedido), count(*), sum(total) FROM {t}
+        WHERE estado = 'Pagado' AND fecha_pedido >= :desde
+        GROUP BY 1 ORDER BY 1
+    """,
+    "ventas de un mes cerrado": """
+        SELECT id_sucursal, sum(total) FROM {t}
+        WHERE estado = 'Pagado' AND fecha_pedido >= :mes_desde AND fecha_pedido < :mes_hasta
+        GROUP BY id_sucursal
+    """,
+    "ventas del año": """
+        SELECT date_trunc('month', fecha_pedido), sum(total) FROM {t}
+        WHERE estado = 'Pagado' AND fecha_pedido >= :anio
+        GROUP BY 1 ORDER BY 1
+    """,
+    "listado sucursal (últimos 20)": """
+        SELECT * FROM {t} WHERE id_sucursal = :sucursal
+        ORDER BY fecha_pedido DESC LIMIT 20
+    """,
+    "listado sucursal (un mes)": """
+        SELECT * FROM {t} WHERE id_sucursal = :sucursal
+        AND fecha_pedido >= :mes_desde AND fecha_pedido < :mes_hasta
+        ORDER BY fecha_pedido DESC LIMIT 20
+    """,
+}
+
+
+def _preparar(conexion, pedidos: int, conservar: bool) -> bool:
+    """Crea y llena las tablas; devuelve False si se reutilizaron las existentes."""
+    existe = conexion.execute(text("SELECT to_regclass(:t) IS NOT NULL"),
+                              {"t": f"{ESQUEMA}.plano"}).scalar()
+    if existe and conservar:
+        actuales = conexion.execute(text(f"SELECT count(*) FROM {ESQUEMA}.plano")).scalar()
+        if actuales == pedidos:
+            return False
+    conexion.execute(text(f"DROP SCHEMA IF EXISTS {ESQUEMA} CASCADE"))
+    conexion.execute(text(f"CREATE SCHEMA {ESQUEMA}"))
+    conexion.execute(text(f"CREATE TABLE {ESQUEMA}.plano ({_COLUMNAS})"))
+    conexion.execute(text(
+        f"CREATE TABLE {ESQUEMA}.particionado ({_COLUMNAS}) PARTITION BY RANGE (fecha_pedido)"))
+    primero = sumar_meses(inicio_mes(datetime.now(timezone.utc)), -(MESES - 1))
+    for i in range(MESES + 1):
+        mes = sumar_meses(primero, i)
+        conexion.execute(text(
+            f"CREATE TABLE {ESQUEMA}.particionado_p{mes:%Y_%m} PARTITION OF {ESQUEMA}.particionado "
+            f"FOR VALUES FROM ('{mes} 00:00:00+00') TO ('{sumar_meses(mes, 1)} 00:00:00+00')"))
+
+    # Fechas uniformes entre el primer mes y ahora; 60 % pagados
+    segundos = int((datetime.now(timezone.utc)
+                    - datetime.combine(primero, datetime.min.time(), timezone.utc)).total_seconds())
+    for inicio in range(1, pedidos + 1, LOTE):
+        fin = min(inicio + LOTE - 1, pedidos)
+        conexion.execute(text(f"""
+            INSERT INTO {ESQUEMA}.plano
+            SELECT g, :primero + make_interval(secs => floor(random() * :segundos)),
+                   1 + g % 10, 1 + g % {SUCURSALES},
+                   CASE WHEN g % 3 = 0 THEN 1 + g % 5000 END,
+                   (ARRAY['Pagado', 'Pagado', 'Pagado', 'Pendiente', 'Cancelado'])[1 + g % 5],
+                   'Efectivo', 10 + (g % 90)
+            FROM generate_series(:inicio, :fin) g
+        """), {"primero": datetime.combine(primero, datetime.min.time(), timezone.utc),
+               "segundos": segundos, "inicio": inicio, "fin": fin})
+        print(f"  {fin:,} pedidos generados", flush=True)
+    conexion.execute(text(f"INSERT INTO {ESQUEMA}.particionado SELECT * FROM {ESQUEMA}.plano"))
+    for tabla in ("plano", "particionado"):
+        for sentencia in _INDICES.format(t=f"{ESQUEMA}.{tabla}").split(";"):
+            if sentencia.strip():
+                conexion.execute(text(sentencia))
+    return True
+
+
+def _medir(conexion, sql: str, parametros: dict, repeticiones: int) -> float:
+    conexion.execute(text(sql), parametros).all()  # calentamiento
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        conexion.execute(text(sql), parametros).all()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return statistics.median(tiempos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--pedidos", type=int, default=10_000_000)
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--conservar", action="store_true",
+                        help="no borrar el esquema de prueba al terminar")
+    args = parser.parse_args()
+
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conexion:
+        print(f"Preparando {args.pedidos:,} pedidos en {ESQUEMA}...")
+        inicio = time.perf_counter()
+        if _preparar(conexion, args.pedidos, args.conservar):
+            print(f"  listo en {time.perf_counter() - inicio:.0f} s")
+        else:
+            print("  se reutilizan las tablas existentes")
+        conexion.execute(text(f"VACUUM ANALYZE {ESQUEMA}.plano"))
+        conexion.execute(text(f"VACUUM ANALYZE {ESQUEMA}.particionado"))
+
+        ahora = datetime.now(timezone.utc)
+        mes = datetime.combine(sumar_meses(inicio_mes(ahora), -6), datetime.min.time(), timezone.utc)
+        # Fechas con zona horaria, como en los reportes: comparadas con
+        # timestamptz permiten descartar particiones al planificar
+        parametros = {
+            "desde": ahora - timedelta(days=30),
+            "anio": ahora - timedelta(days=365),
+            "mes_desde": mes,
+            "mes_hasta": datetime.combine(sumar_meses(mes, 1), datetime.min.time(), timezone.utc),
+            "sucursal": 7,
+        }
+
+        print(f"\n{'consulta':<32}{'plano ms':>11}{'particionado ms':>17}{'relación':>10}")
+        for nombre, sql in CONSULTAS.items():
+            plano = _medir(conexion, sql.format(t=f"{ESQUEMA}.plano"), parametros, args.repeticiones)
+            particionado = _medir(conexion, sql.format(t=f"{ESQUEMA}.particionado"),
+                                  parametros, args.repeticiones)
+            print(f"{nombre:<32}{plano:>11.1f}{particionado:>17.1f}{plano / particionado:>9.2f}x")
+
+        if not args.conservar:
+            conexion.execute(text(f"DROP SCHEMA {ESQUEMA} CASCADE"))
+
+
+if __name__ == "__main__":
+    main()
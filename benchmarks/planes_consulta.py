@@ -0,0 +1,153 @@
+"""
+Regresión de planes de consulta para los listados de pedidos y los reportes.
+
+Llama a cada endpoint con TestClient contra la base de DATABASE_URL (PostgreSQL
+con las migraciones aplicadas), captura las consultas SQL que emite y ejecuta
+EXPLAIN (FORMAT JSON) de cada una con sus mismos parámetros. Verifica que los
+planes usen los índices esperados y termina con código 1 si alguno falta.
+
+Las consultas se explican con enable_seqscan = off: en una base chica el
+planificador prefiere leer la tabla entera aunque el índice sirva, y lo que
+interesa detectar aquí es que un cambio en la consulta (p. ej. envolver
+fecha_pedido en una función o cambiar el filtro de estado) deje al índice
+inutilizable. Aun así la base necesita un volumen de pedidos razonable (miles
+por sucursal, con detalles y productos personalizados): con un puñado de filas
+el planificador elige índices que no dicen nada del caso real.
+
+    python -m benchmarks.planes_consulta           # verifica
+    python -m benchmarks.planes_consulta --planes  # además muestra los índices de cada consulta
+"""
+import sys
+from typing import List, Set
+
+from sqlalchemy import event
+
+from app.database import engine
+from app.dependencies import get_current_user
+from app.main import app
+from app.models import Personal, Rol
+
+# (endpoint, índices que deben aparecer en los planes de sus consultas)
+CASOS = [
+    ("/pedidos/sucursal/1",
+     {"ix_pedido_sucursal_fecha", "ix_detalle_pedido_pedido"}),
+    ("/pedidos/sucursal/1/optimizado",
+     {"ix_pedido_sucursal_fecha", "ix_detalle_pedido_pedido"}),
+    ("/pedidos/sucursal/1/optimizado?estado=Pagado",
+     {"ix_pedido_sucursal_estado_fecha", "ix_detalle_pedido_pedido"}),
+    ("/pedidos/sucursal/1/resumido",
+     {"ix_pedido_sucursal_fecha", "ix_detalle_pedido_pedido"}),
+    ("/reportes/productos-mas-vendidos",
+     {"ix_pedido_pagado_fecha"}),
+    ("/reportes/sucursales-top",
+     {"ix_pedido_pagado_fecha"}),
+    ("/reportes/materias-mas-usadas",
+     {"ix_pedido_pagado_fecha", "ix_producto_personalizado_pedido"}),
+    ("/reportes/clientes-frecuentes",
+     {"ix_pedido_pagado_fecha"}),
+    ("/reportes/ventas-por-horario",
+     {"ix_pedido_pagado_fecha"}),
+    ("/predicciones/tendencias",
+     {"ix_pedido_pagado_fecha"}),
+    ("/predicciones/demanda/1",
+     {"ix_detalle_pedido_producto_establecido"}),
+    ("/predicciones/stock-riesgo",
+     {"ix_pedido_pagado_fecha", "ix_producto_personalizado_pedido"}),
+]
+
+
+def _administrador() -> Personal:
+    personal = Personal(id_personal=0, nombre="planes", id_rol=0, usuario="planes",
+                        contraseña_hash="-")
+    personal.rol = Rol(id_rol=0, nombre="Administrador")
+    return personal
+
+
+def _indices(plan: dict) -> Set[str]:
+    """Nombres de índices usados en un nodo del plan y sus hijos."""
+    encontrados = set()
+    if "Index Name" in plan:
+        encontrados.add(plan["Index Name"])
+    for hijo in plan.get("Plans", []):
+        encontrados |= _indices(hijo)
+    return encontrados
+
+
+class _Captura:
+    def __init__(self):
+        self.consultas: List[tuple] = []
+        self.activa = False
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        texto = statement.lstrip().upper()
+        if self.activa and not executemany and texto.startswith(("SELECT", "WITH")):
+            self.consultas.append((statement, parameters))
+
+
+def _explicar(consultas) -> List[Set[str]]:
+    conexion = engine.raw_connection()
+    try:
+        cursor = conexion.cursor()
+        # Con pedido particionado (app/particiones.py) cada partición tiene su
+        # copia del índice con un nombre generado: se reporta el del padre
+        cursor.execute("""
+            SELECT c.relname, p.relname FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            JOIN pg_class p ON p.oid = i.inhparent
+            WHERE c.relkind = 'i'
+        """)
+        padres = dict(cursor.fetchall())
+        cursor.execute("SET enable_seqscan = off")
+        resultado = []
+        for statement, parameters in consultas:
+            cursor.execute("EXPLAIN (FORMAT JSON) " + statement, parameters)
+            plan = cursor.fetchone()[0]
+            resultado.append({padres.get(i, i) for i in _indices(plan[0]["Plan"])})
+        return resultado
+    finally:
+        conexion.rollback()
+        conexion.close()
+
+
+def main(mostrar_planes: bool = False) -> int:
+    from fastapi.testclient import TestClient
+
+    app.dependency_overrides[get_current_user] = _administrador
+    client = TestClient(app)
+    captura = _Captura()
+    event.listen(engine, "before_cursor_execute", captura)
+
+    fallas = 0
+    try:
+        for ruta, esperados in CASOS:
+            captura.consultas = []
+            captura.activa = True
+            respuesta = client.get(ruta)
+            captura.activa = False
+            if respuesta.status_code >= 400:
+                print(f"ERROR  {ruta}: HTTP {respuesta.status_code}")
+                fallas += 1
+                continue
+
+            planes = _explicar(captura.consultas)
+            usados = set().union(*planes) if planes else set()
+            faltantes = esperados - usados
+            estado = "OK   " if not faltantes else "FALLA"
+            print(f"{estado}  {ruta}  ({len(planes)} consultas)")
+            if faltantes:
+                fallas += 1
+                print(f"         faltan: {', '.join(sorted(faltantes))}")
+            if mostrar_planes or faltantes:
+                for (statement, _), indices in zip(captura.consultas, planes):
+                    primera = " ".join(statement.split())[:90]
+                    print(f"         {sorted(indices) or '-'}  {primera}")
+    finally:
+        event.remove(engine, "before_cursor_execute", captura)
+        app.dependency_overrides.pop(get_current_user, None)
+
+    print(f"\n{len(CASOS) - fallas}/{len(CASOS)} endpoints usan los índices esperados")
+    return 1 if fallas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(mostrar_planes="--planes" in sys.argv))
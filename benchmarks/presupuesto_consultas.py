@@ -0,0 +1,253 @@
+"""
+Presupuesto de consultas SQL por endpoint.
+
+Genera una base chica y siempre igual con benchmarks/datos_sinteticos.py
+(semilla fija), llama con TestClient a los endpoints de CASOS (todos los
+routers de app/routers) y mide por cada uno la cantidad de sentencias SQL, las
+filas devueltas y el tiempo. La verificación es tests/test_presupuesto_consultas.py:
+falla si algún endpoint ejecuta más consultas que su presupuesto en
+presupuesto_consultas.json (o más que TECHO_CONSULTAS) o responde con error,
+así un N+1 nuevo no pasa desapercibido.
+
+    python -m pytest tests/test_presupuesto_consultas.py
+    PRESUPUESTO_DATABASE_URL=postgresql+psycopg2://postgres@localhost/presupuesto \
+        PRESUPUESTO_REINICIAR=1 python -m pytest tests/test_presupuesto_consultas.py
+
+Las filas y el tiempo se informan pero no hacen fallar la corrida (dependen de
+la fecha y de la máquina); solo se avisa si crecen mucho respecto de la base.
+Las filas se leen de cursor.rowcount, que SQLite no informa para SELECT.
+
+Por defecto usa un archivo SQLite temporal. Con PRESUPUESTO_DATABASE_URL (o
+--url) se puede usar un PostgreSQL local; la base tiene que estar vacía (o
+usar PRESUPUESTO_REINICIAR=1 / --reiniciar, que BORRA todas sus tablas). Los
+endpoints marcados solo_postgresql usan SQL propio de PostgreSQL (reportes, o
+clock_timestamp() en el historial de stock) y se omiten con SQLite. La línea
+base guarda un presupuesto por motor.
+
+Este módulo, ejecutado directamente, solo rehace la línea base del motor (no
+guarda nada si algún endpoint falla o pasa TECHO_CONSULTAS):
+
+    python -m benchmarks.presupuesto_consultas --actualizar
+    python -m benchmarks.presupuesto_consultas --actualizar --url postgresql+psycopg2://postgres@localhost/presupuesto --reiniciar
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+LINEA_BASE = Path(__file__).with_name("presupuesto_consultas.json")
+# Datos generados para la corrida (chicos: interesa la forma de las consultas)
+PEDIDOS = 3000
+SUCURSALES = 3
+CLIENTES = 300
+SEMILLA = 42
+# Avisos (no fallas) cuando filas o tiempo superan la base por este factor
+TOLERANCIA_FILAS = 1.5
+TOLERANCIA_TIEMPO = 3.0
+# Ningún endpoint puede pasar de aquí aunque la línea base lo permita: el
+# presupuesto no puede crecer con la cantidad de pedidos (eso es un N+1)
+TECHO_CONSULTAS = 50
+
+PEDIDO = {
+    "id_personal": 3, "id_sucursal": 1, "id_cliente": 1, "metodo_pago": "Efectivo",
+    "detalles": [
+        {"tipo_producto": "Establecido", "id_producto_establecido": 1, "cantidad": 2},
+        {"tipo_producto": "Establecido", "id_producto_establecido": 6, "cantidad": 1},
+        {"tipo_producto": "Personalizado", "cantidad": 1, "producto_personalizado": {
+            "nombre_personalizado": "Bowl", "detalles": [
+                {"id_materia_prima": 1, "cantidad": "0.10"},
+                {"id_materia_prima": 4, "cantidad": "0.05"},
+                {"id_materia_prima": 5, "cantidad": "0.10"},
+            ]}},
+    ]}
+
+RECETA = {
+    "nombre": "Bowl clásico", "detalles": [
+        {"id_materia_prima": 1, "cantidad": "0.10"},
+        {"id_materia_prima": 5, "cantidad": "0.10"},
+    ]}
+
+# (método, ruta, cuerpo, solo_postgresql). Las escrituras van al final para no
+# cambiar lo que leen los demás; "{nuevo}" es el pedido creado por POST /pedidos/
+CASOS = [
+    ("GET", "/", None, False),
+    ("GET", "/auth/me", None, False),
+    ("GET", "/personal/", None, False),
+    ("GET", "/personal/2", None, False),
+    ("GET", "/sucursales/", None, False),
+    ("GET", "/sucursales/1", None, False),
+    ("GET", "/sucursales/1/inventario", None, False),
+    ("GET", "/clientes/", None, False),
+    ("GET", "/clientes/1", None, False),
+    ("GET", "/productos/establecidos", None, False),
+    ("GET", "/productos/materias-primas", None, False),
+    ("GET", "/inventario/materias-primas/sucursal/1", None, False),
+    ("GET", "/inventario/productos/sucursal/1", None, False),
+    ("GET", "/inventario/alertas", None, False),
+    ("GET", "/inventario/alertas/sucursal/1", None, False),
+    ("GET", "/inventario/historial/sucursal/1?fecha=2024-01-01T00:00:00Z", None, True),
+    ("GET", "/inventario/variacion/sucursal/1?desde=2024-01-01T00:00:00Z", None, True),
+    ("GET", "/pedidos/1", None, False),
+    ("GET", "/pedidos/sucursal/1", None, False),
+    ("GET", "/pedidos/sucursal/1/optimizado", None, False),
+    ("GET", "/pedidos/sucursal/1/optimizado?estado=Pagado", None, False),
+    ("GET", "/pedidos/sucursal/1/resumido", None, False),
+    ("GET", "/reportes/productos-mas-vendidos", None, True),
+    ("GET", "/reportes/sucursales-top", None, True),
+    ("GET", "/reportes/materias-mas-usadas", None, True),
+    ("GET", "/reportes/clientes-frecuentes", None, True),
+    ("GET", "/reportes/ventas-por-horario", None, True),
+    ("GET", "/reportes/recetas-mas-vendidas", None, True),
+    ("GET", "/predicciones/tendencias", None, True),
+    ("GET", "/predicciones/demanda/1", None, True),
+    ("GET", "/predicciones/stock-riesgo", None, True),
+    ("GET", "/backups/listar", None, False),
+    ("GET", "/metrics", None, False),
+    ("GET", "/diagnostico/perfiles", None, False),
+    ("POST", "/clientes/", {"ci_nit": "999000111", "apellido": "Presupuesto"}, False),
+    ("POST", "/recetas/", RECETA, False),
+    ("GET", "/recetas/", None, False),
+    ("POST", "/pedidos/cotizar", PEDIDO, False),
+    ("POST", "/pedidos/", PEDIDO, False),
+    ("POST", "/pedidos/?respuesta=minima", PEDIDO, False),
+    ("POST", "/pedidos/lote", {"pedidos": [
+        {"id_personal": 3, "id_sucursal": 1, "metodo_pago": "Efectivo",
+         "fecha_pedido": "2024-06-01T15:30:00Z", "referencia": "caja1-0001",
+         "detalles": [{"tipo_producto": "Establecido", "id_producto_establecido": 1, "cantidad": 1}]},
+        {"id_personal": 4, "id_sucursal": 2, "id_cliente": 2, "metodo_pago": "Tarjeta",
+         "detalles": [
+             {"tipo_producto": "Establecido", "id_producto_establecido": 2, "cantidad": 2},
+             {"tipo_producto": "Personalizado", "cantidad": 1, "producto_personalizado": {
+                 "detalles": [{"id_materia_prima": 1, "cantidad": "0.10"},
+                              {"id_materia_prima": 5, "cantidad": "0.10"}]}}]},
+        {"id_personal": 3, "id_sucursal": 1, "detalles": [
+            {"tipo_producto": "Establecido", "id_producto_establecido": 1, "cantidad": 100000}]},
+    ]}, False),
+    ("PATCH", "/pedidos/{nuevo}?respuesta=minima", {"metodo_pago": "Tarjeta"}, False),
+    ("PATCH", "/pedidos/{nuevo}/confirmar", None, True),
+    ("PATCH", "/inventario/productos/ajustar?id_sucursal=1&id_producto=2",
+     {"cantidad": 500, "motivo": "conteo"}, True),
+]
+
+
+class _Medicion:
+    """Sentencias y filas de la petición en curso (eventos del engine)."""
+
+    def __init__(self):
+        self.activa = False
+        self.consultas = 0
+        self.filas = 0
+        self.con_filas = True
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        if not self.activa:
+            return
+        self.consultas += 1
+        if cursor.rowcount is not None and cursor.rowcount >= 0:
+            self.filas += cursor.rowcount
+        elif statement.lstrip().upper().startswith(("SELECT", "WITH")):
+            self.con_filas = False
+
+
+def url_por_defecto() -> str:
+    """Archivo SQLite temporal, vacío en cada corrida."""
+    archivo = Path(tempfile.gettempdir()) / "presupuesto_consultas.db"
+    archivo.unlink(missing_ok=True)
+    return f"sqlite:///{archivo}"
+
+
+def leer_linea_base() -> dict:
+    if not LINEA_BASE.exists():
+        return {}
+    return json.loads(LINEA_BASE.read_text(encoding="utf-8"))
+
+
+def _preparar(url: str, reiniciar: bool) -> int:
+    os.environ["DATABASE_URL"] = url
+    from benchmarks.datos_sinteticos import generar
+    return generar(PEDIDOS, SUCURSALES, CLIENTES, 365, SEMILLA, reiniciar)
+
+
+def _medir(motor: str) -> dict:
+    from fastapi.testclient import TestClient
+    from sqlalchemy import event
+
+    from app.database import engine
+    from app.main import app
+    from benchmarks.datos_sinteticos import CONTRASENA
+
+    client = TestClient(app, raise_server_exceptions=False)
+    token = client.post("/auth/login", json={"username": "admin_bench", "password": CONTRASENA})
+    token.raise_for_status()
+    encabezados = {"Authorization": f"Bearer {token.json()['access_token']}"}
+
+    medicion = _Medicion()
+    event.listen(engine, "after_cursor_execute", medicion)
+    resultados = {}
+    nuevo = None
+    try:
+        for metodo, ruta, cuerpo, solo_postgresql in CASOS:
+            clave = f"{metodo} {ruta}"
+            if solo_postgresql and motor != "postgresql":
+                continue
+            medicion.consultas, medicion.filas, medicion.con_filas = 0, 0, True
+            medicion.activa = True
+            inicio = time.perf_counter()
+            respuesta = client.request(metodo, ruta.replace("{nuevo}", str(nuevo)),
+                                       json=cuerpo, headers=encabezados)
+            ms = (time.perf_counter() - inicio) * 1000
+            medicion.activa = False
+            if ruta == "/pedidos/" and respuesta.status_code == 201:
+                nuevo = respuesta.json()["id_pedido"]
+            resultados[clave] = {
+                "estado": respuesta.status_code,
+                "consultas": medicion.consultas,
+                "filas": medicion.filas if medicion.con_filas else None,
+                "ms": round(ms, 1),
+            }
+    finally:
+        event.remove(engine, "after_cursor_execute", medicion)
+    return resultados
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Rehace la línea base de presupuesto_consultas.json "
+                    "(la verificación es tests/test_presupuesto_consultas.py)")
+    parser.add_argument("--actualizar", action="store_true", required=True,
+                        help="guardar las mediciones como nueva línea base del motor")
+    parser.add_argument("--url", help="base de pruebas (por defecto un SQLite temporal)")
+    parser.add_argument("--reiniciar", action="store_true",
+                        help="borrar las tablas de --url antes de generar los datos")
+    args = parser.parse_args()
+
+    if _preparar(args.url or url_por_defecto(), args.reiniciar):
+        return 1
+
+    from app.database import engine
+    motor = engine.dialect.name
+    resultados = _medir(motor)
+
+    rechazados = [
+        f"{clave}: HTTP {r['estado']}" if r["estado"] >= 400
+        else f"{clave}: {r['consultas']} consultas (techo {TECHO_CONSULTAS})"
+        for clave, r in resultados.items()
+        if r["estado"] >= 400 or r["consultas"] > TECHO_CONSULTAS
+    ]
+    if rechazados:
+        print("No se guarda la línea base:\n  " + "\n  ".join(rechazados))
+        return 1
+
+    linea_base = leer_linea_base()
+    linea_base[motor] = resultados
+    LINEA_BASE.write_text(json.dumps(linea_base, indent=2, ensure_ascii=False) + "\n",
+                          encoding="utf-8")
+    print(f"Línea base de {motor} guardada en {LINEA_BASE.name} ({len(resultados)} endpoints)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,112 @@
+"""
+Microbenchmark de serialización de listas de pedidos.
+
+Compara, por cada 100 pedidos:
+- pydantic: construir PedidoResponse + jsonable_encoder + json.dumps (camino anterior
+  de /pedidos/sucursal/{id}/optimizado, igual al que usa FastAPI con response_model)
+- directo: pedido_a_dict + orjson (RespuestaJSONRapida)
+
+No necesita base de datos: los pedidos son objetos ORM transitorios.
+
+    python -m benchmarks.serializacion_pedidos
+"""
+import json
+import random
+import timeit
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+from fastapi.encoders import jsonable_encoder
+
+from app.models import (
+    Pedido, DetallePedido, ProductoPersonalizado, DetalleProductoPersonalizado,
+    ProductoEstablecido, MateriaPrima, Personal, Sucursal, Cliente
+)
+from app.schemas.pedidos import PedidoResponse
+from app.serializacion import RespuestaJSONRapida, pedidos_a_lista
+
+
+def pedidos_sinteticos(cantidad: int = 100, semilla: int = 42) -> list:
+    """Pedidos transitorios con la mezcla típica: 1-4 líneas, ~30% personalizados."""
+    rnd = random.Random(semilla)
+    sucursal = Sucursal(id_sucursal=1, nombre="Sucursal Centro", direccion="Av. Principal 123")
+    personal = Personal(id_personal=1, nombre="Vendedor Demo", id_rol=3, usuario="vendedor")
+    productos = [
+        ProductoEstablecido(id_producto_establecido=i, nombre=f"Helado {i}",
+                            precio_unitario=Decimal(rnd.randint(10, 40)) + Decimal("0.50"))
+        for i in range(1, 21)
+    ]
+    materias = [
+        MateriaPrima(id_materia_prima=i, nombre=f"Materia {i}", unidad="gramo",
+                     precio_unitario=Decimal(rnd.randint(1, 9)) + Decimal("0.25"))
+        for i in range(1, 31)
+    ]
+    inicio = datetime(2025, 6, 1, 10, 0, tzinfo=timezone.utc)
+
+    pedidos = []
+    id_detalle = id_pers = 1
+    for n in range(1, cantidad + 1):
+        pedido = Pedido(
+            id_pedido=n, fecha_pedido=inicio + timedelta(minutes=7 * n),
+            id_personal=1, id_sucursal=1, estado="Pagado", metodo_pago="Efectivo",
+            id_cliente=n if n % 3 == 0 else None
+        )
+        pedido.personal, pedido.sucursal = personal, sucursal
+        if pedido.id_cliente:
+            pedido.cliente = Cliente(id_cliente=n, ci_nit=str(1000 + n), apellido="Pérez")
+        total = Decimal("0")
+        for _ in range(rnd.randint(1, 4)):
+            cantidad_linea = rnd.randint(1, 3)
+            if rnd.random() < 0.3:
+                pp = ProductoPersonalizado(id_producto_personalizado=id_pers, nombre_personalizado="Copa")
+                precio = Decimal("0")
+                for materia in rnd.sample(materias, rnd.randint(2, 5)):
+                    dpp = DetalleProductoPersonalizado(
+                        id_materia_prima=materia.id_materia_prima, cantidad=Decimal("1.50"),
+                        precio_unitario=materia.precio_unitario)
+                    dpp.subtotal = dpp.cantidad * dpp.precio_unitario
+                    dpp.materia_prima = materia
+                    pp.detalles.append(dpp)
+                    precio += dpp.subtotal
+                detalle = DetallePedido(
+                    id_detalle_pedido=id_detalle, tipo_producto="Personalizado",
+                    id_producto_personalizado=id_pers, cantidad=cantidad_linea, precio_unitario=precio)
+                detalle.producto_personalizado = pp
+                id_pers += 1
+            else:
+                producto = rnd.choice(productos)
+                detalle = DetallePedido(
+                    id_detalle_pedido=id_detalle, tipo_producto="Establecido",
+                    id_producto_establecido=producto.id_producto_establecido,
+                    cantidad=cantidad_linea, precio_unitario=producto.precio_unitario)
+                detalle.producto_establecido = producto
+            detalle.subtotal = detalle.cantidad * detalle.precio_unitario
+            total += detalle.subtotal
+            pedido.detalles.append(detalle)
+            id_detalle += 1
+        pedido.total = total
+        pedidos.append(pedido)
+    return pedidos
+
+
+def serializar_pydantic(pedidos) -> bytes:
+    modelos = [PedidoResponse.model_validate(d) for d in pedidos_a_lista(pedidos)]
+    return json.dumps(jsonable_encoder(modelos), ensure_ascii=False, allow_nan=False,
+                      indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def serializar_directo(pedidos) -> bytes:
+    return RespuestaJSONRapida(content=pedidos_a_lista(pedidos)).body
+
+
+def main():
+    pedidos = pedidos_sinteticos(100)
+    repeticiones = 200
+    print(f"{'camino':<12} {'ms / 100 pedidos':>18} {'bytes':>10}")
+    for nombre, funcion in (("pydantic", serializar_pydantic), ("directo", serializar_directo)):
+        segundos = min(timeit.repeat(lambda: funcion(pedidos), number=repeticiones, repeat=5))
+        print(f"{nombre:<12} {segundos / repeticiones * 1000:>18.3f} {len(funcion(pedidos)):>10}")
+
+
+if __name__ == "__main__":
+    main()
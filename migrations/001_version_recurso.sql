@@ -0,0 +1,11 @@
+-- 001: contadores de versión por recurso para los ETag de catálogo e inventario
+-- (ver app/cache_http.py). Los routers incrementan la fila del recurso en la misma
+-- transacción que lo modifica.
+
+CREATE TABLE IF NOT EXISTS version_recurso (
+    recurso VARCHAR(100) PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0
+);
+
+COMMENT ON TABLE version_recurso IS
+    'Contadores de versión por recurso para los ETag de caché HTTP';
@@ -0,0 +1,33 @@
+-- 002: documentos de transferencia de stock entre sucursales
+-- (POST /inventario/transferencias). Cada documento agrupa los movimientos de
+-- materias primas y productos aplicados en una misma transacción.
+
+CREATE TABLE IF NOT EXISTS transferencia (
+    id_transferencia SERIAL PRIMARY KEY,
+    fecha TIMESTAMPTZ DEFAULT now(),
+    id_personal INTEGER NOT NULL REFERENCES personal (id_personal),
+    motivo TEXT
+);
+
+COMMENT ON TABLE transferencia IS
+    'Documento de transferencia de stock entre sucursales';
+
+CREATE TABLE IF NOT EXISTS detalle_transferencia (
+    id_detalle_transferencia SERIAL PRIMARY KEY,
+    id_transferencia INTEGER NOT NULL REFERENCES transferencia (id_transferencia),
+    tipo_item VARCHAR(20) NOT NULL,
+    id_materia_prima INTEGER REFERENCES materia_prima (id_materia_prima),
+    id_producto_establecido INTEGER REFERENCES producto_establecido (id_producto_establecido),
+    id_sucursal_origen INTEGER NOT NULL REFERENCES sucursal (id_sucursal),
+    id_sucursal_destino INTEGER NOT NULL REFERENCES sucursal (id_sucursal),
+    cantidad NUMERIC(10, 2) NOT NULL,
+    CONSTRAINT chk_tipo_item_transferencia CHECK (
+        (tipo_item = 'materia_prima' AND id_materia_prima IS NOT NULL AND id_producto_establecido IS NULL) OR
+        (tipo_item = 'producto' AND id_producto_establecido IS NOT NULL AND id_materia_prima IS NULL)
+    ),
+    CONSTRAINT chk_sucursales_distintas CHECK (id_sucursal_origen <> id_sucursal_destino),
+    CONSTRAINT chk_cantidad_transferencia CHECK (cantidad > 0)
+);
+
+CREATE INDEX IF NOT EXISTS ix_detalle_transferencia_id_transferencia
+    ON detalle_transferencia (id_transferencia);
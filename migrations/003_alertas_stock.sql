@@ -0,0 +1,22 @@
+-- 003: stock mínimo para productos establecidos e índices del escaneo de alertas
+-- de toda la cadena (GET /inventario/alertas).
+
+ALTER TABLE producto_establecido
+    ADD COLUMN IF NOT EXISTS stock_minimo INTEGER NOT NULL DEFAULT 0;
+
+-- Materias con fecha de caducidad (la mayoría no la tiene)
+CREATE INDEX IF NOT EXISTS ix_materia_prima_fecha_caducidad
+    ON materia_prima (fecha_caducidad)
+    WHERE fecha_caducidad IS NOT NULL;
+
+-- Productos con mínimo definido
+CREATE INDEX IF NOT EXISTS ix_producto_establecido_con_minimo
+    ON producto_establecido (id_producto_establecido, stock_minimo)
+    WHERE stock_minimo > 0;
+
+-- Inventario por item (la clave primaria empieza por id_sucursal)
+CREATE INDEX IF NOT EXISTS ix_inventario_materiaprima_materia
+    ON inventario_materiaprima (id_materia_prima, cantidad_stock);
+
+CREATE INDEX IF NOT EXISTS ix_inventario_productoestablecido_producto
+    ON inventario_productoestablecido (id_producto_establecido, cantidad_disponible);
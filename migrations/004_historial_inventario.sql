@@ -0,0 +1,37 @@
+-- 004: historial de inventario (ver app/historial_inventario.py).
+-- movimiento_inventario guarda cada cambio de stock; snapshot_inventario guarda
+-- periódicamente el stock completo de cada sucursal. El stock en un instante
+-- se obtiene del último snapshot anterior más los movimientos posteriores.
+
+CREATE TABLE IF NOT EXISTS movimiento_inventario (
+    id_movimiento BIGSERIAL PRIMARY KEY,
+    fecha TIMESTAMPTZ NOT NULL DEFAULT clock_timestamp(),
+    id_sucursal INTEGER NOT NULL REFERENCES sucursal (id_sucursal),
+    tipo_item VARCHAR(20) NOT NULL,
+    id_item INTEGER NOT NULL,
+    cantidad_anterior NUMERIC(12, 2) NOT NULL,
+    cantidad_nueva NUMERIC(12, 2) NOT NULL,
+    delta NUMERIC(12, 2) NOT NULL,
+    origen VARCHAR(20) NOT NULL,
+    CONSTRAINT check_tipo_item_movimiento CHECK (tipo_item IN ('materia_prima', 'producto'))
+);
+
+COMMENT ON TABLE movimiento_inventario IS
+    'Cambios de stock (delta por fila y transacción) entre snapshots';
+
+CREATE INDEX IF NOT EXISTS ix_movimiento_inventario_sucursal_fecha
+    ON movimiento_inventario (id_sucursal, tipo_item, fecha);
+
+CREATE TABLE IF NOT EXISTS snapshot_inventario (
+    id_snapshot SERIAL PRIMARY KEY,
+    id_sucursal INTEGER NOT NULL REFERENCES sucursal (id_sucursal),
+    tipo_item VARCHAR(20) NOT NULL,
+    fecha_corte TIMESTAMPTZ NOT NULL,
+    ids INTEGER[] NOT NULL,
+    cantidades NUMERIC(12, 2)[] NOT NULL,
+    total_items INTEGER NOT NULL,
+    CONSTRAINT uq_snapshot_sucursal_tipo_fecha UNIQUE (id_sucursal, tipo_item, fecha_corte)
+);
+
+COMMENT ON TABLE snapshot_inventario IS
+    'Snapshots periódicos del inventario por sucursal';
@@ -0,0 +1,32 @@
+-- 005: índices para los listados de pedidos y los reportes
+-- (declarados también en app/models). benchmarks/planes_consulta.py verifica
+-- que EXPLAIN los use en cada reporte y listado.
+--
+-- En una base con tráfico conviene crearlos uno por uno con
+-- CREATE INDEX CONCURRENTLY (fuera de una transacción).
+
+CREATE INDEX IF NOT EXISTS ix_pedido_sucursal_fecha
+    ON pedido (id_sucursal, fecha_pedido DESC);
+
+CREATE INDEX IF NOT EXISTS ix_pedido_sucursal_estado_fecha
+    ON pedido (id_sucursal, estado, fecha_pedido DESC);
+
+CREATE INDEX IF NOT EXISTS ix_pedido_pagado_fecha
+    ON pedido (fecha_pedido)
+    INCLUDE (id_pedido, id_sucursal, id_cliente, total)
+    WHERE estado = 'Pagado';
+
+CREATE INDEX IF NOT EXISTS ix_detalle_pedido_pedido
+    ON detalle_pedido (id_pedido);
+
+CREATE INDEX IF NOT EXISTS ix_detalle_pedido_producto_establecido
+    ON detalle_pedido (id_producto_establecido, id_pedido)
+    INCLUDE (cantidad, subtotal)
+    WHERE id_producto_establecido IS NOT NULL;
+
+CREATE INDEX IF NOT EXISTS ix_producto_personalizado_pedido
+    ON producto_personalizado (id_pedido);
+
+ANALYZE pedido;
+ANALYZE detalle_pedido;
+ANALYZE producto_personalizado;
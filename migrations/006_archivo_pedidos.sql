@@ -0,0 +1,28 @@
+-- 006: archivo de pedidos cerrados (ver app/archivo.py).
+-- Una fila por pedido con sus líneas y productos personalizados en JSONB.
+-- toast_tuple_target bajo hace que PostgreSQL comprima el JSONB aunque la fila
+-- sea chica.
+
+CREATE TABLE IF NOT EXISTS pedido_archivo (
+    id_pedido INTEGER PRIMARY KEY,
+    fecha_pedido TIMESTAMPTZ NOT NULL,
+    id_personal INTEGER NOT NULL,
+    id_sucursal INTEGER NOT NULL,
+    id_cliente INTEGER,
+    estado VARCHAR(20) NOT NULL,
+    metodo_pago VARCHAR(20),
+    total NUMERIC(12, 2) NOT NULL,
+    lineas JSONB NOT NULL,
+    personalizados JSONB NOT NULL
+) WITH (toast_tuple_target = 128, fillfactor = 100);
+
+COMMENT ON TABLE pedido_archivo IS 'Pedidos archivados con sus detalles';
+
+CREATE INDEX IF NOT EXISTS ix_pedido_archivo_fecha
+    ON pedido_archivo (fecha_pedido);
+
+-- El borrado de producto_personalizado verifica la FK desde detalle_pedido:
+-- sin este índice cada fila borrada recorre detalle_pedido entero.
+CREATE INDEX IF NOT EXISTS ix_detalle_pedido_producto_personalizado
+    ON detalle_pedido (id_producto_personalizado)
+    WHERE id_producto_personalizado IS NOT NULL;
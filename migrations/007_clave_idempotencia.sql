@@ -0,0 +1,23 @@
+-- 007: Idempotency-Key de POST /pedidos/ y PATCH /pedidos/{id}/confirmar
+-- (ver app/idempotencia.py). Las claves viejas se borran con
+-- `python -m app.idempotencia`.
+
+CREATE TABLE IF NOT EXISTS clave_idempotencia (
+    clave VARCHAR(100) NOT NULL,
+    id_personal INTEGER NOT NULL REFERENCES personal (id_personal) ON DELETE CASCADE,
+    huella VARCHAR(64) NOT NULL,
+    estado_http INTEGER,
+    respuesta BYTEA,
+    encabezados JSON,
+    fecha_creacion TIMESTAMPTZ NOT NULL DEFAULT now(),
+    PRIMARY KEY (clave, id_personal)
+);
+
+-- Para bases donde la tabla ya se creó sin la columna
+ALTER TABLE clave_idempotencia ADD COLUMN IF NOT EXISTS encabezados JSON;
+
+COMMENT ON TABLE clave_idempotencia IS
+    'Respuestas guardadas por Idempotency-Key y usuario';
+
+CREATE INDEX IF NOT EXISTS ix_clave_idempotencia_fecha
+    ON clave_idempotencia (fecha_creacion);
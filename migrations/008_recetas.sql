@@ -0,0 +1,27 @@
+-- 008: Recetas (plantillas de productos personalizados). Un pedido puede
+-- referenciar una receta en vez de enviar sus materias primas; el producto
+-- personalizado guarda de qué receta salió (ver app/routers/recetas.py).
+
+CREATE TABLE IF NOT EXISTS receta (
+    id_receta SERIAL PRIMARY KEY,
+    nombre VARCHAR(50) NOT NULL UNIQUE,
+    margen NUMERIC(4, 2),
+    activa BOOLEAN NOT NULL DEFAULT true,
+    fecha_creacion TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP
+);
+
+COMMENT ON TABLE receta IS
+    'Plantillas de productos personalizados (combinaciones frecuentes)';
+
+CREATE TABLE IF NOT EXISTS detalle_receta (
+    id_receta INTEGER NOT NULL REFERENCES receta (id_receta),
+    id_materia_prima INTEGER NOT NULL REFERENCES materia_prima (id_materia_prima),
+    cantidad NUMERIC(5, 2) NOT NULL,
+    PRIMARY KEY (id_receta, id_materia_prima)
+);
+
+COMMENT ON TABLE detalle_receta IS
+    'Materias primas y cantidades de cada receta';
+
+ALTER TABLE producto_personalizado
+    ADD COLUMN IF NOT EXISTS id_receta INTEGER REFERENCES receta (id_receta);
@@ -0,0 +1,61 @@
+"""
+Presupuesto de consultas SQL por endpoint (ver benchmarks/presupuesto_consultas.py).
+
+Cada caso de CASOS es un test: falla si el endpoint responde con error, si no
+tiene línea base para el motor o si ejecuta más consultas que su presupuesto.
+Filas y tiempo solo generan avisos.
+
+    python -m pytest tests/test_presupuesto_consultas.py
+    PRESUPUESTO_DATABASE_URL=postgresql+psycopg2://postgres@localhost/presupuesto \
+        PRESUPUESTO_REINICIAR=1 python -m pytest tests/test_presupuesto_consultas.py
+"""
+import os
+import warnings
+
+import pytest
+
+from benchmarks.presupuesto_consultas import (
+    CASOS, TECHO_CONSULTAS, TOLERANCIA_FILAS, TOLERANCIA_TIEMPO,
+    _medir, _preparar, leer_linea_base, url_por_defecto,
+)
+
+
+@pytest.fixture(scope="session")
+def mediciones():
+    """Genera los datos y mide todos los CASOS una vez, en orden (las
+    escrituras del final dependen de las anteriores)."""
+    url = os.getenv("PRESUPUESTO_DATABASE_URL") or url_por_defecto()
+    reiniciar = os.getenv("PRESUPUESTO_REINICIAR") == "1"
+    if _preparar(url, reiniciar):
+        pytest.fail(f"No se pudieron generar los datos en {url}")
+
+    from app.database import engine
+    motor = engine.dialect.name
+    return motor, _medir(motor), leer_linea_base().get(motor, {})
+
+
+@pytest.mark.parametrize(
+    "metodo, ruta, solo_postgresql",
+    [(metodo, ruta, solo_postgresql) for metodo, ruta, _, solo_postgresql in CASOS],
+    ids=[f"{metodo} {ruta}" for metodo, ruta, _, _ in CASOS],
+)
+def test_presupuesto_consultas(mediciones, metodo, ruta, solo_postgresql):
+    motor, resultados, linea_base = mediciones
+    if solo_postgresql and motor != "postgresql":
+        pytest.skip("usa SQL propio de PostgreSQL")
+
+    clave = f"{metodo} {ruta}"
+    r = resultados[clave]
+    anterior = linea_base.get(clave)
+
+    assert r["estado"] < 400, f"HTTP {r['estado']}"
+    assert anterior is not None, f"sin línea base para {motor}"
+    assert r["consultas"] <= TECHO_CONSULTAS, \
+        f"{r['consultas']} consultas: pasa el techo de {TECHO_CONSULTAS}"
+    assert r["consultas"] <= anterior["consultas"], \
+        f"{r['consultas']} consultas: excede el presupuesto ({anterior['consultas']})"
+
+    if r["filas"] and anterior.get("filas") and r["filas"] > anterior["filas"] * TOLERANCIA_FILAS:
+        warnings.warn(f"{clave}: filas {anterior['filas']} -> {r['filas']}")
+    if r["ms"] > max(anterior["ms"], 1) * TOLERANCIA_TIEMPO:
+        warnings.warn(f"{clave}: {anterior['ms']} -> {r['ms']} ms")